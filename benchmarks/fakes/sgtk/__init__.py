@@ -0,0 +1,97 @@
+"""
+Lightweight stand-in for the parts of ``sgtk`` used by the engine, so its hot
+paths can be timed outside of 3DE.
+
+"""
+import json
+import logging
+
+from . import authentication, platform, util
+
+_authenticated_user = None
+
+
+class TankError(Exception):
+    """
+    Stand-in for :class:`sgtk.TankError`.
+    """
+
+
+class LogManager(object):
+    """
+    Stand-in for :class:`sgtk.LogManager`.
+    """
+    global_debug = False
+    log_folder = "."
+
+    @staticmethod
+    def get_logger(name):
+        """
+        :param str name: The logger name.
+        """
+        return logging.getLogger(name)
+
+
+class Context(object):
+    """
+    Stand-in for :class:`sgtk.Context`, holding an entity and a task.
+    """
+
+    def __init__(self, entity=None, task=None):
+        """
+        :param dict entity: The context entity.
+        :param dict task: The context task.
+        """
+        self.entity = entity or {"type": "Shot", "id": 1, "name": "sh010"}
+        self.task = task
+
+    def __eq__(self, other):
+        return isinstance(other, Context) and (self.entity, self.task) == (other.entity, other.task)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        return "{type} {name}".format(**self.entity)
+
+    @staticmethod
+    def serialize(context):
+        """
+        :param Context context: The context to serialize.
+        """
+        return json.dumps({"entity": context.entity, "task": context.task})
+
+
+class context(object):
+    """
+    Stand-in for the ``sgtk.context`` module.
+    """
+
+    @staticmethod
+    def deserialize(data):
+        """
+        :param str data: A serialized context.
+        """
+        return Context(**json.loads(data))
+
+
+def get_hook_baseclass():
+    """
+    Hooks derive from object outside of the core.
+    """
+    return object
+
+
+def get_authenticated_user():
+    """
+    Get the user set with :func:`set_authenticated_user`.
+    """
+    return _authenticated_user
+
+
+def set_authenticated_user(user):
+    """
+    :param user: The current user.
+    """
+    global _authenticated_user
+    _authenticated_user = user
@@ -0,0 +1,72 @@
+"""
+Stand-in for ``sgtk.authentication``, logging into a site by sending it a
+request, so a local mock site can count the logins.
+
+"""
+import json
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+
+class ShotgunUser(object):
+    """
+    Stand-in for :class:`sgtk.authentication.ShotgunUser`.
+    """
+
+    def __init__(self, host, login, session_token):
+        """
+        :param str host: The site.
+        :param str login: The user login.
+        :param str session_token: The session token.
+        """
+        self.host = host
+        self.login = login
+        self.session_token = session_token
+
+    def __str__(self):
+        return self.login
+
+
+class ShotgunAuthenticator(object):
+    """
+    Stand-in for :class:`sgtk.authentication.ShotgunAuthenticator`.
+    """
+
+    def __init__(self, defaults_manager):
+        """
+        :param defaults_manager: Gives the site to log into.
+        """
+        self._defaults_manager = defaults_manager
+
+    def get_user(self):
+        """
+        Log into the default site.
+
+        :rtype: ShotgunUser
+        """
+        host = self._defaults_manager.get_host()
+        response = urlopen("{}/auth/access_token".format(host), b"login=artist")
+        try:
+            session_token = json.loads(response.read().decode("utf-8"))["session_token"]
+        finally:
+            response.close()
+        return ShotgunUser(host, "artist", session_token)
+
+
+def serialize_user(user):
+    """
+    :param ShotgunUser user: The user to serialize.
+    :rtype: str
+    """
+    return json.dumps({"host": user.host, "login": user.login, "session_token": user.session_token})
+
+
+def deserialize_user(data):
+    """
+    :param str data: A serialized user.
+    :rtype: ShotgunUser
+    """
+    return ShotgunUser(**json.loads(data))
@@ -0,0 +1,117 @@
+"""
+Stand-in for ``sgtk.platform``.
+
+"""
+import logging
+import os
+import sys
+import uuid
+
+try:
+    import importlib.util as importlib_util
+except ImportError:
+    importlib_util = None
+    import imp
+
+_current_engine = None
+
+
+class Engine(object):
+    """
+    Stand-in for :class:`sgtk.platform.Engine`, with just what the 3DE engine
+    uses: settings, commands, context, logger and ``import_module``.
+    """
+
+    def __init__(self, settings=None, context=None):
+        """
+        :param dict settings: The engine settings.
+        :param context: The engine context.
+        """
+        global _current_engine
+        self.settings = settings or {}
+        self.context = context
+        self.commands = {}
+        self.apps = {}
+        self.logger = logging.getLogger("sgtk.env.benchmark.tk-3de4")
+        self.disk_location = os.path.dirname(
+            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        )
+        self.cache_location = None
+        self._module_uid = None
+        _current_engine = self
+
+    def get_setting(self, name, default=None):
+        """
+        :param str name: The setting name.
+        """
+        return self.settings.get(name, default)
+
+    def register_command(self, name, callback, properties=None):
+        """
+        :param str name: The command name.
+        :param callback: The command callback.
+        :param dict properties: The command properties.
+        """
+        self.commands[name] = {"callback": callback, "properties": properties or {}}
+
+    def import_module(self, module_name):
+        """
+        Like the core, load the engine's python folder as a package under a
+        unique name, so its modules are separate from any plain import of them.
+
+        :param str module_name: The name of a package in the engine's python folder.
+        """
+        python_folder = os.path.join(self.disk_location, "python")
+        if self._module_uid is None:
+            self._module_uid = "tkimp{}".format(uuid.uuid4().hex)
+            if importlib_util is not None:
+                spec = importlib_util.spec_from_file_location(
+                    self._module_uid,
+                    os.path.join(python_folder, "__init__.py"),
+                    submodule_search_locations=[python_folder],
+                )
+                package = importlib_util.module_from_spec(spec)
+                sys.modules[self._module_uid] = package
+                spec.loader.exec_module(package)
+            else:
+                imp.load_module(self._module_uid, None, python_folder, ("", "", imp.PKG_DIRECTORY))
+        name = "{}.{}".format(self._module_uid, module_name)
+        __import__(name)
+        return sys.modules[name]
+
+
+class SoftwareLauncher(object):
+    """
+    Stand-in for :class:`sgtk.platform.SoftwareLauncher`.
+    """
+
+
+class SoftwareVersion(object):
+    """
+    Stand-in for :class:`sgtk.platform.SoftwareVersion`.
+    """
+
+
+class LaunchInformation(object):
+    """
+    Stand-in for :class:`sgtk.platform.LaunchInformation`.
+    """
+
+    def __init__(self, path=None, args=None, environ=None):
+        self.path = path
+        self.args = args
+        self.environment = environ
+
+
+def current_engine():
+    """
+    Get the last engine created.
+    """
+    return _current_engine
+
+
+def change_context(context):
+    """
+    :param context: The new context.
+    """
+    _current_engine.context = context
@@ -0,0 +1,47 @@
+"""
+Stand-in for ``sgtk.platform.qt``, with no-op Qt classes.
+
+"""
+
+
+class _Signal(object):
+    def connect(self, slot):
+        pass
+
+
+class QtCore(object):
+    class QCoreApplication(object):
+        @staticmethod
+        def processEvents():
+            pass
+
+        @staticmethod
+        def instance():
+            return None
+
+    class QFileSystemWatcher(object):
+        def __init__(self, paths=None):
+            self.fileChanged = _Signal()
+            self.directoryChanged = _Signal()
+            self._files = list(paths or [])
+
+        def files(self):
+            return list(self._files)
+
+        def addPath(self, path):
+            if path not in self._files:
+                self._files.append(path)
+
+        def removePaths(self, paths):
+            self._files = [path for path in self._files if path not in paths]
+
+
+class QtGui(object):
+    class QMessageBox(object):
+        @staticmethod
+        def warning(*args):
+            pass
+
+        @staticmethod
+        def information(*args):
+            pass
@@ -0,0 +1,33 @@
+"""
+Stand-in for ``sgtk.util``.
+
+"""
+import tempfile
+
+
+class LocalFileStorageManager(object):
+    """
+    Stand-in for :class:`sgtk.util.LocalFileStorageManager`.
+    """
+    CACHE = "cache"
+
+    @staticmethod
+    def get_global_root(kind):
+        """
+        :param str kind: The kind of storage.
+        """
+        return tempfile.gettempdir()
+
+
+class CoreDefaultsManager(object):
+    """
+    Stand-in for :class:`sgtk.util.CoreDefaultsManager`.
+    """
+    #: The site the users log into.
+    host = None
+
+    def get_host(self):
+        """
+        :returns: The default site.
+        """
+        return self.host
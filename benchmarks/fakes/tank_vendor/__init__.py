@@ -0,0 +1,4 @@
+"""
+Stand-in for the ``tank_vendor`` package of the core.
+
+"""
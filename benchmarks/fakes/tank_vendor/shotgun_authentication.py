@@ -0,0 +1,5 @@
+"""
+Stand-in for ``tank_vendor.shotgun_authentication``.
+
+"""
+from sgtk.authentication import ShotgunAuthenticator  # noqa: F401
@@ -0,0 +1,136 @@
+"""
+Stand-in for the 3DE ``tde4`` module, keeping cameras in memory.
+
+"""
+_cameras = {}
+_selected = set()
+_project_path = ""
+
+
+def reset(camera_count=0, selected_count=0, name="cam"):
+    """
+    Replace the cameras of the fake project.
+
+    :param int camera_count: The number of sequence cameras.
+    :param int selected_count: How many of them are selected.
+    :param str name: The base name of the cameras.
+    """
+    _cameras.clear()
+    _selected.clear()
+    for cam_id in range(1, camera_count + 1):
+        _cameras[cam_id] = {"name": "{}{}".format(name, cam_id), "type": "SEQUENCE"}
+        if cam_id <= selected_count:
+            _selected.add(cam_id)
+
+
+def set_project_path(path):
+    """
+    :param str path: The path returned by :func:`getProjectPath`.
+    """
+    global _project_path
+    _project_path = path
+
+
+def getProjectPath():
+    return _project_path
+
+
+def saveProject(path):
+    """
+    Write the camera names and footage paths to ``path``, one camera a line.
+
+    :param str path: The project path.
+    """
+    with open(path, "w") as project_file:
+        for cam_id in sorted(_cameras):
+            project_file.write("{} {}\n".format(_cameras[cam_id]["name"], _cameras[cam_id].get("path", "")))
+    set_project_path(path)
+
+
+def loadProject(path):
+    """
+    Replace the cameras with the ones written by :func:`saveProject`.
+
+    :param str path: The project path.
+    """
+    reset()
+    with open(path) as project_file:
+        for cam_id, line in enumerate(project_file, 1):
+            name, camera_path = line.rstrip("\n").split(" ", 1)
+            _cameras[cam_id] = {"name": name, "type": "SEQUENCE", "path": camera_path}
+    set_project_path(path)
+
+
+def get3DEVersion():
+    return "3DEqualizer4 Release 5"
+
+
+def rescanPythonDirs():
+    pass
+
+
+def setTimerCallbackFunction(name, interval):
+    pass
+
+
+def getNoCameras():
+    return len(_cameras)
+
+
+def getCameraList(selected_only=False):
+    if selected_only:
+        return sorted(_selected)
+    return sorted(_cameras)
+
+
+def getCameraType(cam_id):
+    return _cameras[cam_id]["type"]
+
+
+def getCameraName(cam_id):
+    return _cameras[cam_id]["name"]
+
+
+def setCameraName(cam_id, name):
+    _cameras[cam_id]["name"] = name
+
+
+def createCamera(cam_type):
+    cam_id = max(_cameras or [0]) + 1
+    _cameras[cam_id] = {"name": "cam{}".format(cam_id), "type": cam_type}
+    return cam_id
+
+
+def findCameraByName(name):
+    for cam_id, camera in _cameras.items():
+        if camera["name"] == name:
+            return cam_id
+    return None
+
+
+def setCameraSequenceAttr(cam_id, start, end, step):
+    _cameras[cam_id]["sequence"] = (start, end, step)
+
+
+def getCameraSequenceAttr(cam_id):
+    return list(_cameras[cam_id].get("sequence", (1, 1, 1)))
+
+
+def setCameraFrameOffset(cam_id, offset):
+    _cameras[cam_id]["offset"] = offset
+
+
+def setCameraFrameRangeCalculationFlag(cam_id, flag):
+    _cameras[cam_id]["range_flag"] = flag
+
+
+def setCameraPath(cam_id, path):
+    _cameras[cam_id]["path"] = path
+
+
+def getCameraPath(cam_id):
+    return _cameras[cam_id].get("path", "")
+
+
+def getCurrentFrame(cam_id):
+    return _cameras[cam_id].get("frame", 1)
@@ -0,0 +1,357 @@
+"""
+Benchmarks for the hot paths of the 3DE4 engine.
+
+The ``tde4`` and ``sgtk`` modules only exist inside a 3DE install, so the
+stand-ins in ``benchmarks/fakes`` are used instead. Run from the engine root::
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --compare results.json
+
+Results are written as JSON, one entry per benchmark and size, and can be
+compared between commits with ``--compare``. The menu benchmarks run with the
+default layout of one script per command looking the command up in
+``engine.commands``, and, suffixed ``_dispatcher``, with the
+``menu_dispatcher`` layout.
+
+"""
+from __future__ import print_function
+import argparse
+import functools
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import importlib.util as importlib_util
+except ImportError:
+    import imp
+    importlib_util = None
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ENGINE_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, "fakes"))
+sys.path.insert(0, os.path.join(ENGINE_DIR, "python"))
+
+import sgtk
+import tde4
+
+
+def load_source(name, path):
+    """
+    Load a module from a file of the engine.
+
+    :param str name: The name to give the module.
+    :param str path: The path to the file, relative to the engine root.
+    """
+    path = os.path.join(ENGINE_DIR, path)
+    if importlib_util is None:
+        return imp.load_source(name, path)
+    spec = importlib_util.spec_from_file_location(name, path)
+    module = importlib_util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_engine(settings=None):
+    """
+    Create a 3DE engine on top of the fake core.
+
+    :param dict settings: Settings overriding the defaults.
+    """
+    engine_module = load_source("tk_3de4_engine", "engine.py")
+    defaults = {
+        "debug_logging": False,
+        "menu_favourites": [],
+        "menu_dispatcher": False,
+        "context_poll_interval": 1000,
+        "context_cache_size": 32,
+        "sequence_index": False,
+        "sequence_scan_workers": 4,
+        "log_buffer_size": 1000,
+        "log_file": False,
+        "timer_tick_budget": 20,
+        "local_save": False,
+        "footage_cache": False,
+        "sequence_prefetch": False,
+        "sequence_prefetch_max_age": 300,
+        "sequence_last_frame_field": "sg_last_frame",
+        "validate_footage_on_open": False,
+    }
+    defaults.update(settings or {})
+    return engine_module.TDE4Engine(defaults, sgtk.Context())
+
+
+def timed(func, repeat):
+    """
+    Time a function.
+
+    :param func: The function to time, called without arguments.
+    :param int repeat: The number of runs.
+    :returns: The fastest and mean run time, in seconds.
+    :rtype: tuple(float, float)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times), sum(times) / len(times)
+
+
+##############################################################################################################
+# benchmarks
+
+
+class FakeApp(object):
+    """
+    Stand-in for a toolkit app.
+    """
+
+    def __init__(self, engine, index):
+        self.engine = engine
+        self.display_name = "App {}".format(index)
+        self.instance_name = "tk-app-{}".format(index)
+
+
+def build_menu(size, dispatcher):
+    """
+    Build the Shotgun menu with ``size`` commands, spread over ``size / 5``
+    apps, with one command in ten a favourite, in a new menu folder.
+
+    :param int size: The number of commands.
+    :param bool dispatcher: Whether to use the ``menu_dispatcher`` layout.
+    :returns: The menu generator, with its menu folder to remove once done.
+    """
+    menu_dir = tempfile.mkdtemp(prefix="tk-3de4_bench_menu_")
+    os.environ["TK_3DE4_MENU_DIR"] = menu_dir
+    engine = make_engine({"menu_dispatcher": dispatcher})
+    apps = [FakeApp(engine, index) for index in range(max(1, size // 5))]
+    engine.apps = dict((app.instance_name, app) for app in apps)
+    favourites = []
+    for index in range(size):
+        app = apps[index % len(apps)]
+        name = "Command {}".format(index)
+        engine.register_command(name, lambda: None, {"app": app})
+        if index % 10 == 0:
+            favourites.append({"app_instance": app.instance_name, "name": name})
+    engine.settings["menu_favourites"] = favourites
+    tk_3de4 = engine.import_module("tk_3de4")
+    generator = tk_3de4.MenuGenerator(engine)
+    generator.create_menu()
+    return generator
+
+
+def menu_scripts(generator):
+    """
+    :returns: The path and content of the scripts of a menu folder.
+    :rtype: list(tuple(str, str))
+    """
+    scripts = []
+    for name in sorted(os.listdir(generator.custom_scripts_dir_path)):
+        path = os.path.join(generator.custom_scripts_dir_path, name)
+        with open(path) as script_file:
+            scripts.append((path, script_file.read()))
+    return scripts
+
+
+def bench_create_menu(size, repeat, dispatcher=False):
+    """
+    Rebuild the Shotgun menu with ``size`` commands, with nothing changed.
+    """
+    generator = build_menu(size, dispatcher)
+    try:
+        return timed(generator.create_menu, repeat)
+    finally:
+        shutil.rmtree(generator.custom_scripts_dir_path, ignore_errors=True)
+
+
+def bench_menu_rescan(size, repeat, dispatcher=False):
+    """
+    Compile the scripts of a menu with ``size`` commands, as 3DE does when
+    rescanning its python folders.
+    """
+    generator = build_menu(size, dispatcher)
+    try:
+        scripts = menu_scripts(generator)
+        return timed(lambda: [compile(content, path, "exec") for path, content in scripts], repeat)
+    finally:
+        shutil.rmtree(generator.custom_scripts_dir_path, ignore_errors=True)
+
+
+def bench_menu_click(size, repeat, dispatcher=False):
+    """
+    Run each of the scripts of a menu with ``size`` commands once, as 3DE
+    does when a menu item is clicked.
+    """
+    generator = build_menu(size, dispatcher)
+    try:
+        code = [compile(content, path, "exec") for path, content in menu_scripts(generator)]
+
+        def run():
+            for script in code:
+                exec(script, {"__name__": "__main__"})
+
+        return timed(run, repeat)
+    finally:
+        shutil.rmtree(generator.custom_scripts_dir_path, ignore_errors=True)
+
+
+def bench_sequence_scan(size, repeat):
+    """
+    Resolve a ``size`` frame sequence, in a directory also holding a second
+    sequence of the same length.
+    """
+    engine = make_engine()
+    actions = load_source("tk_3de4_actions", os.path.join("hooks", "tk-multi-loader2", "tk-3de4_actions.py"))
+    seq_dir = tempfile.mkdtemp(prefix="tk-3de4_bench_seq_")
+    try:
+        for frame in range(1001, 1001 + size):
+            open(os.path.join(seq_dir, "plate.{:04d}.exr".format(frame)), "w").close()
+            open(os.path.join(seq_dir, "plate_denoise.{:04d}.exr".format(frame)), "w").close()
+        path = os.path.join(seq_dir, "plate.%04d.exr")
+        return timed(lambda: actions.get_hash_path_and_range_info_from_seq(path), repeat)
+    finally:
+        shutil.rmtree(seq_dir, ignore_errors=True)
+
+
+def bench_import_image_seq(size, repeat):
+    """
+    Assign a sequence to ``size`` selected cameras, out of ``2 * size``.
+    """
+    engine = make_engine()
+    actions = load_source("tk_3de4_actions", os.path.join("hooks", "tk-multi-loader2", "tk-3de4_actions.py"))
+
+    class App(object):
+        logger = logging.getLogger("sgtk.env.benchmark.tk-multi-loader2")
+
+    app = App()
+    app.engine = engine
+    hook = actions.TDE4Actions()
+    hook.parent = app
+
+    def run():
+        tde4.reset(2 * size, size)
+        hook._import_image_seq("/plates/plate.%04d.exr", {}, ("/plates/plate.####.exr", 1001, 1100, 1))
+
+    return timed(run, repeat)
+
+
+def bench_timer_tick(size, repeat):
+    """
+    Run ``size`` ticks of the 3DE timer callback, with the project unchanged.
+    """
+    engine = make_engine()
+    engine.pre_app_init()
+    tk_3de4 = engine.import_module("tk_3de4")
+    engine._context_switcher = tk_3de4.ContextSwitcher(engine, 1.0)
+    tde4.set_project_path("/projects/sh010/sh010_v001.3de")
+    engine._context_switcher.current_path = tde4.getProjectPath()
+
+    os.environ.setdefault("TANK_CURRENT_PC", ENGINE_DIR)
+    startup = load_source("tk_3de4_startup", os.path.join("startup", "startup.py"))
+    startup.QtCore = sgtk.platform.qt.QtCore
+
+    def run():
+        for _ in range(size):
+            startup._timer()
+
+    return timed(run, repeat)
+
+
+BENCHMARKS = [
+    ("create_menu", bench_create_menu, [50, 500, 2000]),
+    ("create_menu_dispatcher", functools.partial(bench_create_menu, dispatcher=True), [50, 500, 2000]),
+    ("menu_rescan", bench_menu_rescan, [50, 500, 2000]),
+    ("menu_rescan_dispatcher", functools.partial(bench_menu_rescan, dispatcher=True), [50, 500, 2000]),
+    ("menu_click", bench_menu_click, [50, 500]),
+    ("menu_click_dispatcher", functools.partial(bench_menu_click, dispatcher=True), [50, 500]),
+    ("sequence_scan", bench_sequence_scan, [1000, 100000]),
+    ("import_image_seq", bench_import_image_seq, [10, 100, 1000]),
+    ("timer_tick", bench_timer_tick, [1000]),
+]
+
+
+##############################################################################################################
+# entry point
+
+
+def git_revision():
+    """
+    :returns: The current git commit of the engine, if available.
+    :rtype: str or Nonetype
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ENGINE_DIR
+        ).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """
+    Print the change of each result against a previous run.
+
+    :param list(dict) results: The results of this run.
+    :param str baseline_path: Path to the JSON output of a previous run.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = dict(
+            ((result["name"], result["size"]), result)
+            for result in json.load(baseline_file)["results"]
+        )
+    for result in results:
+        old = baseline.get((result["name"], result["size"]))
+        if old is None or not old["min"]:
+            continue
+        print("{:<24} {:>8} {:>10.4f}s -> {:>10.4f}s  x{:.2f}".format(
+            result["name"], result["size"], old["min"], result["min"], result["min"] / old["min"]
+        ))
+
+
+def main():
+    """
+    Run the benchmarks.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare against the JSON results of a previous run.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark.")
+    parser.add_argument("--quick", action="store_true", help="Only run the smallest size of each benchmark.")
+    parser.add_argument("--only", action="append", help="Only run the named benchmark(s).")
+    args = parser.parse_args()
+
+    results = []
+    for name, func, sizes in BENCHMARKS:
+        if args.only and name not in args.only:
+            continue
+        for size in sizes[:1] if args.quick else sizes:
+            best, mean = func(size, args.repeat)
+            print("{:<24} {:>8} {:>10.4f}s (mean {:.4f}s)".format(name, size, best, mean))
+            results.append({"name": name, "size": size, "min": best, "mean": mean, "repeat": args.repeat})
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {
+                    "commit": git_revision(),
+                    "python": platform.python_version(),
+                    "time": time.time(),
+                    "results": results,
+                },
+                output_file,
+                indent=2,
+            )
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
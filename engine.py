@@ -3,13 +3,14 @@ A 3dequalizer4 engine for Tank.
 
 """
 from __future__ import print_function
+import atexit
+import contextlib
 import datetime
 import logging
 import os
 import re
 import shutil
-import subprocess
-import sys
+import threading
 
 import sgtk
 from sgtk.platform import Engine
@@ -17,6 +18,47 @@ from sgtk.platform import Engine
 
 class TDE4Engine(Engine):
 
+    _menu_generator = None
+    _context_switcher = None
+    _context_cache = None
+    _sequence_index = None
+    _log_sink = None
+    _log_writer = None
+    _timer_running = False
+    _main_thread_id = None
+    _startup_profiler = None
+    _menu_dir_lock = None
+    _tick_profiler = None
+    _project_sync = None
+    _footage_cache = None
+    _cached_footage = None
+    _sequence_followers = ()
+    _path_launcher = None
+    _sequence_prefetcher = None
+
+    @property
+    def menu_stats(self):
+        """
+        Running totals of the menu files written, skipped and deleted
+        while generating the Shotgun menu.
+
+        :returns: A ``{"written": int, "skipped": int, "deleted": int}`` dictionary.
+        """
+        if self._menu_generator is None:
+            return {"written": 0, "skipped": 0, "deleted": 0}
+        return dict(self._menu_generator.stats)
+
+    @property
+    def context_cache_stats(self):
+        """
+        Hit and miss statistics of the project path to context cache.
+
+        :returns: A ``{"hits": int, "misses": int, "size": int}`` dictionary.
+        """
+        if self._context_cache is None:
+            return {"hits": 0, "misses": 0, "size": 0}
+        return self._context_cache.stats
+
     @property
     def context_change_allowed(self):
         """
@@ -50,6 +92,54 @@ class TDE4Engine(Engine):
 
         return host_info
 
+    @property
+    def sequence_index(self):
+        """
+        The on disk index of image sequence scans, stored in the engine's
+        cache location. None if disabled by the ``sequence_index`` setting.
+
+        :rtype: :class:`tk_3de4.sequences.SequenceIndex` or Nonetype
+        """
+        if self._sequence_index is None and self.get_setting("sequence_index"):
+            tk_3de4 = self.import_module("tk_3de4")
+            self._sequence_index = tk_3de4.sequences.SequenceIndex(
+                os.path.join(self.cache_location, "sequence_index")
+            )
+        return self._sequence_index
+
+    @property
+    def sequence_prefetcher(self):
+        """
+        The background scans of the sequences of the publishes shown in the
+        loader. None if disabled by the ``sequence_prefetch`` setting.
+
+        :rtype: :class:`tk_3de4.SequencePrefetcher` or Nonetype
+        """
+        if self._sequence_prefetcher is None and self.get_setting("sequence_prefetch"):
+            self._sequence_prefetcher = self.import_module("tk_3de4").SequencePrefetcher(
+                max_age=self.get_setting("sequence_prefetch_max_age"), logger=self.logger
+            )
+        return self._sequence_prefetcher
+
+    @property
+    def footage_cache(self):
+        """
+        The local disk cache of imported image sequences, stored under the
+        ``footage_cache_root`` setting or the engine's cache location. None if
+        disabled by the ``footage_cache`` setting.
+
+        :rtype: :class:`tk_3de4.FootageCache` or Nonetype
+        """
+        if self._footage_cache is None and self.get_setting("footage_cache"):
+            tk_3de4 = self.import_module("tk_3de4")
+            self._footage_cache = tk_3de4.FootageCache(
+                self.get_setting("footage_cache_root") or os.path.join(self.cache_location, "footage"),
+                self.get_setting("footage_cache_max_bytes"),
+                self.get_setting("footage_cache_workers"),
+                self.logger,
+            )
+        return self._footage_cache
+
     def create_shotgun_menu(self):
         """
         Create the shotgun menu
@@ -64,6 +154,15 @@ class TDE4Engine(Engine):
                     "type": "context_menu",
                 },
             )
+            self.register_command(
+                "Timer Tick Statistics",
+                self._show_tick_statistics,
+                {
+                    "short_name": "tick_stats",
+                    "description": "Show the latency histogram of the 3DE timer callback.",
+                    "type": "context_menu",
+                },
+            )
             self.register_command(
                 "Jump to File System",
                 self._jump_to_filesystem,
@@ -73,22 +172,108 @@ class TDE4Engine(Engine):
                     "type": "context_menu",
                 },
             )
-            tk_3de4 = self.import_module("tk_3de4")
-            menu_generator = tk_3de4.MenuGenerator(self)
-            menu_generator.create_menu()
+            if self._menu_generator is None:
+                tk_3de4 = self.import_module("tk_3de4")
+                self._menu_generator = tk_3de4.MenuGenerator(self)
 
-            import tde4
-            tde4.rescanPythonDirs()
+            with self.log_span("create_menu"):
+                menu_changed = self._menu_generator.create_menu()
+            if menu_changed:
+                import tde4
+                tde4.rescanPythonDirs()
+                self._save_menu_template()
+            else:
+                self.logger.debug("Shotgun menu unchanged, skipping rescan")
 
             return True
         return False
 
+    def pre_app_init(self):
+        """
+        Executed by the system and typically implemented by deriving classes.
+        This method called before any apps are loaded.
+        """
+        tk_3de4 = self.import_module("tk_3de4")
+        if os.environ.get(tk_3de4.menu_cache.TEMPLATE_ENV):
+            # Tell the launchers cleaning up after crashed sessions that
+            # this menu folder is in use.
+            self._menu_dir_lock = tk_3de4.menu_cache.SessionLock(os.environ["TK_3DE4_MENU_DIR"])
+            if not self._menu_dir_lock.acquire():
+                self.logger.warning("Failed to lock the menu folder")
+                self._menu_dir_lock = None
+        if os.environ.get(tk_3de4.startup_profiler.PROFILE_ENV):
+            self._startup_profiler = tk_3de4.StartupProfiler()
+            self._startup_profiler.apps_started()
+        self._log_sink = tk_3de4.LogSink(self.get_setting("log_buffer_size"))
+        # The engine is started on the main thread.
+        self._main_thread_id = threading.current_thread().ident
+        self._tick_profiler = tk_3de4.TickProfiler(
+            self.logger, self.get_setting("timer_tick_budget") / 1000.0
+        )
+        if self.get_setting("local_save"):
+            self._project_sync = tk_3de4.ProjectSync(
+                os.path.join(self.cache_location, "local_saves"), self.logger
+            )
+            # 3DE has no quit callback, the engine is never destroyed when
+            # it closes.
+            atexit.register(self._close_project_sync)
+        if self.get_setting("log_file"):
+            self._log_writer = tk_3de4.JsonLinesLogWriter(
+                os.path.join(sgtk.LogManager().log_folder, "tk-3de4.jsonl"),
+                self.get_setting("log_file_max_bytes"),
+            )
+
     def post_app_init(self):
         """
         Executed by the system and typically implemented by deriving classes.
         This method called after all apps have been loaded.
         """
-        self.create_shotgun_menu()
+        if self._startup_profiler is not None:
+            self._startup_profiler.apps_finished()
+            with self._startup_profiler.phase("menu"):
+                self.create_shotgun_menu()
+        else:
+            self.create_shotgun_menu()
+
+    def register_command(self, name, callback, properties=None):
+        """
+        Register a command, see :meth:`sgtk.platform.Engine.register_command`.
+        The 3DE timer ticks running the command are kept out of the latency
+        statistics.
+        """
+        def run_command(*args, **kwargs):
+            self.exclude_tick()
+            return callback(*args, **kwargs)
+
+        super(TDE4Engine, self).register_command(name, run_command, properties)
+        if self._startup_profiler is not None and properties and "app" in properties:
+            app = properties["app"]
+            self._startup_profiler.app_command_registered(
+                getattr(app, "instance_name", app.name)
+            )
+
+    @property
+    def startup_profiler(self):
+        """
+        The profiler recording the startup phases, while the startup is being
+        profiled. None otherwise.
+
+        :rtype: :class:`tk_3de4.StartupProfiler` or Nonetype
+        """
+        return self._startup_profiler
+
+    def finish_startup_profile(self):
+        """
+        Write the startup report to the log and to the JSON file given by the
+        launcher, then stop profiling.
+        """
+        if self._startup_profiler is None:
+            return
+        tk_3de4 = self.import_module("tk_3de4")
+        self._startup_profiler.write(
+            os.environ[tk_3de4.startup_profiler.PROFILE_ENV], self.logger
+        )
+        self._startup_profiler = None
 
     def post_qt_init(self):
         """
@@ -96,6 +281,277 @@ class TDE4Engine(Engine):
         """
         self._initialize_dark_look_and_feel()
 
+        import tde4
+        tk_3de4 = self.import_module("tk_3de4")
+        cache_size = self.get_setting("context_cache_size")
+        if cache_size > 0:
+            self._context_cache = tk_3de4.ContextCache(cache_size)
+        poll_interval = self.get_setting("context_poll_interval") / 1000.0
+        self._context_switcher = tk_3de4.ContextSwitcher(
+            self, poll_interval, self._context_cache
+        )
+        self._context_switcher.start(self.project_path())
+
+    def project_path(self):
+        """
+        Get the path of the project open in 3DE. With local saves on, this is
+        the real path of the project rather than its local scratch copy.
+
+        :rtype: str
+        """
+        import tde4
+        path = tde4.getProjectPath()
+        if self._project_sync is not None:
+            path = self._project_sync.real_path(path)
+        return path
+
+    def open_project(self, path):
+        """
+        Open a project in 3DE, waiting for any pending local save sync first.
+        With the ``validate_footage_on_open`` setting on, the footage of the
+        cameras is checked once the project is loaded, and the user warned
+        about any missing.
+
+        :param str path: The project path.
+        """
+        import tde4
+        self.exclude_tick()
+        if self._project_sync is not None:
+            self._project_sync.flush()
+        tde4.loadProject(path)
+        self._cached_footage = None
+        if self.get_setting("footage_cache"):
+            self._uncache_footage()
+        if self.get_setting("validate_footage_on_open") and self.has_ui:
+            self._check_project_footage(path)
+        self.project_changed(path)
+
+    def _check_project_footage(self, path):
+        """
+        Check that the footage of the cameras of the project loaded in 3DE is
+        on disk, and warn the user about any missing.
+
+        :param str path: The project path.
+        """
+        import tde4
+        from sgtk.platform.qt import QtGui
+        footage_check = self.import_module("tk_3de4").footage_check
+        with self.log_span("check_project_footage"):
+            problems = footage_check.check_footage(
+                footage_check.camera_footage(tde4),
+                self.sequence_index,
+                self.get_setting("sequence_scan_workers"),
+            )
+        if not problems:
+            return
+
+        lines = []
+        for ref, problem in problems:
+            line = "{} ({}): {}".format(ref.path, ref.camera, problem)
+            if line not in lines:
+                lines.append(line)
+        self.logger.warning("Missing footage in '%s':\n%s", path, "\n".join(lines))
+        if len(lines) > 20:
+            lines = lines[:20] + ["... and {} more".format(len(lines) - 20)]
+        QtGui.QMessageBox.warning(
+            None,
+            "Missing footage",
+            "Some of the footage of '{}' is missing:\n\n{}".format(path, "\n".join(lines)),
+        )
+
+    def save_project(self, path, wait=False):
+        """
+        Save the project open in 3DE. With local saves on, 3DE saves to a
+        local scratch copy which is synced to ``path`` in the background.
+
+        :param str path: The project path.
+        :param bool wait: Wait for the project to be synced to ``path``.
+        :raises TankError: ``wait`` is on and the project failed to sync.
+        """
+        import tde4
+        self.exclude_tick()
+        folder = os.path.dirname(path)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        with self._source_footage():
+            if self._project_sync is not None:
+                self._project_sync.save(path, tde4.saveProject)
+            else:
+                tde4.saveProject(path)
+        self.project_changed(path)
+        if wait and self._project_sync is not None:
+            self._project_sync.flush()
+            # The failure of this save is reported by the error.
+            others = [
+                failure for failure in self._project_sync.new_failures() if failure[0] != path
+            ]
+            if others:
+                self._warn_sync_failures(others)
+            failure = self._project_sync.failures.get(path)
+            if failure is not None:
+                raise sgtk.TankError(
+                    "Failed to save '{}', the project is kept in '{}': {}".format(
+                        path, failure[0], failure[1]
+                    )
+                )
+
+    def use_cached_footage(self, cam_id, path, cached_path):
+        """
+        Point a camera at the footage cache copy of its sequence. The camera
+        is pointed back at the original sequence while :meth:`save_project`
+        saves, so projects never reference the cache of this host.
+
+        :param int cam_id: The camera.
+        :param str path: The hash path of the original sequence.
+        :param str cached_path: The hash path of the copy in the cache.
+        """
+        import tde4
+        if self._cached_footage is None:
+            self._cached_footage = {}
+        tde4.setCameraPath(cam_id, cached_path)
+        self._cached_footage[cam_id] = (path, cached_path)
+
+    @contextlib.contextmanager
+    def _source_footage(self):
+        """
+        Point the cameras using cached footage back at their original
+        sequences for the duration of the context.
+        """
+        import tde4
+        restored = []
+        if self._cached_footage:
+            cam_ids = set(tde4.getCameraList(False))
+            for cam_id, (path, cached_path) in list(self._cached_footage.items()):
+                if cam_id in cam_ids and tde4.getCameraPath(cam_id) == cached_path:
+                    tde4.setCameraPath(cam_id, path)
+                    restored.append(cam_id)
+                else:
+                    # Deleted or given another sequence since.
+                    del self._cached_footage[cam_id]
+        try:
+            yield
+        finally:
+            for cam_id in restored:
+                tde4.setCameraPath(cam_id, self._cached_footage[cam_id][1])
+
+    def _uncache_footage(self):
+        """
+        Point the cameras of the project just opened that use footage cache
+        copies back at the original sequences. Projects saved from 3DE's own
+        menus keep the cached paths.
+        """
+        import tde4
+        for cam_id in tde4.getCameraList(False):
+            path = self.footage_cache.source_path(tde4.getCameraPath(cam_id))
+            if path is not None:
+                self.logger.debug("setCameraPath: %s, %s", cam_id, path)
+                tde4.setCameraPath(cam_id, path)
+
+    def _warn_sync_failures(self, failures, closing=False):
+        """
+        Tell the user about saves which failed to sync to their real path.
+
+        :param failures: The failed real paths with their scratch copy and
+                         error message.
+        :type failures: list(tuple(str, str, str))
+        :param bool closing: Whether 3DE is closing.
+        """
+        lines = [
+            "{}\n    kept in {}\n    {}".format(real_path, local_path, error)
+            for real_path, local_path, error in failures
+        ]
+        if closing:
+            message = "The latest saves of these projects are not in the work area:"
+        else:
+            message = "Failed to save these projects to the work area:"
+        self.logger.warning("%s\n%s", message, "\n".join(lines))
+        if not self.has_ui:
+            return
+        from sgtk.platform.qt import QtGui
+        self.exclude_tick()
+        QtGui.QMessageBox.warning(
+            None,
+            "Project not saved",
+            "{}\n\n{}\n\nCopy the projects from the folders they are kept in.".format(
+                message, "\n".join(lines)
+            ),
+        )
+
+    def _close_project_sync(self):
+        """
+        Finish the pending syncs of local saves, then tell the user about the
+        projects whose latest save never made it to their real path.
+        """
+        if self._project_sync is None:
+            return
+        project_sync, self._project_sync = self._project_sync, None
+        project_sync.close()
+        failures = sorted(
+            (real_path, local_path, error)
+            for real_path, (local_path, error) in project_sync.failures.items()
+        )
+        if failures:
+            self._warn_sync_failures(failures, closing=True)
+
+    def follow_sequence(self, follower):
+        """
+        Start following an image sequence that is still being written, until
+        it is complete or the engine is destroyed.
+
+        :param follower: The sequence follower.
+        :type follower: :class:`tk_3de4.SequenceFollower`
+        """
+        follower.start_watching()
+        self._sequence_followers = [
+            other for other in self._sequence_followers if not other.done
+        ] + [follower]
+
+    def project_changed(self, path=None):
+        """
+        Called when the project open in 3DE may have changed, e.g. by the scene
+        operation hooks after opening or saving a project. The new context is
+        resolved in the background.
+
+        :param str path: The new project path. Queried from 3DE if not given.
+        """
+        if self._context_switcher is not None:
+            self._context_switcher.project_changed(path)
+
+    def timer_tick(self):
+        """
+        Called from the 3DE timer callback on the main thread. Processes the
+        Qt events and runs the engine's periodic work, timing each part.
+        """
+        from sgtk.platform.qt import QtCore
+        clock = self._tick_profiler.clock
+
+        start = clock()
+        QtCore.QCoreApplication.processEvents()
+        parts = {"process_events": clock() - start}
+        self._timer_running = True
+        self._flush_log()
+        if self._context_switcher is not None:
+            parts["project_path"], parts["context_change"] = self._context_switcher.tick()
+        if self._project_sync is not None:
+            self._project_sync.poll()
+            failures = self._project_sync.new_failures()
+            if failures:
+                self._warn_sync_failures(failures)
+        if self._footage_cache is not None:
+            self._footage_cache.tick()
+        for follower in self._sequence_followers:
+            follower.tick()
+        self._tick_profiler.add(clock() - start, parts)
+
+    def exclude_tick(self):
+        """
+        Keep the current 3DE timer tick out of the latency statistics, as it
+        runs a command, a dialog or a hook, which are slow by nature. Called
+        between ticks, the next tick is kept out.
+        """
+        if self._tick_profiler is not None:
+            self._tick_profiler.exclude_tick()
+
     def post_context_change(self, old_context, new_context):
         """
         Called after a context change.
@@ -106,6 +562,8 @@ class TDE4Engine(Engine):
         :type new_context: :class:`~sgtk.Context`
         """
         self.create_shotgun_menu()
+        if self._path_launcher is not None:
+            self._path_launcher.warm_up(lambda: new_context.filesystem_locations)
 
     def destroy_engine(self):
         """
@@ -113,6 +571,18 @@ class TDE4Engine(Engine):
         Implemented by deriving classes.
         """
         self.logger.debug("%s: Destroying...", self)
+        self._context_switcher = None
+        self._close_project_sync()
+        if self._footage_cache is not None:
+            self._footage_cache.close()
+            self._footage_cache = None
+        for follower in self._sequence_followers:
+            follower.stop()
+        self._sequence_followers = ()
+        self._flush_log()
+        if self._log_writer is not None:
+            self._log_writer.close()
+            self._log_writer = None
         self._cleanup_folders()
 
     @property
@@ -156,11 +626,52 @@ class TDE4Engine(Engine):
         :param record: Std python logging record
         :type record: :class:`~python.logging.LogRecord`
         """
-        log_debug = record.levelno < logging.INFO and sgtk.LogManager().global_debug
-        log_info_above = record.levelno >= logging.INFO
-        if log_debug or log_info_above:
+        if self._log_writer is not None:
+            self._log_writer.push(record)
+        if record.levelno < logging.INFO and not sgtk.LogManager().global_debug:
+            return
+        if self._log_sink is None:
+            # Too early for the queue, write straight away.
             msg = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
             print(msg, handler.format(record))
+            return
+        self._log_sink.push(handler, record)
+        # Until the 3DE timer flushes the queue, flush from the main thread.
+        if not self._timer_running and threading.current_thread().ident == self._main_thread_id:
+            self._flush_log()
+
+    @property
+    def log_records_dropped(self):
+        """
+        The number of log records dropped because the log queue was full.
+
+        :rtype: int
+        """
+        if self._log_sink is None:
+            return 0
+        return self._log_sink.dropped
+
+    def log_span(self, tag):
+        """
+        Time a block of code, logging the elapsed time tagged with ``tag`` so
+        it can be aggregated from the log file::
+
+            with engine.log_span("create_menu"):
+                ...
+
+        :param str tag: The name of the span.
+        :rtype: :class:`tk_3de4.LogSpan`
+        """
+        tk_3de4 = self.import_module("tk_3de4")
+        return tk_3de4.LogSpan(self.logger, tag)
+
+    def _flush_log(self):
+        """
+        Write the queued log records to the 3DE console. Must be called from
+        the main thread.
+        """
+        if self._log_sink is not None:
+            self._log_sink.flush(print)
 
     def _create_dialog(self, title, bundle, widget, parent):
         """
@@ -173,6 +684,7 @@ class TDE4Engine(Engine):
         :type widget: :class:`PySide.QtGui.QWidget`
         """
         from sgtk.platform.qt import QtCore
+        self.exclude_tick()
         dialog = super(TDE4Engine, self)._create_dialog(title, bundle, widget, parent)
         dialog.setWindowFlags(dialog.windowFlags() | QtCore.Qt.WindowStaysOnTopHint)
         dialog.setWindowState(
@@ -192,35 +704,55 @@ class TDE4Engine(Engine):
         url = self.context.shotgun_url
         QtGui.QDesktopServices.openUrl(QtCore.QUrl(url))
 
+    def _show_tick_statistics(self):
+        """
+        Show the latency histogram of the 3DE timer callback.
+        """
+        from sgtk.platform.qt import QtGui
+        report = self._tick_profiler.report()
+        self.logger.info("3DE timer tick statistics:\n%s", report)
+        QtGui.QMessageBox.information(
+            None, "Timer Tick Statistics", "<pre>{}</pre>".format(report)
+        )
+
     def _jump_to_filesystem(self):
         """
         Jump from context to the filesystem
         """
         # launch one window for each location on disk
-        paths = self.context.filesystem_locations
-        # get the setting
-        system = sys.platform
-        # run the app
-        if system == "linux2":
-            cmd = ["xdg-open"]
-        elif system == "darwin":
-            cmd = ["open"]
-        elif system == "win32":
-            cmd = ["cmd.exe", "/C", "start", "Folder"]
-        else:
-            raise Exception("Platform '%s' is not supported." % system)
-        for disk_location in paths:
-            args = cmd + [disk_location]
-            try:
-                subprocess.check_call(args)
-            except Exception as error:
-                cmdline = subprocess.list2cmdline(args)
-                self.logger.exception("Failed to launch '%s'!", cmdline)
+        if self._path_launcher is None:
+            self._path_launcher = self.import_module("tk_3de4").PathLauncher(self.logger)
+        context = self.context
+        self._path_launcher.open(lambda: context.filesystem_locations)
+
+    def _save_menu_template(self):
+        """
+        Save the menu folder as the template seeding the menu folders of the
+        next sessions, when the launcher asked for persistent menus. The
+        template is filed under the manifest of the commands just rendered.
+        """
+        tk_3de4 = self.import_module("tk_3de4")
+        templates_root = os.environ.get(tk_3de4.menu_cache.TEMPLATE_ENV)
+        if not templates_root:
+            return
+        template_dir = tk_3de4.menu_cache.template_for_manifest(
+            templates_root, os.environ.get(tk_3de4.deferred_start.MANIFEST_ENV, "")
+        )
+        if template_dir is None:
+            self.logger.debug("No command manifest, not saving the menu template")
+            return
+        try:
+            tk_3de4.menu_cache.save_template(os.environ["TK_3DE4_MENU_DIR"], template_dir)
+        except (IOError, OSError):
+            self.logger.exception("Failed to save menu template '%s'", template_dir)
 
     def _cleanup_folders(self):
         """
         Clean up the menu folders for the engine.
         """
+        if self._menu_dir_lock is not None:
+            self._menu_dir_lock.release()
+            self._menu_dir_lock = None
         custom_scripts_dir_path = os.environ["TK_3DE4_MENU_DIR"]
         if os.path.isdir(custom_scripts_dir_path):
             shutil.rmtree(custom_scripts_dir_path)
@@ -21,8 +21,7 @@ replaced by:
    ``env/includes/app_locations.yml:apps.tk-multi-loader2.location``
 """
 import errno
-import glob
-from itertools import groupby, izip
+from multiprocessing.pool import ThreadPool
 import os
 import re
 import sgtk
@@ -32,6 +31,10 @@ import tde4
 
 
 HookBaseClass = sgtk.get_hook_baseclass()
+sequences = sgtk.platform.current_engine().import_module("tk_3de4").sequences
+
+#: The action instances generated for the ``import_image_seq`` action.
+IMPORT_IMAGE_SEQ_ACTIONS = ("import_image_seq", "import_image_seq_live", "import_image_seq_batch")
 
 
 class FileExistenceError(OSError):
@@ -47,74 +50,117 @@ class FileExistenceError(OSError):
         super(FileExistenceError, self).__init__(errno.ENOENT, message, path)
 
 
-def frames_diff(frames):
-    """
-    Key func for grouping frames by the difference between frames.
-
-    :param tuple frames: The current and next frame number.
+def get_hash_path_and_range_info_from_seq(path, index=None, scan=None):
     """
-    return frames[1] - frames[0]
-
+    Get the path sequence in a format that 3DE can read (####), with the start,
+    end and step of the sequence.
 
-def get_frame_numbers(paths):
-    """
-    Get the list of frame numbers from a file sequence.
+    :param str path: The path supplied from shotgun.
+    :param index: Optional :class:`tk_3de4.sequences.SequenceIndex` of previous scans.
+    :param scan: Optional replacement for :func:`tk_3de4.sequences.scan_sequence`,
+                 e.g. using prefetched scans.
 
-    :param list(str) paths: The list of paths to extract the frames from.
+    :rtype: tuple(str, int, int, int)
 
-    :return: The list of frame numbers.
+    :raises ValueError: Frame step is not consistent, indicating missing frames.
+    :raises FileExistenceError: The path does not exist on disk.
     """
-    numbers = []
-    frame_pattern = re.compile(r"\.(\d+)\.")
-    for path in paths:
-        match = frame_pattern.search(path)
-        if match:
-            numbers.append(int(match.group(1)))
-    return sorted(numbers)
+    if sequences.parse_sequence_path(path) is None:
+        return path, 1, 1, 1
+    info = (scan or sequences.scan_sequence)(path, index)
+    if info is None:
+        raise FileExistenceError(path)
+    if info.missing:
+        raise ValueError("Inconsistent frame steps")
+    return info.hash_path, info.start, info.end, info.step
 
 
-def get_hash_path_and_range_info_from_seq(path):
+def get_live_range_info_from_seq(path, index=None):
     """
     Get the path sequence in a format that 3DE can read (####), with the start,
-    end and step of the sequence.
+    end and step of the frames on disk without gaps from the first frame, for
+    sequences still being written.
 
     :param str path: The path supplied from shotgun.
+    :param index: Optional :class:`tk_3de4.sequences.SequenceIndex` of previous scans.
 
     :rtype: tuple(str, int, int, int)
 
-    :raises ValueError: Frame step is not consistent, indicating missing frames.
     :raises FileExistenceError: The path does not exist on disk.
     """
-    frame_pattern = re.compile(r"(%0(\d+)d)")
-    frame_match = frame_pattern.search(path)
-    start, end, step = 1, 1, 1
-    if frame_match:
-        has_frame_spec = True
-        frame_spec = frame_match.group(1)
-        glob_path = path.replace(frame_spec, "*")
-        frame_files = glob.glob(glob_path)
-        numbers = get_frame_numbers(frame_files)
-        steps = []
-        if not frame_files:
-            raise FileExistenceError(path)
-        for step, _ in groupby(izip(numbers[:-1], numbers[1:]), frames_diff):
-            steps.append(step)
-        if len(steps) > 1:
-            raise ValueError("Inconsistent frame steps")
-        path = path.replace(frame_spec, "#" * int(frame_match.group(2)))
-        start, end, step = min(numbers), max(numbers), steps[0]
-    return path, start, end, step
-
-
-def is_sequence_camera(cam_id):
+    if sequences.parse_sequence_path(path) is None:
+        return path, 1, 1, 1
+    info = sequences.scan_sequence(path, index)
+    if info is None:
+        raise FileExistenceError(path)
+    end = info.missing[0][0] - info.step if info.missing else info.end
+    return info.hash_path, info.start, end, info.step
+
+
+def camera_name_from_publish(path, sg_publish_data):
     """
-    Check camera is a sequence camera.
+    Get the name of the camera of a plate.
 
-    :param int cam_id: The 3DE camera id.
+    :param str path: The path of the plate.
+    :param dict sg_publish_data: Shotgun data dictionary with all the standard publish fields.
 
-    :rtype: bool
+    :rtype: str
     """
-    return tde4.getCameraType(cam_id) == "SEQUENCE"
+    name = sg_publish_data.get("name")
+    if not name:
+        spec = sequences.parse_sequence_path(path)
+        name = spec.prefix if spec is not None else os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"\W+", "_", name).strip("_") or "plate"
+
+
+def allocate_camera_names(name, count, existing_names):
+    """
+    Allocate unique camera names in a single pass: ``name``, then
+    ``name__01``, ``name__02`` and so on, skipping any name already in use.
+
+    :param str name: The base camera name.
+    :param int count: The number of names to allocate.
+    :param set existing_names: The camera names already in use. Updated with
+                               the allocated names.
+
+    :rtype: list(str)
+    """
+    names = []
+    index = 0
+    cam_name = name
+    for _ in range(count):
+        while cam_name in existing_names:
+            index += 1
+            cam_name = "{}__{:02}".format(name, index)
+        existing_names.add(cam_name)
+        names.append(cam_name)
+    return names
+
+
+class CallCounter(object):
+    """
+    Wraps a module, counting the calls made to its functions.
+    """
+    def __init__(self, module):
+        """
+        Initialise the class.
+        :param module: The module to wrap, e.g. ``tde4``.
+        """
+        self._module = module
+        self.calls = 0
+
+    def __getattr__(self, name):
+        """
+        Get a counting wrapper around a function of the module.
+        :param str name: The name of the function.
+        """
+        func = getattr(self._module, name)
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return func(*args, **kwargs)
+        return counted
+
 
 class TDE4Actions(HookBaseClass):
 
@@ -169,12 +215,35 @@ class TDE4Actions(HookBaseClass):
         action_instances = []
 
         if "import_image_seq" in actions:
+            # Frames on disk, if the sequence was scanned already.
+            frames = self._prefetch_image_seq(sg_publish_data)
             action_instances.append(
                 {
                     "name": "import_image_seq",
                     "params": {},
                     "caption": "Import Sequence",
-                    "description": "Import image sequence and attach to selected sequence camera(s).",
+                    "description": "Import image sequence and attach to selected sequence "
+                                   "camera(s).{}".format(frames),
+                }
+            )
+            action_instances.append(
+                {
+                    "name": "import_image_seq_live",
+                    "params": {},
+                    "caption": "Import Growing Sequence",
+                    "description": "Import an image sequence still being written and attach to "
+                                   "selected sequence camera(s), extending their range as frames "
+                                   "arrive.{}".format(frames),
+                }
+            )
+            action_instances.append(
+                {
+                    "name": "import_image_seq_batch",
+                    "params": {},
+                    "caption": "Import Sequence to Own Camera",
+                    "description": "Import image sequence to the sequence camera named after the "
+                                   "publish, creating it if needed. Select several publishes to "
+                                   "import each to its own camera.{}".format(frames),
                 }
             )
 
@@ -200,16 +269,59 @@ class TDE4Actions(HookBaseClass):
             version of the loader.
 
         .. note::
-            The hook will stop applying the actions on the selection if an error
-            is raised midway through.
+            Image sequences are resolved concurrently before any camera is
+            touched. Sequences that fail to resolve are reported together at
+            the end, without stopping the others from being imported.
 
         :param list actions: Action dictionaries.
         """
+        app = self.parent
+        app.engine.exclude_tick()
+        imports = []
         for single_action in actions:
             name = single_action["name"]
             sg_publish_data = single_action["sg_publish_data"]
             params = single_action["params"]
-            self.execute_action(name, params, sg_publish_data)
+            if name in IMPORT_IMAGE_SEQ_ACTIONS:
+                path = self._get_publish_path(sg_publish_data)
+                imports.append((path, sg_publish_data, name))
+            else:
+                self.execute_action(name, params, sg_publish_data)
+
+        if not imports:
+            return
+
+        # Disk and Shotgun access first, concurrently...
+        with app.engine.log_span("resolve_image_seqs"):
+            seq_infos, expected_ends = self._resolve_imports(
+                [path for path, _, _ in imports],
+                [name == "import_image_seq_live" for _, _, name in imports],
+                [sg_publish_data for _, sg_publish_data, _ in imports],
+            )
+
+        # ...then the 3DE updates, on the main thread.
+        errors = []
+        warnings = []
+        batch = []
+        for (path, sg_publish_data, name), seq_info, expected_end in zip(
+            imports, seq_infos, expected_ends
+        ):
+            if isinstance(seq_info, Exception):
+                errors.append((path, seq_info))
+            elif name == "import_image_seq_batch":
+                batch.append((path, sg_publish_data, seq_info))
+            else:
+                warning = self._import_image_seq(
+                    path, sg_publish_data, seq_info, name == "import_image_seq_live", report=False,
+                    expected_end=expected_end,
+                )
+                if warning is not None and warning not in warnings:
+                    warnings.append(warning)
+
+        if batch:
+            self._show_batch_summary(self._import_image_seqs_to_cameras(batch), errors)
+        elif errors or warnings:
+            self._show_import_problems(errors, warnings)
 
     def execute_action(self, name, params, sg_publish_data):
         """
@@ -228,63 +340,408 @@ class TDE4Actions(HookBaseClass):
             params,
             sg_publish_data
         )
+        app.engine.exclude_tick()
 
         # resolve path
         # toolkit uses utf-8 encoded strings internally and Maya API expects unicode
         # so convert the path to ensure filenames containing complex characters are supported
-        path = self.get_publish_path(sg_publish_data).decode("utf-8")
+        path = self._get_publish_path(sg_publish_data)
 
-        if name == "import_image_seq":
-            self._import_image_seq(path, sg_publish_data)
+        if name == "import_image_seq_batch":
+            seq_info = self._resolve_image_seqs([path], None, [sg_publish_data.get("id")])[0]
+            if isinstance(seq_info, Exception):
+                self._show_batch_summary([], [(path, seq_info)])
+            else:
+                self._show_batch_summary(
+                    self._import_image_seqs_to_cameras([(path, sg_publish_data, seq_info)]), []
+                )
+        elif name in IMPORT_IMAGE_SEQ_ACTIONS:
+            self._import_image_seq(path, sg_publish_data, live=name == "import_image_seq_live")
 
     ##############################################################################################################
     # helper methods which can be subclassed in custom hooks to fine tune the behaviour of things
 
-    def _import_image_seq(self, path, sg_publish_data):
+    def _get_publish_path(self, sg_publish_data):
+        """
+        Get the path of a publish as a unicode string. Toolkit returns utf-8
+        encoded strings on Python 2.
+
+        :param dict sg_publish_data: Shotgun data dictionary with all the standard publish fields.
+        :rtype: str
+        """
+        path = self.get_publish_path(sg_publish_data)
+        if isinstance(path, bytes):
+            path = path.decode("utf-8")
+        return path
+
+    def _prefetch_image_seq(self, sg_publish_data):
+        """
+        Queue the background scan of the sequence of a publish, if not done
+        recently.
+
+        :param dict sg_publish_data: Shotgun data dictionary with all the standard publish fields.
+        :returns: A description suffix giving the frames on disk, if the
+                  sequence was scanned already, else an empty string.
+        :rtype: str
+        """
+        prefetcher = self.parent.engine.sequence_prefetcher
+        if prefetcher is None:
+            return ""
+        try:
+            path = self._get_publish_path(sg_publish_data)
+        except (sgtk.TankError, UnicodeDecodeError) as error:
+            self.parent.logger.debug(
+                "Not prefetching publish %s: %s", sg_publish_data.get("id"), error
+            )
+            return ""
+        if not path or sequences.parse_sequence_path(path) is None:
+            return ""
+        found, info = prefetcher.lookup(sg_publish_data.get("id"), path)
+        if not found:
+            prefetcher.prefetch(sg_publish_data.get("id"), path, self.parent.engine.sequence_index)
+            return ""
+        if info is None:
+            return " No frames found on disk."
+        if info.missing:
+            return " Frames {}-{} on disk, with {} gap{}.".format(
+                info.start, info.end, len(info.missing), "s" if len(info.missing) > 1 else ""
+            )
+        return " Frames {}-{} on disk.".format(info.start, info.end)
+
+    def _resolve_image_seqs(self, paths, live=None, publish_ids=None):
+        """
+        Resolve several image sequences concurrently, on a pool of
+        ``sequence_scan_workers`` threads.
+
+        :param list(str) paths: The file paths to resolve.
+        :param list(bool) live: For each path, whether the sequence is still
+                                being written. None if none of them are.
+        :param list(int) publish_ids: For each path, the id of its publish,
+                                      to use the prefetched scans.
+        :returns: For each path, either its hash path and range, as returned by
+                  :func:`get_hash_path_and_range_info_from_seq` or
+                  :func:`get_live_range_info_from_seq`, or the error raised
+                  while resolving it.
+        :rtype: list
+        """
+        index = self.parent.engine.sequence_index
+        prefetcher = self.parent.engine.sequence_prefetcher
+
+        def resolve(args):
+            path, live, publish_id = args
+            try:
+                if live:
+                    return get_live_range_info_from_seq(path, index)
+                scan = None
+                if prefetcher is not None and publish_id is not None:
+                    scan = prefetcher.scanner(publish_id)
+                return get_hash_path_and_range_info_from_seq(path, index, scan)
+            except (OSError, ValueError) as error:
+                return error
+
+        args = list(zip(
+            paths, live or [False] * len(paths), publish_ids or [None] * len(paths)
+        ))
+        workers = min(len(paths), self.parent.engine.get_setting("sequence_scan_workers"))
+        if workers <= 1:
+            return [resolve(arg) for arg in args]
+        pool = ThreadPool(workers)
+        try:
+            return pool.map(resolve, args)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _resolve_imports(self, paths, live, sg_publishes):
+        """
+        Resolve several image sequences concurrently, while querying the last
+        frame expected for those still being written from another thread.
+
+        :param list(str) paths: The file paths to resolve.
+        :param list(bool) live: For each path, whether the sequence is still
+                                being written.
+        :param list(dict) sg_publishes: For each path, the Shotgun data of
+                                        its publish.
+        :returns: For each path, its resolved sequence as returned by
+                  :meth:`_resolve_image_seqs`, and its expected last frame,
+                  None if unknown or not live.
+        :rtype: tuple(list, list)
+        """
+        publish_ids = [sg_publish_data.get("id") for sg_publish_data in sg_publishes]
+        live_publishes = [
+            sg_publish_data for sg_publish_data, is_live in zip(sg_publishes, live) if is_live
+        ]
+        if not live_publishes:
+            return self._resolve_image_seqs(paths, None, publish_ids), [None] * len(paths)
+        pool = ThreadPool(1)
+        try:
+            query = pool.apply_async(self._get_expected_last_frames, (live_publishes,))
+            seq_infos = self._resolve_image_seqs(paths, live, publish_ids)
+            live_ends = iter(query.get())
+        finally:
+            pool.close()
+            pool.join()
+        return seq_infos, [next(live_ends) if is_live else None for is_live in live]
+
+    def _import_image_seq(self, path, sg_publish_data, seq_info=None, live=False, report=True,
+                          expected_end=None):
         """
         Import and image sequence and assign it to the selected cameras.
 
         :param str path: The file path to load.
         :param dict sg_publish_data: Shotgun data dictionary with all the standard publish fields.
+        :param tuple seq_info: The already resolved hash path and range of the
+                               sequence. Resolved from ``path`` if not given.
+        :param bool live: Whether the sequence is still being written, in which
+                          case the camera range follows the frames written.
+        :param bool report: Whether to show why the sequence couldn't be
+                            assigned, rather than return it.
+        :param int expected_end: The last frame of a live sequence once
+                                 complete, if known. Queried along with
+                                 ``seq_info`` if that isn't given.
+        :returns: The title and text of the warning when the sequence couldn't
+                  be assigned and ``report`` is False, None otherwise.
+        :rtype: tuple(str, str) or Nonetype
         """
         app = self.parent
-        path, start, end, step = get_hash_path_and_range_info_from_seq(path)
+        if seq_info is None:
+            seq_infos, expected_ends = self._resolve_imports([path], [live], [sg_publish_data])
+            seq_info, expected_end = seq_infos[0], expected_ends[0]
+            if isinstance(seq_info, Exception):
+                raise seq_info
+        path, start, end, step = seq_info
         name = app.engine.context.entity["name"]
 
-        if tde4.getNoCameras():
-            selected_cameras = filter(is_sequence_camera, tde4.getCameraList(True))
+        api = CallCounter(tde4)
+        if api.getNoCameras():
+            selected_cameras = [
+                cam_id for cam_id in api.getCameraList(True)
+                if api.getCameraType(cam_id) == "SEQUENCE"
+            ]
             if selected_cameras:
                 app.logger.info("%d sequence cameras selected, assigning to all", len(selected_cameras))
+                camera_names = dict(
+                    (cam_id, api.getCameraName(cam_id)) for cam_id in api.getCameraList(False)
+                )
+                to_rename = []
                 for cam_id in selected_cameras:
-                    current_name = tde4.getCameraName(cam_id)
+                    current_name = camera_names[cam_id]
                     app.logger.debug("Current camera: '%s'", current_name)
                     if current_name.startswith(name):
                         app.logger.info("'%s' already has name referring to Shot", current_name)
                     else:
-                        cam_name = name
-                        count = 0
-                        while tde4.findCameraByName(cam_name):
-                            count += 1
-                            cam_name = "{}__{:02}".format(name, count)
-                        app.logger.info("Renaming '%s' to '%s'", current_name, cam_name)
-                        tde4.setCameraName(cam_id, cam_name)
+                        to_rename.append(cam_id)
+                new_names = allocate_camera_names(name, len(to_rename), set(camera_names.values()))
+                for cam_id, cam_name in zip(to_rename, new_names):
+                    app.logger.info("Renaming '%s' to '%s'", camera_names[cam_id], cam_name)
+                    api.setCameraName(cam_id, cam_name)
+                for cam_id in selected_cameras:
                     app.logger.debug("setCameraSequenceAttr: %s, %d, %d, %d", cam_id, start, end, step)
-                    tde4.setCameraSequenceAttr(cam_id, start, end, step)
+                    api.setCameraSequenceAttr(cam_id, start, end, step)
                     app.logger.debug("setCameraFrameOffset: %s, %d", cam_id, start)
-                    tde4.setCameraFrameOffset(cam_id, start)
+                    api.setCameraFrameOffset(cam_id, start)
                     app.logger.debug("setCameraFrameRangeCalculationFlag: %s, 1", cam_id)
-                    tde4.setCameraFrameRangeCalculationFlag(cam_id, 1)
+                    api.setCameraFrameRangeCalculationFlag(cam_id, 1)
                     app.logger.debug("setCameraPath: %s, %s", cam_id, path)
-                    tde4.setCameraPath(cam_id, path)
-            else:
-                QtGui.QMessageBox.warning(
-                    None,
-                    "No sequence cameras selected",
-                    "Please select a sequence camera and try again"
+                    api.setCameraPath(cam_id, path)
+                app.logger.debug(
+                    "Assigned '%s' to %d cameras with %d tde4 calls",
+                    path, len(selected_cameras), api.calls
                 )
+                if live:
+                    self._follow_sequence(path, start, end, step, selected_cameras, expected_end)
+                else:
+                    self._cache_footage(path, start, end, step, selected_cameras)
+                return None
+            warning = ("No sequence cameras selected", "Please select a sequence camera and try again")
         else:
-            QtGui.QMessageBox.warning(
-                None,
-                "No cameras exist",
-                "Please create a sequence camera and try again"
+            warning = ("No cameras exist", "Please create a sequence camera and try again")
+        if not report:
+            return warning
+        QtGui.QMessageBox.warning(None, *warning)
+        return None
+
+    def _import_image_seqs_to_cameras(self, plates):
+        """
+        Import image sequences to the sequence cameras named after their
+        publishes, creating the missing cameras, in a single pass.
+
+        :param list plates: The path, Shotgun publish data and resolved hash
+                            path and range of each sequence.
+        :returns: The camera name, sequence path and whether the camera was
+                  created, for each sequence.
+        :rtype: list(tuple(str, str, bool))
+        """
+        app = self.parent
+        api = CallCounter(tde4)
+        cameras = dict((api.getCameraName(cam_id), cam_id) for cam_id in api.getCameraList(False))
+        used_names = set(cameras)
+        assigned = set()
+        results = []
+        for path, sg_publish_data, (hash_path, start, end, step) in plates:
+            cam_name = camera_name_from_publish(path, sg_publish_data)
+            cam_id = cameras.get(cam_name)
+            created = cam_id is None or cam_id in assigned or api.getCameraType(cam_id) != "SEQUENCE"
+            if created:
+                if cam_id is not None:
+                    cam_name = allocate_camera_names(cam_name, 1, used_names)[0]
+                used_names.add(cam_name)
+                cam_id = api.createCamera("SEQUENCE")
+                api.setCameraName(cam_id, cam_name)
+                cameras[cam_name] = cam_id
+            assigned.add(cam_id)
+            api.setCameraSequenceAttr(cam_id, start, end, step)
+            api.setCameraFrameOffset(cam_id, start)
+            api.setCameraFrameRangeCalculationFlag(cam_id, 1)
+            api.setCameraPath(cam_id, hash_path)
+            self._cache_footage(hash_path, start, end, step, [cam_id])
+            results.append((cam_name, hash_path, created))
+        app.logger.debug(
+            "Assigned %d sequences to cameras with %d tde4 calls", len(plates), api.calls
+        )
+        return results
+
+    def _show_import_problems(self, errors, warnings):
+        """
+        Report the sequences that failed to import in a single message.
+
+        :param list errors: The path and error of each sequence that failed to resolve.
+        :param list warnings: The title and text of each distinct reason a
+                              sequence couldn't be assigned to cameras.
+        """
+        lines = ["{}. {}".format(title, text) for title, text in warnings]
+        if errors:
+            if lines:
+                lines.append("")
+            lines.append("The following sequences could not be imported:")
+            lines.extend("{}: {}".format(path, error) for path, error in errors)
+        self.parent.logger.warning("Import problems:\n%s", "\n".join(lines))
+        title = warnings[0][0] if warnings and not errors else "Failed to import sequences"
+        QtGui.QMessageBox.warning(None, title, "\n".join(lines))
+
+    def _show_batch_summary(self, results, errors):
+        """
+        Report the outcome of a batch import in a single message.
+
+        :param list results: As returned by :meth:`_import_image_seqs_to_cameras`.
+        :param list errors: The path and error of each sequence that failed to resolve.
+        """
+        lines = [
+            "{} camera '{}': {}".format("Created" if created else "Updated", cam_name, hash_path)
+            for cam_name, hash_path, created in results
+        ]
+        if errors:
+            lines.append("")
+            lines.append("The following sequences could not be imported:")
+            lines.extend("{}: {}".format(path, error) for path, error in errors)
+        log = self.parent.logger.warning if errors else self.parent.logger.info
+        log("Batch import:\n%s", "\n".join(lines))
+        if errors:
+            QtGui.QMessageBox.warning(None, "Imported sequences", "\n".join(lines))
+        else:
+            QtGui.QMessageBox.information(None, "Imported sequences", "\n".join(lines))
+
+    def _cache_footage(self, path, start, end, step, cam_ids):
+        """
+        Copy an image sequence to the engine's footage cache, if enabled, and
+        point the cameras at the local copy once it is usable. The engine
+        points them back at ``path`` whenever it saves the project.
+
+        :param str path: The hash path of the sequence.
+        :param int start: The first frame.
+        :param int end: The last frame.
+        :param int step: The frame step.
+        :param list(int) cam_ids: The cameras using the sequence.
+        """
+        app = self.parent
+        cache = app.engine.footage_cache
+        spec = sequences.parse_sequence_path(path)
+        if cache is None or spec is None or not cam_ids:
+            return
+
+        # 3DE numbers the frames of a camera from 1.
+        current_frame = start + (tde4.getCurrentFrame(cam_ids[0]) - 1) * step
+
+        def repoint(cached_path):
+            for cam_id in cam_ids:
+                # Leave alone the cameras given another sequence since.
+                if tde4.getCameraPath(cam_id) == path:
+                    app.logger.debug("setCameraPath: %s, %s", cam_id, cached_path)
+                    app.engine.use_cached_footage(cam_id, path, cached_path)
+
+        cache.request(spec, list(range(start, end + 1, step)), current_frame, repoint)
+
+    def _follow_sequence(self, path, start, end, step, cam_ids, expected_end=None):
+        """
+        Extend the range of the cameras using an image sequence as its frames
+        are written, until the range expected for the publish is on disk.
+
+        :param str path: The hash path of the sequence.
+        :param int start: The first frame.
+        :param int end: The last frame on disk without gaps.
+        :param int step: The frame step.
+        :param list(int) cam_ids: The cameras using the sequence.
+        :param int expected_end: The last frame of the complete sequence, or
+                                 None to follow it as long as frames arrive.
+        """
+        app = self.parent
+        spec = sequences.parse_sequence_path(path)
+        if spec is None or (expected_end is not None and end >= expected_end):
+            self._cache_footage(path, start, end, step, cam_ids)
+            return
+
+        def cameras():
+            # Leave alone the cameras deleted or given another sequence since.
+            existing = set(tde4.getCameraList(False))
+            return [
+                cam_id for cam_id in cam_ids
+                if cam_id in existing and tde4.getCameraPath(cam_id) == path
+            ]
+
+        def extend(new_end):
+            for cam_id in cameras():
+                tde4.setCameraSequenceAttr(cam_id, start, new_end, step)
+            app.logger.debug("Extended '%s' to frame %d", path, new_end)
+
+        def done(last):
+            app.logger.info("Stopped following '%s' at frame %d", path, last)
+            self._cache_footage(path, start, last, step, cameras())
+
+        app.logger.info(
+            "Following '%s' from frame %d up to %s", path, end, expected_end or "the last frame written"
+        )
+        follower = app.engine.import_module("tk_3de4").SequenceFollower(
+            spec, start, end, step, expected_end, extend, done
+        )
+        app.engine.follow_sequence(follower)
+
+    def _get_expected_last_frames(self, sg_publishes):
+        """
+        Get the last frame of sequence publishes once complete, from the
+        field named by the engine's ``sequence_last_frame_field`` setting on
+        the Versions they are linked to, in a single query. Called from a
+        background thread.
+
+        :param list(dict) sg_publishes: Shotgun data dictionaries with all the
+                                        standard publish fields.
+        :returns: For each publish, its last frame, or None if unknown.
+        :rtype: list
+        """
+        app = self.parent
+        field = app.engine.get_setting("sequence_last_frame_field")
+        version_ids = [
+            (sg_publish_data.get("version") or {}).get("id") for sg_publish_data in sg_publishes
+        ]
+        if not field or not any(version_ids):
+            return [None] * len(sg_publishes)
+        if field not in app.shotgun.schema_field_read("Version"):
+            app.logger.debug(
+                "Versions have no '%s' field, following sequences up to the last frame written",
+                field,
             )
+            return [None] * len(sg_publishes)
+        sg_versions = app.shotgun.find(
+            "Version", [["id", "in", [version_id for version_id in version_ids if version_id]]], [field]
+        )
+        last_frames = dict((sg_version["id"], sg_version.get(field)) for sg_version in sg_versions)
+        return [last_frames.get(version_id) for version_id in version_ids]
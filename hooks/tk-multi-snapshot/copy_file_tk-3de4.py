@@ -0,0 +1,64 @@
+"""
+Copy file hook for tk-multi-snapshot, storing 3DE4 project snapshots as
+deduplicated, compressed chunks.
+
+Snapshots of ``.3de`` projects are written as small manifests, with their
+content in a chunk store folder next to them. Copying a manifest back, when
+restoring a snapshot, rebuilds the project file. Other files are copied as is.
+The chunks of deleted snapshots are removed when the next snapshot is taken.
+
+To use it, set ``hook_copy_file`` in the tk-multi-snapshot settings to
+``{engine}/tk-multi-snapshot/copy_file_tk-3de4.py``.
+
+"""
+import os
+import shutil
+
+from tank import Hook
+
+
+class CopyFile(Hook):
+    """
+    Hook called to copy a file to or from the snapshot area.
+    """
+
+    def execute(self, source_path, target_path, **kwargs):
+        """
+        Main hook entry point
+
+        :source_path:   String
+                        Source file path to copy
+
+        :target_path:   String
+                        Target file path to copy to
+        """
+        snapshot_store = self.parent.engine.import_module("tk_3de4").snapshot_store
+
+        # create the folder if it doesn't exist
+        dirname = os.path.dirname(target_path)
+        if not os.path.isdir(dirname):
+            old_umask = os.umask(0)
+            os.makedirs(dirname, 0o777)
+            os.umask(old_umask)
+
+        if snapshot_store.is_manifest(source_path):
+            snapshot_store.SnapshotStore.for_snapshot(source_path).restore(source_path, target_path)
+        elif target_path.endswith(".3de"):
+            store = snapshot_store.SnapshotStore.for_snapshot(target_path)
+            chunks, new_chunks, written = store.snapshot(source_path, target_path)
+            self.parent.logger.debug(
+                "Snapshot '%s': %d of %d chunks new, %d bytes stored",
+                target_path, new_chunks, chunks, written,
+            )
+            # Free the chunks of the snapshots deleted since the last one.
+            try:
+                removed, freed = store.collect_garbage(dirname)
+            except (IOError, OSError, ValueError) as error:
+                self.parent.logger.warning("Failed to clean up '%s': %s", store.root, error)
+            else:
+                if removed:
+                    self.parent.logger.debug(
+                        "Removed %d unused chunks, %d bytes, from '%s'", removed, freed, store.root
+                    )
+        else:
+            shutil.copy(source_path, target_path)
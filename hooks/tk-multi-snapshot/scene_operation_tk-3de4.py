@@ -40,11 +40,12 @@ class SceneOperation(Hook):
 
         if operation == "current_path":
             # return the current scene path
-            return tde4.getProjectPath()
+            return self.parent.engine.project_path()
         elif operation == "open":
             # do new scene as Maya doesn't like opening 
             # the scene it currently has open!   
-            tde4.loadProject(file_path)
+            self.parent.engine.open_project(file_path)
         elif operation == "save":
-            current_file = tde4.getProjectPath()
-            tde4.saveProject(current_file)
+            current_file = self.parent.engine.project_path()
+            # the app copies the project as soon as it is saved
+            self.parent.engine.save_project(current_file, wait=True)
@@ -1,7 +1,6 @@
 # By Sam Saxon sam.saxon@thefoundry.com
 # Copied from the equivalent Nuke file.
 
-import os
 import sgtk
 from sgtk.platform.qt import QtGui
 import tde4
@@ -55,15 +54,11 @@ class SceneOperation(HookClass):
             # return the current scene path
             return file_path
         elif operation == "open":
-            tde4.loadProject(file_path)
+            self.parent.engine.open_project(file_path)
         elif operation == "save":
-            if not os.path.exists(os.path.dirname(file_path)):
-                os.makedirs(os.path.dirname(file_path))
-            tde4.saveProject(file_path)
+            self.parent.engine.save_project(file_path)
         elif operation == "save_as":
-            if not os.path.exists(os.path.dirname(file_path)):
-                os.makedirs(os.path.dirname(file_path))
-            tde4.saveProject(file_path)
+            self.parent.engine.save_project(file_path)
 
         elif operation == "reset":
             
@@ -75,8 +70,5 @@ class SceneOperation(HookClass):
             
                 if res == QtGui.QMessageBox.Cancel:
                     return False
-                else:
-                    if not os.path.exists(os.path.dirname(file_path)):
-                        os.makedirs(os.path.dirname(file_path))
-                tde4.saveProject(file_path)
+                self.parent.engine.save_project(file_path)
             return True
@@ -1 +1,14 @@
-from .menu_generation import MenuGenerator
\ No newline at end of file
+from . import footage_check, menu_cache, sequences, snapshot_store
+from .context_cache import ContextCache
+from .context_switcher import ContextSwitcher
+from .deferred_start import DeferredStart
+from .file_log import JsonLinesLogWriter, LogSpan
+from .footage_cache import FootageCache
+from .launcher import PathLauncher
+from .log_sink import LogSink
+from .menu_generation import MenuGenerator
+from .prefetch import SequencePrefetcher
+from .project_sync import ProjectSync
+from .sequence_follower import SequenceFollower
+from .startup_profiler import StartupProfiler
+from .tick_profiler import TickProfiler
@@ -0,0 +1,133 @@
+"""
+Cache of project path to context resolutions for 3DE4.
+
+"""
+from collections import OrderedDict
+import os
+import threading
+
+import sgtk
+
+
+class ContextCache(object):
+    """
+    Bounded, least recently used cache of serialized contexts, keyed by
+    pipeline configuration, project path and the entity and task of the
+    previous context, which the resolution can carry over.
+
+    The whole cache is dropped as soon as the folder schema or the path cache
+    of the pipeline configuration changes on disk, since either can change
+    what a path resolves to. Only the schema folder itself is checked, so
+    edits inside it are noticed once the configuration is updated as a whole,
+    or after :meth:`clear`.
+    """
+
+    def __init__(self, max_size=32):
+        """
+        Initialise the class.
+
+        :param int max_size: The maximum number of contexts to keep.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """
+        Hit and miss statistics for the cache.
+
+        :returns: A ``{"hits": int, "misses": int, "size": int}`` dictionary.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def context_from_path(self, tk, path, previous_context=None):
+        """
+        Cached equivalent of :meth:`sgtk.Sgtk.context_from_path`.
+
+        :param tk: The :class:`sgtk.Sgtk` instance to resolve the path with.
+        :param str path: The project path.
+        :param previous_context: The context to fall back to, see
+                                 :meth:`sgtk.Sgtk.context_from_path`.
+        :rtype: :class:`sgtk.Context`
+        """
+        config_path = tk.pipeline_configuration.get_path()
+        key = (config_path, path, _context_key(previous_context))
+        fingerprint = _config_fingerprint(tk.pipeline_configuration)
+        with self._lock:
+            if self._fingerprints.get(config_path) != fingerprint:
+                self._invalidate(config_path)
+                self._fingerprints[config_path] = fingerprint
+            serialized = self._entries.pop(key, None)
+            if serialized is not None:
+                self._entries[key] = serialized
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if serialized is not None:
+            return sgtk.context.deserialize(serialized)
+
+        context = tk.context_from_path(path, previous_context)
+        with self._lock:
+            self._entries[key] = sgtk.Context.serialize(context)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return context
+
+    def clear(self):
+        """
+        Remove all the cached contexts.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+
+    def _invalidate(self, config_path):
+        """
+        Remove the cached contexts of a pipeline configuration. The lock must
+        be held by the caller.
+
+        :param str config_path: The path to the pipeline configuration.
+        """
+        for key in [key for key in self._entries if key[0] == config_path]:
+            del self._entries[key]
+
+
+def _context_key(context):
+    """
+    Get the part of a context the resolution of a path can depend on.
+
+    :param context: The :class:`sgtk.Context`, or None.
+    :rtype: tuple or Nonetype
+    """
+    if context is None:
+        return None
+    entity = context.entity or {}
+    task = context.task or {}
+    return entity.get("type"), entity.get("id"), task.get("id")
+
+
+def _config_fingerprint(pipeline_configuration):
+    """
+    Get a value that changes whenever the folder schema or the path cache of
+    a pipeline configuration changes. Costs two ``stat`` calls.
+
+    :param pipeline_configuration: The :class:`sgtk.pipelineconfig.PipelineConfiguration`.
+    :rtype: tuple
+    """
+    fingerprint = []
+    for path in (
+        pipeline_configuration.get_schema_config_location(),
+        pipeline_configuration.get_path_cache_location(),
+    ):
+        try:
+            path_stat = os.stat(path)
+            fingerprint.append((path_stat.st_mtime, path_stat.st_size))
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
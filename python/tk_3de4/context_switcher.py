@@ -0,0 +1,173 @@
+"""
+Project driven context switching for 3DE4.
+
+"""
+import os
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+import sgtk
+from sgtk.platform.qt import QtCore
+
+from .file_log import LogSpan, monotonic
+
+
+class ContextSwitcher(object):
+    """
+    Keeps the engine context in line with the project open in 3DE.
+
+    The project path is polled from 3DE at a low frequency, which is the
+    source of truth and notices projects opened from 3DE's own menus. The
+    scene operation hooks and a file watcher on the current project signal
+    changes earlier. The path is resolved to a context on a worker thread and
+    only the final context change runs on the main thread, from :meth:`tick`.
+    """
+
+    def __init__(self, engine, poll_interval=1.0, cache=None):
+        """
+        Initialise the class.
+
+        :param engine: The shotgun engine instance.
+        :param float poll_interval: Seconds between fallback polls of the
+                                    current project path.
+        :param ContextCache cache: Optional cache of resolved contexts.
+        """
+        self._engine = engine
+        self._cache = cache
+        self._poll_interval = poll_interval
+        self._next_poll = 0.0
+        self._generation = 0
+        self._results = queue.Queue()
+        self._watcher = None
+        self.current_path = None
+
+    @property
+    def logger(self):
+        """
+        Get the logger instance.
+
+        :returns: The logger associated to the engine.
+        """
+        return self._engine.logger
+
+    def start(self, path):
+        """
+        Start watching from the given project, without changing context.
+
+        :param str path: The project currently open in 3DE.
+        """
+        self._watcher = QtCore.QFileSystemWatcher()
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._set_current_path(path)
+
+    def project_changed(self, path=None):
+        """
+        Signal that the project open in 3DE may have changed.
+
+        :param str path: The new project path. Queried from 3DE if not given.
+        """
+        if path is None:
+            path = self._engine.project_path()
+        if path == self.current_path:
+            return
+        self._set_current_path(path)
+        if not path:
+            return
+
+        self._generation += 1
+        worker = threading.Thread(
+            target=self._resolve,
+            args=(self._generation, path, self._engine.context),
+            name="tk-3de4 context resolve",
+        )
+        worker.daemon = True
+        worker.start()
+
+    def tick(self):
+        """
+        Run the main thread part of the context switching. Called from the
+        3DE timer callback.
+
+        :returns: The time spent polling the project path and changing
+                  context, in seconds.
+        :rtype: tuple(float, float)
+        """
+        start = monotonic()
+        if time.time() >= self._next_poll:
+            self._next_poll = time.time() + self._poll_interval
+            self.project_changed()
+            self._watch_current_path()
+        polled = monotonic()
+
+        while True:
+            try:
+                generation, new_context = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                # A newer project change superseded this one.
+                continue
+            if new_context != self._engine.context:
+                self.logger.debug("Changing context to %s", new_context)
+                sgtk.platform.change_context(new_context)
+        return polled - start, monotonic() - polled
+
+    def _set_current_path(self, path):
+        """
+        Record the current project path and move the file watcher onto it.
+
+        :param str path: The project path.
+        """
+        self.current_path = path
+        if self._watcher is None:
+            return
+        watched = self._watcher.files()
+        if watched:
+            self._watcher.removePaths(watched)
+        self._watch_current_path()
+
+    def _watch_current_path(self):
+        """
+        Watch the current project, if it exists and isn't watched already. The
+        watcher stops watching a file when it is removed, or replaced by a save
+        writing to a temporary file renamed over it.
+        """
+        path = self.current_path
+        if self._watcher is None or not path or path in self._watcher.files():
+            return
+        if os.path.isfile(path):
+            self._watcher.addPath(path)
+
+    def _on_file_changed(self, path):
+        """
+        Called by the file watcher when the watched project is written,
+        renamed or removed.
+
+        :param str path: The watched path.
+        """
+        self.project_changed()
+        self._watch_current_path()
+
+    def _resolve(self, generation, path, context):
+        """
+        Resolve a project path to a context. Runs on a worker thread.
+
+        :param int generation: The project change this resolution belongs to.
+        :param str path: The project path.
+        :param context: The context to fall back to.
+        """
+        try:
+            with LogSpan(self.logger, "context_from_path"):
+                if self._cache is not None:
+                    new_context = self._cache.context_from_path(self._engine.sgtk, path, context)
+                else:
+                    new_context = self._engine.sgtk.context_from_path(path, context)
+        except Exception:
+            self.logger.exception("Failed to resolve context from '%s'", path)
+            return
+        self._results.put((generation, new_context))
@@ -0,0 +1,125 @@
+"""
+On-demand engine start for 3DE4.
+
+The core loads and initialises every app inside ``start_engine``, and offers
+no way to load a single app later, so apps can't be loaded one at a time as
+their commands are first used. The engine start as a whole is deferred
+instead: the startup script renders the Shotgun menu from the command
+manifest saved by the previous session and returns, so 3DE is interactive
+straight away. The engine, with all its apps, starts the first time a Shotgun
+menu item is run, which then runs.
+
+The start itself still blocks 3DE, as the apps create Qt objects on the main
+thread while they are initialised, but only once the artist asks for a
+toolkit command. Until then the engine doesn't follow the open project.
+
+"""
+import errno
+import json
+import os
+
+from . import menu_dispatch
+
+#: Set by the launcher to enable deferred starts.
+DEFERRED_ENV = "TK_3DE4_DEFERRED_START"
+#: Set by the launcher to the path of the command manifest.
+MANIFEST_ENV = "TK_3DE4_MENU_MANIFEST"
+
+
+def read_manifest(path):
+    """
+    Read a command manifest.
+
+    :param str path: The path of the manifest.
+    :returns: The manifest entries, or None if there is no usable manifest.
+    :rtype: list(dict) or Nonetype
+    """
+    try:
+        with open(path) as manifest_file:
+            return json.load(manifest_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_manifest(path, entries):
+    """
+    Write a command manifest, unless it is already up to date.
+
+    :param str path: The path of the manifest.
+    :param list(dict) entries: For each menu item, the command name, app
+                               instance, type and favourite flag, along with
+                               its menu name, parent menu, command id and
+                               whether it was rendered as a dispatcher stub.
+    """
+    if read_manifest(path) == entries:
+        return
+    folder = os.path.dirname(path)
+    try:
+        os.makedirs(folder)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temp_path, "w") as manifest_file:
+        json.dump(entries, manifest_file, indent=1, sort_keys=True)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temp_path, path)
+
+
+def render_menu(menu_dir, entries):
+    """
+    Write the dispatcher stubs of a command manifest to the menu directory.
+    The files are the same as the ones the engine writes, so they are left
+    untouched when the engine builds the menu if nothing changed.
+
+    :param str menu_dir: The 3DE menu directory.
+    :param list(dict) entries: The manifest entries.
+    """
+    # Imported here, as the menu generation writes the manifests.
+    from .menu_generation import menu_file_name, render_menu_script
+
+    if not os.path.isdir(menu_dir):
+        os.makedirs(menu_dir)
+    for entry in entries:
+        path = os.path.join(menu_dir, menu_file_name(entry["name"], entry["parent_menu"]))
+        with open(path, "wb") as menu_file:
+            menu_file.write(
+                render_menu_script(
+                    entry["name"],
+                    entry["parent_menu"],
+                    menu_dispatch.stub_script(entry["cmd_id"]),
+                )
+            )
+
+
+class DeferredStart(object):
+    """
+    Starts the engine the first time a Shotgun menu item is run.
+    """
+
+    def __init__(self, start):
+        """
+        Initialise the class.
+
+        :param start: Callable starting the engine.
+        """
+        self._start = start
+        self.started = False
+
+    def install(self):
+        """
+        Route menu items run before the engine started to :meth:`start_now`.
+        """
+        menu_dispatch.install()
+        menu_dispatch.set_pending_start(self.start_now)
+
+    def start_now(self):
+        """
+        Start the engine, if not started yet.
+        """
+        if self.started:
+            return
+        self.started = True
+        menu_dispatch.set_pending_start(None)
+        self._start()
@@ -0,0 +1,236 @@
+"""
+Structured log file output for 3DE4.
+
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+monotonic = getattr(time, "monotonic", time.time)
+
+#: Log files of other processes not written to for this many seconds are
+#: removed.
+MAX_FILE_AGE = 7 * 24 * 3600
+
+
+class JsonLinesLogWriter(object):
+    """
+    Writes log records as compact JSON lines from a background thread.
+
+    Each line holds the wall clock and monotonic times, level, logger, thread
+    and message of a record, plus the ``span`` tag and ``elapsed`` seconds of
+    records logged by :class:`LogSpan`. Records are turned into lines when
+    queued, as their arguments may change by the time they are written.
+
+    Each process writes to its own file, ``<name>.<pid>.jsonl`` for a path of
+    ``<name>.jsonl``, so sessions sharing a log folder don't rotate each
+    other's files. The file is rotated once it grows past ``max_bytes``,
+    keeping ``backup_count`` older files. The files of past sessions are
+    removed after :data:`MAX_FILE_AGE`.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5):
+        """
+        Initialise the class and start the writer thread.
+
+        :param str path: The log file path, before the process id is added.
+        :param int max_bytes: The size at which the file is rotated.
+        :param int backup_count: The number of rotated files to keep.
+        """
+        root, ext = os.path.splitext(path)
+        self.path = "{}.{}{}".format(root, os.getpid(), ext)
+        self._old_files = "{}.*{}*".format(root, ext)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._file = None
+        self._rotate_at = max_bytes
+        self._thread = threading.Thread(target=self._run, name="tk-3de4 log writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def push(self, record):
+        """
+        Queue a record for writing. Safe to call from any thread.
+
+        :param record: Std python logging record.
+        :type record: :class:`~python.logging.LogRecord`
+        """
+        self._queue.put(_record_line(record, monotonic()))
+
+    def close(self):
+        """
+        Write the queued records, then stop the writer thread.
+        """
+        self._queue.put(None)
+        self._thread.join(5)
+
+    def _run(self):
+        """
+        Writer thread loop.
+        """
+        while True:
+            line = self._queue.get()
+            if line is None:
+                break
+            try:
+                self._write(line)
+                # Only flush to disk once the queue is drained.
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception:
+                # Never let a bad record take the writer down, nor flood the
+                # console if the file can't be written.
+                self.errors += 1
+                if self.errors == 1:
+                    traceback.print_exc()
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, line):
+        """
+        Write a single line, rotating the file if needed.
+
+        :param bytes line: The line, as returned by :func:`_record_line`.
+        """
+        if self._file is None:
+            self._open()
+        elif self._file.tell() + len(line) > self._rotate_at:
+            try:
+                self._rotate()
+            except OSError:
+                # Kept in the current file.
+                self._file.write(line)
+                raise
+        self._file.write(line)
+
+    def _open(self):
+        """
+        Open the log file for appending, creating its folder if needed.
+        """
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        self._remove_old_files()
+        self._file = open(self.path, "ab", 64 * 1024)
+
+    def _remove_old_files(self):
+        """
+        Remove the log files of past sessions not written to for a while.
+        """
+        now = time.time()
+        for path in glob.glob(self._old_files):
+            try:
+                if now - os.path.getmtime(path) > MAX_FILE_AGE:
+                    os.remove(path)
+            except OSError:
+                # Removed by another session.
+                pass
+
+    def _rotate(self):
+        """
+        Move the current file to ``<path>.1``, shifting older files along.
+        The file is reopened even if moving it failed, in which case the next
+        attempt is made once another ``max_bytes`` were written.
+        """
+        self._file.close()
+        self._file = None
+        try:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = "{}.{}".format(self.path, index)
+                if os.path.exists(source):
+                    target = "{}.{}".format(self.path, index + 1)
+                    if os.path.exists(target):
+                        os.remove(target)
+                    os.rename(source, target)
+            if self.backup_count > 0:
+                target = self.path + ".1"
+                if os.path.exists(target):
+                    os.remove(target)
+                os.rename(self.path, target)
+            else:
+                os.remove(self.path)
+        except OSError:
+            self._rotate_at += self.max_bytes
+            raise
+        else:
+            self._rotate_at = self.max_bytes
+        finally:
+            self._open()
+
+
+def _record_line(record, mono):
+    """
+    Turn a record into a JSON line.
+
+    :param record: Std python logging record.
+    :param float mono: Monotonic time the record was queued at.
+    :returns: The line, utf-8 encoded.
+    :rtype: bytes
+    """
+    data = {
+        "time": round(record.created, 3),
+        "mono": round(mono, 6),
+        "level": record.levelname,
+        "logger": record.name,
+        "thread": record.threadName,
+        "msg": record.getMessage(),
+    }
+    span = getattr(record, "span", None)
+    if span is not None:
+        data["span"] = span
+        data["elapsed"] = round(record.elapsed, 6)
+    if record.exc_info:
+        data["exc"] = "".join(traceback.format_exception(*record.exc_info))
+    return (json.dumps(data, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+class LogSpan(object):
+    """
+    Context manager logging the time taken by a block of code, tagged so it
+    can be aggregated from the log file.
+    """
+
+    def __init__(self, logger, tag, level=logging.DEBUG):
+        """
+        Initialise the class.
+
+        :param logger: The logger to log the span to.
+        :param str tag: The name of the span.
+        :param int level: The level to log the span at.
+        """
+        self.logger = logger
+        self.tag = tag
+        self.level = level
+        self.elapsed = None
+        self._start = None
+
+    def __enter__(self):
+        """
+        Start timing.
+        """
+        self._start = monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        """
+        Stop timing and log the span.
+        """
+        self.elapsed = monotonic() - self._start
+        self.logger.log(
+            self.level,
+            "%s took %.3fs",
+            self.tag,
+            self.elapsed,
+            extra={"span": self.tag, "elapsed": self.elapsed},
+        )
@@ -0,0 +1,431 @@
+"""
+Local disk cache of the image sequences imported into 3DE4.
+
+Each sequence gets an entry folder in the cache, filled by a pool of copier
+threads, frames nearest to the current frame first. Where symbolic links are
+supported, the entry is first filled with links to the original frames, each
+replaced by its local copy once copied, so cameras can be pointed at the
+entry before the whole sequence is local. The entry also records the path of
+the original sequence, see :meth:`FootageCache.source_path`.
+
+Entries are evicted least recently used first once the cache grows past its
+size limit. Sessions on the same host share the cache: frames are copied
+through temporary files renamed into place, and a session holds a shared
+lock on each entry it uses, which keeps other sessions from evicting it.
+
+"""
+import errno
+import hashlib
+import itertools
+import os
+import shutil
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOCK_NAME = ".lock"
+LAST_USED_NAME = ".last_used"
+SOURCE_NAME = ".source"
+EVICT_LOCK_NAME = ".evict.lock"
+#: Cameras are repointed once this many frames around the current frame
+#: are local, when the entry can link to the frames not copied yet.
+REPOINT_FRAMES = 24
+#: Without locks, only entries unused for this many seconds are evicted.
+UNLOCKED_MIN_AGE = 24 * 3600
+
+
+class FootageCache(object):
+    """
+    Copies image sequences to a local cache folder from background threads.
+    """
+
+    def __init__(self, root, max_bytes, workers=4, logger=None):
+        """
+        Initialise the class.
+
+        :param str root: The cache folder.
+        :param int max_bytes: The size above which entries are evicted.
+        :param int workers: The number of copier threads.
+        :param logger: The logger to report copy errors to.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self._workers = workers
+        self._threads = []
+        self._tasks = queue.PriorityQueue()
+        self._ready = queue.Queue()
+        self._counter = itertools.count()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def request(self, spec, frames, current_frame=None, on_ready=None):
+        """
+        Queue the copy of a sequence to the cache.
+
+        :param spec: The sequence.
+        :type spec: :class:`~tk_3de4.sequences.SequenceSpec`
+        :param list(int) frames: The frames to copy.
+        :param int current_frame: The frames nearest to this one are copied first.
+        :param on_ready: Callable run from :meth:`tick` with the cached hash
+                         path, once cameras can be pointed at it.
+        :returns: The hash path of the sequence in the cache.
+        :rtype: str
+        """
+        entry = self._entry_dir(spec)
+        _makedirs(entry)
+        self._hold(entry)
+        _touch(os.path.join(entry, LAST_USED_NAME))
+
+        if current_frame is None:
+            current_frame = frames[0]
+        job = _Job(spec, entry, on_ready)
+        job.frames = sorted(frames, key=lambda frame: abs(frame - current_frame))
+        # The frames are checked and linked by the copier threads.
+        self._start_threads()
+        self._tasks.put((-1, next(self._counter), job))
+        return os.path.join(entry, os.path.basename(spec.hash_path))
+
+    def source_path(self, path):
+        """
+        Get the original path of a sequence in the cache.
+
+        :param str path: A hash path.
+        :returns: The hash path the sequence was copied from, or None if
+                  ``path`` isn't in the cache.
+        :rtype: str or Nonetype
+        """
+        entry = os.path.dirname(os.path.abspath(path))
+        if os.path.dirname(entry) != os.path.abspath(self.root):
+            return None
+        try:
+            with open(os.path.join(entry, SOURCE_NAME)) as source_file:
+                source = source_file.read()
+        except (IOError, OSError):
+            return None
+        if os.path.basename(source) != os.path.basename(path):
+            return None
+        return source
+
+    def tick(self):
+        """
+        Run the callbacks of the sequences ready to use. Called from the 3DE
+        timer, on the main thread.
+        """
+        while True:
+            try:
+                job = self._ready.get_nowait()
+            except queue.Empty:
+                return
+            if job.on_ready is not None:
+                job.on_ready(os.path.join(job.entry, os.path.basename(job.spec.hash_path)))
+
+    def close(self):
+        """
+        Stop the copier threads and release the entries used by this session.
+        Partly copied entries are completed by the next request.
+        """
+        for _ in self._threads:
+            self._tasks.put((-2, next(self._counter), None))
+        for thread in self._threads:
+            thread.join(5)
+        self._threads = []
+        for lock_file in self._locks.values():
+            lock_file.close()
+        self._locks.clear()
+
+    def evict(self, needed=0):
+        """
+        Remove the least recently used entries not in use by any session until
+        the cache fits in its size limit.
+
+        :param int needed: Bytes to make room for on top of the current size.
+        :returns: The removed entry folders.
+        :rtype: list(str)
+        """
+        _makedirs(self.root)
+        evict_lock = open(os.path.join(self.root, EVICT_LOCK_NAME), "a")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(evict_lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    # Another session is evicting.
+                    return []
+            entries = []
+            total = 0
+            for name in os.listdir(self.root):
+                entry = os.path.join(self.root, name)
+                if not os.path.isdir(entry):
+                    continue
+                size = _entry_size(entry)
+                total += size
+                try:
+                    last_used = os.path.getmtime(os.path.join(entry, LAST_USED_NAME))
+                except OSError:
+                    last_used = 0
+                entries.append((last_used, entry, size))
+
+            removed = []
+            for last_used, entry, size in sorted(entries):
+                if total + needed <= self.max_bytes:
+                    break
+                if entry in self._locks or not self._remove_unused(entry, last_used):
+                    continue
+                total -= size
+                removed.append(entry)
+            return removed
+        finally:
+            evict_lock.close()
+
+    def _remove_unused(self, entry, last_used):
+        """
+        Remove an entry, unless a session is using it.
+
+        :param str entry: The entry folder.
+        :param float last_used: The time the entry was last used.
+        :returns: True if the entry was removed.
+        :rtype: bool
+        """
+        if fcntl is None:
+            if time.time() - last_used < UNLOCKED_MIN_AGE:
+                return False
+            shutil.rmtree(entry, ignore_errors=True)
+            return True
+        try:
+            lock_file = open(os.path.join(entry, LOCK_NAME), "a")
+        except (IOError, OSError):
+            return False
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            lock_file.close()
+            return False
+        try:
+            shutil.rmtree(entry, ignore_errors=True)
+        finally:
+            lock_file.close()
+        if self.logger is not None:
+            self.logger.debug("Evicted '%s' from the footage cache", entry)
+        return True
+
+    def _hold(self, entry):
+        """
+        Take a shared lock on an entry for the rest of the session.
+
+        :param str entry: The entry folder.
+        """
+        if fcntl is None or entry in self._locks:
+            return
+        lock_path = os.path.join(entry, LOCK_NAME)
+        while True:
+            _makedirs(entry)
+            lock_file = open(lock_path, "a")
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+            try:
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                    break
+            except OSError:
+                pass
+            # Evicted while waiting for the lock.
+            lock_file.close()
+        self._locks[entry] = lock_file
+
+    def _start_threads(self):
+        """
+        Start the copier threads, if not running yet.
+        """
+        while len(self._threads) < self._workers:
+            thread = threading.Thread(target=self._run, name="tk-3de4 footage copy")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        """
+        Copier thread loop.
+        """
+        while True:
+            _, _, task = self._tasks.get()
+            if task is None:
+                return
+            try:
+                if isinstance(task, _Job):
+                    self._plan(task)
+                else:
+                    self._copy(*task)
+            except Exception as error:
+                if self.logger is not None:
+                    self.logger.error("Footage cache error: %s", error)
+
+    def _plan(self, job):
+        """
+        Link the frames of a sequence not in its entry yet, make room for
+        them and queue their copy.
+
+        :param _Job job: The sequence to copy.
+        """
+        with open(os.path.join(job.entry, SOURCE_NAME), "w") as source_file:
+            source_file.write(job.spec.hash_path)
+        links = hasattr(os, "symlink")
+        for frame in job.frames:
+            name = job.spec.frame_name(frame)
+            target = os.path.join(job.entry, name)
+            if os.path.isfile(target) and not os.path.islink(target):
+                continue
+            if links and not os.path.lexists(target):
+                try:
+                    os.symlink(os.path.join(job.spec.directory, name), target)
+                except OSError:
+                    links = False
+            job.pending.append(name)
+        job.repoint_after = min(len(job.pending), REPOINT_FRAMES) if links else len(job.pending)
+        if not job.repoint_after:
+            self._ready.put(job)
+            return
+        self.evict(self._estimate_size(job))
+        for name in job.pending:
+            self._tasks.put((0, next(self._counter), (job, name)))
+
+    def _estimate_size(self, job):
+        """
+        :param _Job job: A sequence being copied.
+        :returns: The bytes the frames left to copy will take, estimated
+                  from the size of the first of them.
+        :rtype: int
+        """
+        if not job.pending:
+            return 0
+        try:
+            return os.path.getsize(os.path.join(job.spec.directory, job.pending[0])) * len(job.pending)
+        except OSError:
+            return 0
+
+    def _copy(self, job, name):
+        """
+        Copy a frame of a sequence to its entry.
+
+        :param _Job job: The sequence being copied.
+        :param str name: The file name of the frame.
+        """
+        target = os.path.join(job.entry, name)
+        try:
+            if not (os.path.isfile(target) and not os.path.islink(target)):
+                temp_path = "{}.{}.{}.tmp".format(target, os.getpid(), threading.current_thread().ident)
+                try:
+                    shutil.copyfile(os.path.join(job.spec.directory, name), temp_path)
+                    _replace(temp_path, target)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+        except (IOError, OSError) as error:
+            job.failed = True
+            if self.logger is not None:
+                self.logger.error("Failed to cache '%s': %s", name, error)
+        with self._lock:
+            job.copied += 1
+            ready = job.copied == job.repoint_after and not job.failed
+            done = job.copied == len(job.pending)
+        if ready:
+            self._ready.put(job)
+        if done:
+            _touch(os.path.join(job.entry, LAST_USED_NAME))
+
+    def _entry_dir(self, spec):
+        """
+        :param spec: The sequence.
+        :type spec: :class:`~tk_3de4.sequences.SequenceSpec`
+        :returns: The entry folder of a sequence.
+        :rtype: str
+        """
+        key = spec.hash_path
+        if not isinstance(key, bytes):
+            key = key.encode("utf-8")
+        return os.path.join(self.root, hashlib.sha1(key).hexdigest()[:16])
+
+
+class _Job(object):
+    """
+    A sequence being copied to the cache.
+    """
+
+    def __init__(self, spec, entry, on_ready):
+        """
+        Initialise the class.
+
+        :param spec: The sequence.
+        :param str entry: The entry folder of the sequence.
+        :param on_ready: Callable run once cameras can use the entry.
+        """
+        self.spec = spec
+        self.entry = entry
+        self.on_ready = on_ready
+        self.frames = []
+        self.pending = []
+        self.repoint_after = 0
+        self.copied = 0
+        self.failed = False
+
+
+def _entry_size(entry):
+    """
+    :param str entry: An entry folder.
+    :returns: The size of the frames copied to an entry, in bytes.
+    :rtype: int
+    """
+    size = 0
+    for name in os.listdir(entry):
+        try:
+            stat = os.lstat(os.path.join(entry, name))
+        except OSError:
+            continue
+        size += stat.st_size
+    return size
+
+
+def _touch(path):
+    """
+    Set the modification time of a file to now, creating it if needed.
+
+    :param str path: The file path.
+    """
+    with open(path, "a"):
+        os.utime(path, None)
+
+
+def _replace(source, target):
+    """
+    Rename a file over another one.
+
+    :param str source: The file to rename.
+    :param str target: The file to replace.
+    """
+    replace = getattr(os, "replace", None)
+    if replace is not None:
+        replace(source, target)
+        return
+    if os.name == "nt" and os.path.exists(target):
+        os.remove(target)
+    os.rename(source, target)
+
+
+def _makedirs(path):
+    """
+    Create a directory and its parents, if they don't exist.
+
+    :param str path: The directory path.
+    """
+    try:
+        os.makedirs(path)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
@@ -0,0 +1,128 @@
+"""
+Checking that the footage of the cameras of a 3DE4 project is on disk.
+
+The footage is read from 3DE through its camera queries once the project is
+loaded, rather than from the project file, whose format isn't documented.
+The sequence directories are listed in parallel.
+
+"""
+from collections import defaultdict
+from multiprocessing.pool import ThreadPool
+import os
+
+from .sequences import parse_sequence_path, scan_sequences
+
+
+class FootageRef(object):
+    """
+    The footage of a camera.
+    """
+    __slots__ = ("path", "camera", "start", "end", "step")
+
+    def __init__(self, path, camera, start=None, end=None, step=None):
+        """
+        Initialise the class.
+
+        :param str path: The image or sequence path.
+        :param str camera: The name of the camera.
+        :param int start: The first frame, if known.
+        :param int end: The last frame, if known.
+        :param int step: The frame step, if known.
+        """
+        self.path = path
+        self.camera = camera
+        self.start = start
+        self.end = end
+        self.step = step
+
+
+def camera_footage(api):
+    """
+    Get the footage of the cameras of the project loaded in 3DE. Cameras
+    without footage are left out.
+
+    :param api: The ``tde4`` module.
+    :rtype: list(FootageRef)
+    """
+    refs = []
+    for cam_id in api.getCameraList(False):
+        path = api.getCameraPath(cam_id)
+        if not path:
+            continue
+        start = end = step = None
+        if api.getCameraType(cam_id) == "SEQUENCE":
+            start, end, step = api.getCameraSequenceAttr(cam_id)
+        refs.append(FootageRef(path, api.getCameraName(cam_id), start, end, step))
+    return refs
+
+
+def check_footage(refs, index=None, workers=4):
+    """
+    Check that footage is on disk, listing the directories of the sequences
+    in parallel.
+
+    :param refs: The footage references, see :func:`camera_footage`.
+    :type refs: iterable(FootageRef)
+    :param index: Optional :class:`~tk_3de4.sequences.SequenceIndex` of
+                  previous scans.
+    :param int workers: The number of directories listed at once.
+    :returns: The references with missing footage, and what is missing.
+    :rtype: list(tuple(FootageRef, str))
+    """
+    refs_by_dir = defaultdict(list)
+    for ref in refs:
+        spec = parse_sequence_path(ref.path)
+        refs_by_dir[spec.directory if spec is not None else None].append(ref)
+
+    def check(directory):
+        dir_refs = refs_by_dir[directory]
+        if directory is None:
+            return [(ref, "missing") for ref in dir_refs if not os.path.isfile(ref.path)]
+        infos = scan_sequences(list(set(ref.path for ref in dir_refs)), index)
+        return [
+            (ref, problem) for ref, problem in
+            ((ref, _sequence_problem(ref, infos[ref.path])) for ref in dir_refs)
+            if problem
+        ]
+
+    directories = list(refs_by_dir)
+    if workers <= 1 or len(directories) <= 1:
+        results = [check(directory) for directory in directories]
+    else:
+        pool = ThreadPool(min(workers, len(directories)))
+        try:
+            results = pool.map(check, directories)
+        finally:
+            pool.close()
+            pool.join()
+    return [problem for dir_problems in results for problem in dir_problems]
+
+
+def _sequence_problem(ref, info):
+    """
+    Describe what is missing of a referenced sequence.
+
+    :param FootageRef ref: The footage reference.
+    :param info: The frames of the sequence on disk.
+    :type info: :class:`~tk_3de4.sequences.SequenceInfo` or Nonetype
+    :returns: The frames missing, or None if none are.
+    :rtype: str or Nonetype
+    """
+    if info is None:
+        return "missing"
+    if ref.start is None:
+        if info.missing:
+            return "frames {} missing".format(
+                ", ".join(
+                    str(start) if start == end else "{}-{}".format(start, end)
+                    for start, end in info.missing
+                )
+            )
+        return None
+    on_disk = set(info.frames)
+    missing = [
+        frame for frame in range(ref.start, ref.end + 1, ref.step or 1) if frame not in on_disk
+    ]
+    if not missing:
+        return None
+    return "{} of frames {}-{} missing".format(len(missing), ref.start, ref.end)
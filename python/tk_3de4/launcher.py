@@ -0,0 +1,159 @@
+"""
+Opening folders in the system file browser, without blocking 3DE4.
+
+"""
+import os
+import subprocess
+import sys
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+def file_browser_command():
+    """
+    Get the command opening a folder in the file browser of the platform.
+
+    :returns: The command, to be followed by the folder path.
+    :rtype: list(str)
+    :raises OSError: The platform isn't supported.
+    """
+    if sys.platform.startswith("linux"):
+        return ["xdg-open"]
+    elif sys.platform == "darwin":
+        return ["open"]
+    elif sys.platform == "win32":
+        return ["cmd.exe", "/C", "start", "Folder"]
+    raise OSError("Platform '{}' is not supported.".format(sys.platform))
+
+
+def collapse_paths(paths):
+    """
+    Remove the duplicates from a list of folders, along with the folders
+    inside another folder of the list.
+
+    :param list(str) paths: The folders.
+    :returns: The remaining folders, in their original order.
+    :rtype: list(str)
+    """
+    normalized = [os.path.normcase(os.path.normpath(path)) for path in paths]
+    kept = set()
+    for path in sorted(set(normalized), key=len):
+        if not any(path.startswith(parent.rstrip(os.sep) + os.sep) for parent in kept):
+            kept.add(path)
+    collapsed = []
+    for path, key in zip(paths, normalized):
+        if key in kept:
+            kept.discard(key)
+            collapsed.append(path)
+    return collapsed
+
+
+class PathLauncher(object):
+    """
+    Opens folders in the file browser from a worker thread, where the folders
+    are checked for existence and the file browser processes started. Failures
+    are logged.
+    """
+
+    def __init__(self, logger):
+        """
+        Initialise the class.
+
+        :param logger: The logger to report failures to.
+        """
+        self.logger = logger
+        self._exists = {}
+        self._tasks = queue.Queue()
+        self._thread = None
+
+    def warm_up(self, get_paths):
+        """
+        Check which folders exist ahead of opening them, e.g. when the
+        context changed.
+
+        :param get_paths: Callable returning the folders.
+        """
+        self._submit(self._warm_up, get_paths)
+
+    def open(self, get_paths):
+        """
+        Open folders in the file browser. Returns straight away, the folders
+        are resolved on the worker thread.
+
+        :param get_paths: Callable returning the folders.
+        """
+        self._submit(self._open, get_paths)
+
+    def _submit(self, func, *args):
+        """
+        Run a function on the worker thread.
+
+        :param func: The function to run.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tk-3de4 launcher")
+            self._thread.daemon = True
+            self._thread.start()
+        self._tasks.put((func, args))
+
+    def _run(self):
+        """
+        Worker thread loop.
+        """
+        while True:
+            func, args = self._tasks.get()
+            try:
+                func(*args)
+            except Exception:
+                self.logger.exception("File browser launch failed")
+
+    def _warm_up(self, get_paths):
+        """
+        Check which folders exist.
+
+        :param get_paths: Callable returning the folders.
+        """
+        for path in get_paths():
+            self._exists[path] = os.path.isdir(path)
+
+    def _open(self, get_paths):
+        """
+        Open folders in the file browser.
+
+        :param get_paths: Callable returning the folders.
+        """
+        command = file_browser_command()
+        processes = []
+        for path in collapse_paths(get_paths()):
+            exists = self._exists.get(path)
+            if not exists:
+                exists = self._exists[path] = os.path.isdir(path)
+            if not exists:
+                self.logger.warning("Can't open '%s', it doesn't exist", path)
+                continue
+            args = command + [path]
+            try:
+                processes.append((args, subprocess.Popen(args)))
+            except OSError as error:
+                self.logger.error("Failed to launch '%s': %s", subprocess.list2cmdline(args), error)
+        if processes:
+            waiter = threading.Thread(target=self._wait, args=(processes,), name="tk-3de4 launcher wait")
+            waiter.daemon = True
+            waiter.start()
+
+    def _wait(self, processes):
+        """
+        Wait for file browser processes, logging the ones that failed.
+
+        :param list processes: The command and :class:`subprocess.Popen` of
+                               each process.
+        """
+        for args, process in processes:
+            if process.wait():
+                self.logger.error(
+                    "'%s' failed with exit code %d", subprocess.list2cmdline(args), process.returncode
+                )
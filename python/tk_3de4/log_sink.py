@@ -0,0 +1,100 @@
+"""
+Queued log output for the 3DE4 console.
+
+"""
+from collections import deque
+import copy
+import threading
+import time
+
+
+class LogSink(object):
+    """
+    Bounded ring buffer of log records, written to the 3DE console in batches.
+
+    The message of a record is built from its arguments when queued, as they
+    may change by the time the record is written. The rest of the formatting
+    happens when flushed, which the engine does on the main thread.
+    Consecutive identical messages are coalesced into one line and, when the
+    buffer is full, the oldest records are dropped and counted.
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Initialise the class.
+
+        :param int capacity: The maximum number of records held between flushes.
+        """
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._pending_drops = 0
+        self.dropped = 0
+
+    def push(self, handler, record):
+        """
+        Queue a record. Safe to call from any thread.
+
+        :param handler: Log handler that this message was dispatched from.
+        :type handler: :class:`~python.logging.LogHandler`
+        :param record: Std python logging record.
+        :type record: :class:`~python.logging.LogRecord`
+        """
+        # The record is shared with the other handlers, keep it as it is.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        with self._lock:
+            if self._records:
+                last = self._records[-1]
+                if _same_message(last[1], record):
+                    last[2] += 1
+                    return
+            if len(self._records) == self._records.maxlen:
+                self._pending_drops += 1
+                self.dropped += 1
+            self._records.append([handler, record, 1])
+
+    def flush(self, write):
+        """
+        Format and write all the queued records in a single call.
+
+        :param write: Callable taking the text to write.
+        """
+        with self._lock:
+            if not self._records and not self._pending_drops:
+                return
+            records = list(self._records)
+            self._records.clear()
+            drops, self._pending_drops = self._pending_drops, 0
+
+        lines = []
+        if drops:
+            lines.append("{} log records dropped".format(drops))
+        for handler, record, repeats in records:
+            line = "{},{:03d} {}".format(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created)),
+                int(record.msecs),
+                handler.format(record),
+            )
+            if repeats > 1:
+                line += " (repeated {} times)".format(repeats)
+            lines.append(line)
+        write("\n".join(lines))
+
+
+def _same_message(record, other):
+    """
+    Check if two records carry the same message.
+
+    :param record: Std python logging record.
+    :param other: Std python logging record.
+    :rtype: bool
+    """
+    return (
+        not record.exc_info
+        and not other.exc_info
+        and record.levelno == other.levelno
+        and record.name == other.name
+        and record.msg == other.msg
+        and record.args == other.args
+    )
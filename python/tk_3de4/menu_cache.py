@@ -0,0 +1,261 @@
+"""
+Persistent, pre-rendered menu directories for 3DE4.
+
+Each session gets its own menu directory under ``<root>/sessions``, seeded
+from a template directory holding the menu last rendered for the same
+pipeline configuration, environment and command manifest. 3DE then finds a
+complete menu on its first scan, and the engine only rewrites the entries
+that changed.
+
+Templates live in ``<root>/<key>/<manifest hash>``, the key being made of
+the pipeline configuration and environment. The engine writes the manifest
+of the commands it rendered before saving the menu as a template, so each
+template is filed under the commands it holds. Sessions started without a
+manifest aren't seeded.
+
+A running session holds a lock on its directory, taken by the engine when it
+starts. Directories left behind by sessions that crashed are removed by
+:func:`clean_stale_sessions`.
+
+This module is also loaded by the launcher, outside of the engine, so it
+only depends on the standard library.
+
+"""
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+#: Set by the launcher to the template directory of the session menu.
+TEMPLATE_ENV = "TK_3DE4_MENU_TEMPLATE"
+
+LOCK_NAME = ".tk-3de4.lock"
+SESSIONS_DIR = "sessions"
+# Suffix of the session directories being removed.
+STALE_SUFFIX = ".stale"
+
+
+def menu_key(*parts):
+    """
+    Get the key of a menu template.
+
+    :param parts: The values the menu depends on, e.g. the pipeline
+                  configuration path and environment name.
+    :rtype: str
+    """
+    key = "|".join(parts)
+    if not isinstance(key, bytes):
+        key = key.encode("utf-8")
+    return hashlib.sha1(key).hexdigest()[:16]
+
+
+def file_hash(path):
+    """
+    Hash the content of a file.
+
+    :param str path: The file path.
+    :returns: The hash, or an empty string if the file can't be read.
+    :rtype: str
+    """
+    try:
+        with open(path, "rb") as hashed_file:
+            return hashlib.sha1(hashed_file.read()).hexdigest()
+    except (IOError, OSError):
+        return ""
+
+
+def template_for_manifest(templates_root, manifest_path):
+    """
+    Get the template directory of the menu rendered from a command manifest.
+
+    :param str templates_root: The templates of the pipeline configuration
+                               and environment, see :func:`create_session_dir`.
+    :param str manifest_path: The path of the command manifest.
+    :returns: The template directory, or None if there is no manifest.
+    :rtype: str or Nonetype
+    """
+    manifest_hash = file_hash(manifest_path)
+    if not manifest_hash:
+        return None
+    return os.path.join(templates_root, manifest_hash)
+
+
+def create_session_dir(root, key, manifest_path=None):
+    """
+    Create the menu directory of a new session, seeded from the template
+    rendered from the current command manifest when there is one.
+
+    :param str root: The folder holding the templates and sessions.
+    :param str key: The template key, see :func:`menu_key`.
+    :param str manifest_path: The path of the command manifest.
+    :returns: The session menu directory and the directory holding the
+              templates for the key.
+    :rtype: tuple(str, str)
+    """
+    sessions_root = os.path.join(root, SESSIONS_DIR)
+    _makedirs(sessions_root)
+    session_dir = tempfile.mkdtemp(prefix="{}_".format(key), dir=sessions_root)
+    templates_root = os.path.join(root, key)
+    seed_dir = template_for_manifest(templates_root, manifest_path) if manifest_path else None
+    try:
+        names = os.listdir(seed_dir) if seed_dir else []
+    except OSError:
+        names = []
+    for name in names:
+        if name.endswith(".py"):
+            try:
+                shutil.copy2(os.path.join(seed_dir, name), session_dir)
+            except (IOError, OSError):
+                # The template is being replaced, the engine will fill in the gaps.
+                pass
+    return session_dir, templates_root
+
+
+def save_template(session_dir, template_dir):
+    """
+    Replace a template with the content of a session menu directory.
+
+    :param str session_dir: The session menu directory.
+    :param str template_dir: The template directory.
+    """
+    parent = os.path.dirname(template_dir)
+    _makedirs(parent)
+    new_dir = tempfile.mkdtemp(prefix=".new_", dir=parent)
+    for name in os.listdir(session_dir):
+        if name.endswith(".py"):
+            shutil.copy2(os.path.join(session_dir, name), new_dir)
+    old_dir = None
+    if os.path.isdir(template_dir):
+        old_dir = tempfile.mkdtemp(prefix=".old_", dir=parent)
+        os.rmdir(old_dir)
+        os.rename(template_dir, old_dir)
+    try:
+        os.rename(new_dir, template_dir)
+    except OSError:
+        # Another session saved the same template first.
+        shutil.rmtree(new_dir, ignore_errors=True)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def clean_stale_sessions(root, min_age=3600):
+    """
+    Remove the menu directories of sessions that are no longer running.
+
+    Only the directories locked by an engine once, and no longer locked, are
+    removed, once older than ``min_age``. They are renamed out of the way
+    first, so a removal failing half way, e.g. on a file still open on
+    Windows, is completed by the next call rather than leaving a partial
+    menu behind.
+
+    :param str root: The folder holding the templates and sessions.
+    :param int min_age: The minimum age in seconds of a directory to remove.
+    :returns: The removed directories.
+    :rtype: list(str)
+    """
+    sessions_root = os.path.join(root, SESSIONS_DIR)
+    try:
+        names = os.listdir(sessions_root)
+    except OSError:
+        return []
+    removed = []
+    now = time.time()
+    for name in names:
+        session_dir = os.path.join(sessions_root, name)
+        if name.endswith(STALE_SUFFIX):
+            shutil.rmtree(session_dir, ignore_errors=True)
+            continue
+        if not os.path.isfile(os.path.join(session_dir, LOCK_NAME)):
+            # The engine of the session didn't start, or didn't yet.
+            continue
+        try:
+            if now - os.path.getmtime(session_dir) < min_age:
+                continue
+        except OSError:
+            continue
+        lock = SessionLock(session_dir)
+        if not lock.acquire():
+            # Still in use.
+            continue
+        lock.release()
+        stale_dir = session_dir + STALE_SUFFIX
+        try:
+            os.rename(session_dir, stale_dir)
+        except OSError:
+            continue
+        shutil.rmtree(stale_dir, ignore_errors=True)
+        removed.append(session_dir)
+    return removed
+
+
+class SessionLock(object):
+    """
+    Non-blocking, process wide lock on a session menu directory.
+    """
+
+    def __init__(self, session_dir):
+        """
+        Initialise the class.
+
+        :param str session_dir: The session menu directory.
+        """
+        self.path = os.path.join(session_dir, LOCK_NAME)
+        self._fd = None
+
+    def acquire(self):
+        """
+        Try to take the lock.
+
+        :returns: True if the lock was taken, False if another process holds it.
+        :rtype: bool
+        """
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        except OSError:
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+        except (IOError, OSError):
+            os.close(self._fd)
+            self._fd = None
+            return False
+        return True
+
+    def release(self):
+        """
+        Release the lock, if held.
+        """
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _makedirs(path):
+    """
+    Create a directory and its parents, if they don't exist.
+
+    :param str path: The directory path.
+    """
+    try:
+        os.makedirs(path)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
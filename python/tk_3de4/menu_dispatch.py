@@ -0,0 +1,106 @@
+"""
+Shared dispatcher for the 3DE4 Shotgun menu.
+
+When the engine runs with ``menu_dispatcher`` enabled, every generated menu
+script is a short stub calling :func:`run` with a stable command id. This
+module is registered in ``sys.modules`` under :data:`MODULE_NAME` so the stubs
+resolve it without importing ``sgtk`` or walking ``engine.commands``.
+
+The module can be loaded more than once: by the startup script as a plain
+``tk_3de4`` package, and by the engine under the alias given by
+``import_module``. The first copy registered holds the dispatch table and the
+pending start for all of them.
+
+"""
+import hashlib
+import sys
+
+import sgtk
+
+#: Name this module is registered under in ``sys.modules`` for the menu stubs.
+MODULE_NAME = "tk_3de4_menu_dispatch"
+
+logger = sgtk.LogManager.get_logger(__name__)
+_commands = {}
+_pending_start = None
+
+
+def command_id(name):
+    """
+    Get the stable id for a command name.
+
+    :param str name: The name of the command, as registered with the engine.
+    :rtype: str
+    """
+    if not isinstance(name, bytes):
+        name = name.encode("utf-8")
+    return hashlib.sha1(name).hexdigest()[:12]
+
+
+def _shared():
+    """
+    Get the copy of this module holding the dispatch state, registering this
+    one if none is yet.
+
+    :returns: The module registered under :data:`MODULE_NAME`.
+    """
+    return sys.modules.setdefault(MODULE_NAME, sys.modules[__name__])
+
+
+def install():
+    """
+    Make this module importable by the menu stubs.
+    """
+    _shared()
+
+
+def set_commands(commands):
+    """
+    Replace the dispatch table.
+
+    :param dict commands: Mapping of command id to its callback.
+    """
+    _shared()._commands = dict(commands)
+
+
+def set_pending_start(start):
+    """
+    Set the callable starting the engine, when the menu was rendered before
+    the engine started. It is called the first time a menu item is run
+    before the dispatch table is filled.
+
+    :param start: Callable starting the engine, or None.
+    """
+    _shared()._pending_start = start
+
+
+def run(cmd_id):
+    """
+    Run the command registered for the given id.
+
+    :param str cmd_id: The id of the command, see :func:`command_id`.
+    """
+    shared = _shared()
+    callback = shared._commands.get(cmd_id)
+    if callback is None and shared._pending_start is not None:
+        shared._pending_start()
+        # The engine fills the table of the shared copy while starting.
+        callback = shared._commands.get(cmd_id)
+    if callback is None:
+        logger.warning("No Shotgun command registered for menu id %s", cmd_id)
+        return
+    callback()
+
+
+def stub_script(cmd_id):
+    """
+    Get the menu script body that dispatches to the given command id.
+
+    :param str cmd_id: The id of the command, see :func:`command_id`.
+    :rtype: list(str)
+    """
+    return [
+        "import {}".format(MODULE_NAME),
+        "if __name__ == '__main__':",
+        "   {}.run({!r})".format(MODULE_NAME, str(cmd_id)),
+    ]
@@ -13,7 +13,7 @@ Menu handling for 3DE4
 
 """
 from collections import defaultdict
-from itertools import count
+import hashlib
 import os
 import sys
 import unicodedata
@@ -21,6 +21,8 @@ import unicodedata
 import sgtk
 from sgtk.platform.qt import QtGui, QtCore
 
+from . import deferred_start, menu_dispatch
+
 
 class MenuGenerator(object):
     """
@@ -28,6 +30,7 @@ class MenuGenerator(object):
     """
     MENU_SEP = "::"
     ROOT_UI_ITEM = "Main Window::Shotgun"
+    SCRIPT_EXT = ".py"
 
     def __init__(self, engine):
         """
@@ -36,8 +39,16 @@ class MenuGenerator(object):
         :param engine: The shotgun engine instance.
         """
         self._engine = engine
-        self._current_menu_index = count()
+        self._entries = {}
+        self._dispatch_table = {}
+        # Deferred starts render the menu from the manifest of dispatcher stubs.
+        self.use_dispatcher = bool(
+            engine.get_setting("menu_dispatcher") or os.environ.get(deferred_start.DEFERRED_ENV)
+        )
+        self.manifest = []
         self.custom_scripts_dir_path = os.environ["TK_3DE4_MENU_DIR"]
+        self.stats = {"written": 0, "skipped": 0, "deleted": 0}
+        self.last_stats = dict(self.stats)
 
     ##########################################################################################
     # public methods
@@ -54,22 +65,23 @@ class MenuGenerator(object):
     def create_menu(self):
         """
         Render the entire Shotgun menu.
-        In order to have commands enable/disable themselves based on the enable_callback,
-        re-create the menu items every time.
+
+        The menu is first built in memory, then compared against the scripts
+        already in the menu directory. Only entries whose content changed are
+        written, and scripts that are no longer part of the menu are deleted.
+
+        :returns: True if any menu file was written or deleted, meaning 3DE
+                  needs to rescan its python directories.
+        :rtype: bool
         """
         self.logger.info("Creating Shotgun menu...")
+        self._entries = {}
+        self._dispatch_table = {}
+        self.manifest = []
 
-        # Get temp folder path and create it if needed.
-        if not os.path.isdir(self.custom_scripts_dir_path):
-            self.logger.debug("Creating menu directory %s", self.custom_scripts_dir_path)
-            os.makedirs(self.custom_scripts_dir_path)
-        # Clear it.
-        for item in os.listdir(self.custom_scripts_dir_path):
-            self.logger.debug("Removing menu file: %s", item)
-            os.remove(os.path.join(self.custom_scripts_dir_path, item))
-
+        index = CommandIndex(self._engine)
         menu_items = [
-            AppCommand(cmd_name, cmd_details)
+            AppCommand(cmd_name, cmd_details, index)
             for cmd_name, cmd_details in self._engine.commands.items()
         ]
 
@@ -105,23 +117,78 @@ class MenuGenerator(object):
                 self.logger.debug("Adding %s to %s", cmd.name, parent_menu)
                 self._add_command_to_menu(cmd, parent_menu)
 
+        if self.use_dispatcher:
+            menu_dispatch.install()
+            menu_dispatch.set_commands(self._dispatch_table)
+        # Written in both layouts, as it also keys the menu templates.
+        manifest_path = os.environ.get(deferred_start.MANIFEST_ENV)
+        if manifest_path:
+            deferred_start.write_manifest(manifest_path, self.manifest)
+        return self._sync_menu_dir()
+
+    ##########################################################################################
+    # menu directory synchronisation
+
+    def _sync_menu_dir(self):
+        """
+        Write the in-memory menu to the menu directory, touching only the
+        files whose content differs from what is already on disk.
+
+        :returns: True if any file was written or deleted.
+        :rtype: bool
+        """
+        # Get temp folder path and create it if needed.
+        if not os.path.isdir(self.custom_scripts_dir_path):
+            self.logger.debug("Creating menu directory %s", self.custom_scripts_dir_path)
+            os.makedirs(self.custom_scripts_dir_path)
+
+        on_disk = {}
+        for item in os.listdir(self.custom_scripts_dir_path):
+            if item.endswith(self.SCRIPT_EXT):
+                item_path = os.path.join(self.custom_scripts_dir_path, item)
+                with open(item_path, "rb") as menu_file:
+                    on_disk[item] = _content_hash(menu_file.read())
+
+        stats = {"written": 0, "skipped": 0, "deleted": 0}
+        for file_name, content in self._entries.items():
+            if on_disk.pop(file_name, None) == _content_hash(content):
+                stats["skipped"] += 1
+                continue
+            self.logger.debug("Writing menu file: %s", file_name)
+            script_path = os.path.join(self.custom_scripts_dir_path, file_name)
+            with open(script_path, "wb") as menu_file:
+                menu_file.write(content)
+            stats["written"] += 1
+
+        # Anything left over is no longer part of the menu.
+        for file_name in on_disk:
+            self.logger.debug("Removing menu file: %s", file_name)
+            os.remove(os.path.join(self.custom_scripts_dir_path, file_name))
+            stats["deleted"] += 1
+
+        self.last_stats = stats
+        for key, value in stats.items():
+            self.stats[key] += value
+        self.logger.debug(
+            "Menu files written: %(written)d, skipped: %(skipped)d, deleted: %(deleted)d",
+            stats
+        )
+        return bool(stats["written"] or stats["deleted"])
+
     ##########################################################################################
     # context menu and UI
 
     def _add_script_to_menu(self, name, parent_menu, script):
         """
-        Add a custom script to the 3de menu.
+        Add a custom script to the in-memory 3de menu. Nothing is written to
+        disk until the menu directory is synchronised.
 
         :param str name: The name of the menu item.
         :param str parent_menu: The name of the parent menu item.
         :param list(str) script: The callback to run, split line-by-line.
         """
-        index = self._current_menu_index.next()
-        script_path = os.path.join(self.custom_scripts_dir_path, "{:04d}.py".format(index))
-        with open(script_path, "w") as menu_file:
-            menu_file.write("# 3DE4.script.name: {}\n".format(name))
-            menu_file.write("# 3DE4.script.gui:	{}\n".format(parent_menu))
-            menu_file.write("\n".join(script))
+        file_name = menu_file_name(name, parent_menu)
+        self._entries[file_name] = render_menu_script(name, parent_menu, script)
 
     def _add_command_to_menu(self, cmd, parent_menu, favourite=False):
         """
@@ -131,34 +198,152 @@ class MenuGenerator(object):
         :param str parent_menu: The name of the parent menu item.
         :param bool favourite: Is the command a favourite command.
         """
-        script = [
-            "import sgtk",
-            "if __name__ == '__main__':",
-            "   engine = sgtk.platform.current_engine()",
-            "   engine.commands[{!r}]['callback']()".format(cmd.name),
-        ]
         name = cmd.name
         if favourite:
             # Dashes come after spaces but before letters in ordering
             name = "- {}".format(cmd.name)
+        cmd_id = menu_dispatch.command_id(cmd.name)
+        self.manifest.append({
+            "command": cmd.name,
+            "app": cmd.get_app_instance_name(),
+            "type": cmd.get_type(),
+            "favourite": favourite,
+            "name": name,
+            "parent_menu": parent_menu,
+            "cmd_id": cmd_id,
+            "dispatcher": self.use_dispatcher,
+        })
+        if self.use_dispatcher:
+            self._dispatch_table[cmd_id] = cmd.callback
+            script = menu_dispatch.stub_script(cmd_id)
+        else:
+            script = [
+                "import sgtk",
+                "if __name__ == '__main__':",
+                "   engine = sgtk.platform.current_engine()",
+                "   engine.commands[{!r}]['callback']()".format(cmd.name),
+            ]
         self._add_script_to_menu(name, parent_menu, script)
 
 
+def menu_file_name(name, parent_menu):
+    """
+    Get the name of the script file of a menu item.
+
+    The file is named after the menu location rather than its position, so
+    unrelated entries keep their file when commands come and go.
+
+    :param str name: The name of the menu item.
+    :param str parent_menu: The name of the parent menu item.
+    :rtype: str
+    """
+    key = _encode(MenuGenerator.MENU_SEP.join([parent_menu, name]))
+    return hashlib.sha1(key).hexdigest()[:16] + MenuGenerator.SCRIPT_EXT
+
+
+def render_menu_script(name, parent_menu, script):
+    """
+    Render the content of the script file of a menu item.
+
+    :param str name: The name of the menu item.
+    :param str parent_menu: The name of the parent menu item.
+    :param list(str) script: The callback to run, split line-by-line.
+    :rtype: bytes
+    """
+    lines = [
+        "# 3DE4.script.name: " + name,
+        "# 3DE4.script.gui:	" + parent_menu,
+    ]
+    lines.extend(script)
+    return b"\n".join(_encode(line) for line in lines)
+
+
+def _encode(text):
+    """
+    Encode text to utf-8 bytes if it isn't already.
+
+    :param text: The text to encode.
+    :rtype: bytes
+    """
+    if isinstance(text, bytes):
+        return text
+    return text.encode("utf-8")
+
+
+def _content_hash(content):
+    """
+    Hash the content of a menu file.
+
+    :param bytes content: The file content.
+    :rtype: str
+    """
+    return hashlib.sha1(content).hexdigest()
+
+
+class CommandIndex(object):
+    """
+    Lookups shared by all the commands of a single menu rebuild, so that each
+    command doesn't have to walk the engine apps and favourites setting.
+    """
+    __slots__ = ("app_instance_names", "favourites")
+
+    def __init__(self, engine):
+        """
+        Initialise the class.
+
+        :param engine: The shotgun engine instance.
+        """
+        self.app_instance_names = dict(
+            (id(app_instance_obj), app_instance_name)
+            for app_instance_name, app_instance_obj in engine.apps.items()
+        )
+        self.favourites = set(
+            (fav["app_instance"], fav["name"])
+            for fav in engine.get_setting("menu_favourites") or []
+        )
+
+    def get_app_instance_name(self, app_instance):
+        """
+        Returns the name of the given app instance, as defined in the environment.
+
+        :param app_instance: The app instance object.
+        :rtype: str or Nonetype
+        """
+        return self.app_instance_names.get(id(app_instance))
+
+    def is_favourite(self, app_instance_name, name):
+        """
+        Check if a command is specified as a favourite.
+
+        :param str app_instance_name: The name of the app instance.
+        :param str name: The name of the command.
+        :rtype: bool
+        """
+        return (app_instance_name, name) in self.favourites
+
+
 class AppCommand(object):
     """
     Wraps around a single command that you get from engine.commands
     """
+    __slots__ = ("name", "properties", "callback", "favourite", "_index")
 
-    def __init__(self, name, command_dict):
+    def __init__(self, name, command_dict, index=None):
         """
         Initialise the class.
 
         :param str name: The name fo the command.
         :param dict command_dict: The dictionary defining this command.
+        :param CommandIndex index: Lookups shared with the other commands of
+                                   the menu. Built from the app's engine if
+                                   not given.
         """
         self.name = name
         self.properties = command_dict["properties"]
         self.callback = command_dict["callback"]
+        if index is None and "app" in self.properties:
+            index = CommandIndex(self.properties["app"].engine)
+        self._index = index
         self.favourite = self._is_app_favourite()
 
     def _is_app_favourite(self):
@@ -169,15 +354,7 @@ class AppCommand(object):
         """
         if "app" not in self.properties:
             return False
-        app_instance = self.properties["app"]
-        engine = app_instance.engine
-        app_instance_name = self.get_app_instance_name()
-        for fav in engine.get_setting("menu_favourites"):
-            fav_app_instance_name = fav["app_instance"]
-            menu_name = fav["name"]
-            if app_instance_name == fav_app_instance_name and self.name == menu_name:
-                return True
-        return False
+        return self._index.is_favourite(self.get_app_instance_name(), self.name)
 
     def get_app_name(self):
         """
@@ -198,16 +375,7 @@ class AppCommand(object):
         """
         if "app" not in self.properties:
             return None
-
-        app_instance = self.properties["app"]
-        engine = app_instance.engine
-
-        for app_instance_name, app_instance_obj in engine.apps.items():
-            if app_instance_obj == app_instance:
-                # found our app!
-                return app_instance_name
-
-        return None
+        return self._index.get_app_instance_name(self.properties["app"])
 
     def get_type(self):
         """
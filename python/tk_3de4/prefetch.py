@@ -0,0 +1,187 @@
+"""
+Background scans of the image sequences shown in the loader.
+
+"""
+from collections import OrderedDict, deque
+import os
+import threading
+import time
+
+from .sequences import SequenceIndex, _dir_signature, scan_sequence
+
+
+class SequencePrefetcher(object):
+    """
+    Scans the sequences of publishes on a background thread, ahead of them
+    being imported, into a bounded cache keyed by publish id and path.
+
+    The scans run one at a time, most recently requested first, and the
+    requests not started yet are dropped past ``max_pending``.
+
+    Each scan records the mtime and inode of the sequence directory, like
+    :class:`~tk_3de4.sequences.SequenceIndex`. Imports only use a scan that
+    found frames, of a directory unchanged since. Loader captions use any
+    scan younger than ``max_age`` seconds, without touching the disk.
+    """
+
+    def __init__(self, max_size=256, max_pending=32, max_age=300.0, logger=None):
+        """
+        Initialise the class.
+
+        :param int max_size: The number of scans kept.
+        :param int max_pending: The number of scans waiting to run kept.
+        :param float max_age: The age in seconds after which a scan isn't
+                              shown in captions anymore.
+        :param logger: The logger to report scan errors to.
+        """
+        self.max_size = max_size
+        self.max_age = max_age
+        self.logger = logger
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._pending = deque(maxlen=max_pending)
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def prefetch(self, publish_id, path, index=None):
+        """
+        Queue the scan of a sequence, unless a scan younger than ``max_age``
+        is cached.
+
+        :param int publish_id: The id of the publish.
+        :param str path: The sequence path.
+        :param index: Optional :class:`~tk_3de4.sequences.SequenceIndex` of
+                      previous scans.
+        """
+        key = (publish_id, path)
+        with self._condition:
+            if self._get(key) is not None:
+                return
+            if (key, index) in self._pending:
+                self._pending.remove((key, index))
+            self._pending.append((key, index))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tk-3de4 prefetch")
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+
+    def lookup(self, publish_id, path):
+        """
+        Get the cached scan of a sequence, for display only: the directory
+        may have changed since.
+
+        :param int publish_id: The id of the publish.
+        :param str path: The sequence path.
+        :returns: Whether a scan younger than ``max_age`` is cached, and the
+                  scan, as returned by :func:`~tk_3de4.sequences.scan_sequence`.
+        :rtype: tuple(bool, SequenceInfo or Nonetype)
+        """
+        with self._condition:
+            entry = self._get((publish_id, path))
+        if entry is None:
+            return False, None
+        return True, entry[2]
+
+    def scanner(self, publish_id):
+        """
+        Get a replacement for :func:`~tk_3de4.sequences.scan_sequence` using
+        the cached scans of a publish that found frames, of a directory
+        unchanged since, and caching the scans it runs.
+
+        :param int publish_id: The id of the publish.
+        :rtype: callable
+        """
+        def scan(path, index=None):
+            key = (publish_id, path)
+            with self._condition:
+                entry = self._cache.get(key)
+            if entry is not None and entry[1] is not None and entry[2] is not None:
+                try:
+                    signature = _dir_signature(os.stat(os.path.dirname(path)))
+                except OSError:
+                    signature = None
+                if signature == entry[1]:
+                    self.hits += 1
+                    return entry[2]
+            self.misses += 1
+            signature, info = _scan(path, index)
+            with self._condition:
+                self._put(key, signature, info)
+            return info
+        return scan
+
+    def _get(self, key):
+        """
+        Get a recent cache entry. The lock must be held.
+
+        :param tuple key: The publish id and path.
+        :returns: The time, directory signature and result of the scan, or None.
+        :rtype: tuple or Nonetype
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.max_age:
+            del self._cache[key]
+            return None
+        # Most recently used last.
+        del self._cache[key]
+        self._cache[key] = entry
+        return entry
+
+    def _put(self, key, signature, info):
+        """
+        Cache a scan. The lock must be held.
+
+        :param tuple key: The publish id and path.
+        :param signature: The signature of the sequence directory, or None
+                          if it can't be trusted.
+        :param info: The scan result.
+        """
+        self._cache.pop(key, None)
+        self._cache[key] = (time.time(), signature, info)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def _run(self):
+        """
+        Scan thread loop.
+        """
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                key, index = self._pending.pop()
+            try:
+                signature, info = _scan(key[1], index)
+            except Exception:
+                # Not cached, the import scans the sequence again.
+                if self.logger is not None:
+                    self.logger.exception("Failed to prefetch '%s'", key[1])
+                continue
+            with self._condition:
+                self._put(key, signature, info)
+
+
+def _scan(path, index=None):
+    """
+    Scan a sequence, along with the signature of its directory.
+
+    :param str path: The sequence path.
+    :param index: Optional :class:`~tk_3de4.sequences.SequenceIndex` of
+                  previous scans.
+    :returns: The signature of the directory, None if it was modified too
+              recently to be trusted, and the scan result.
+    :rtype: tuple
+    """
+    try:
+        dir_stat = os.stat(os.path.dirname(path))
+    except OSError:
+        dir_stat = None
+    scanned = time.time()
+    info = scan_sequence(path, index)
+    if dir_stat is None or scanned - dir_stat.st_mtime < SequenceIndex.RACY_DELAY:
+        return None, info
+    return _dir_signature(dir_stat), info
@@ -0,0 +1,338 @@
+"""
+Local-first project saves for 3DE4.
+
+3DE saves the project to a scratch copy on local disk, which a background
+thread then copies to its real, usually networked, path. The copy is written
+next to the real path, verified against the checksum of the scratch copy and
+renamed over the real path, so the real path only ever holds complete saves.
+
+Each scratch copy has a ``.sync`` file next to it, holding its real path and
+the modification time of its last synced save. A session started after a
+crash can then still map the scratch copies 3DE reopens to their real paths,
+and sync the saves the crashed session didn't.
+
+"""
+import errno
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+CHUNK_SIZE = 1024 * 1024
+STATE_EXT = ".sync"
+
+
+class ProjectSync(object):
+    """
+    Saves projects to local scratch copies and syncs them to their real path
+    from a background thread.
+
+    Saves made from 3DE's own menus go to the scratch copy too, since 3DE
+    keeps it as the project path. :meth:`poll` picks those up from their
+    modification time.
+
+    Failed syncs are kept in :attr:`failures` until a later sync of the same
+    project succeeds, and are handed out once by :meth:`new_failures`.
+    """
+
+    def __init__(self, local_root, logger, poll_interval=1.0):
+        """
+        Initialise the class.
+
+        :param str local_root: The local folder holding the scratch copies.
+        :param logger: The logger to report sync errors to.
+        :param float poll_interval: Minimum seconds between checks of the
+                                    scratch copies for saves made from 3DE.
+        """
+        self.local_root = local_root
+        self.logger = logger
+        self.failures = {}
+        self._new_failures = []
+        self._poll_interval = poll_interval
+        self._next_poll = 0.0
+        self._real_paths = {}
+        self._synced_mtimes = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._load_states()
+
+    @property
+    def pending(self):
+        """
+        :returns: The real paths waiting to be synced.
+        :rtype: set(str)
+        """
+        with self._lock:
+            return set(self._pending)
+
+    def local_path(self, real_path):
+        """
+        Get the scratch copy of a project.
+
+        :param str real_path: The real path of the project.
+        :rtype: str
+        """
+        folder = os.path.dirname(os.path.abspath(real_path))
+        if not isinstance(folder, bytes):
+            folder = folder.encode("utf-8")
+        return os.path.join(
+            self.local_root, hashlib.sha1(folder).hexdigest()[:16], os.path.basename(real_path)
+        )
+
+    def real_path(self, path):
+        """
+        Get the real path of a project.
+
+        :param str path: A project path, as returned by 3DE.
+        :returns: The real path the scratch copy at ``path`` is synced to, or
+                  ``path`` if it isn't a scratch copy.
+        :rtype: str
+        """
+        return self._real_paths.get(path, path)
+
+    def new_failures(self):
+        """
+        Get the syncs which failed since the last call.
+
+        :returns: The failed real paths with their scratch copy and error
+                  message, oldest first.
+        :rtype: list(tuple(str, str, str))
+        """
+        with self._lock:
+            failures, self._new_failures = self._new_failures, []
+        return failures
+
+    def save(self, real_path, save):
+        """
+        Save a project to its scratch copy and queue its sync.
+
+        :param str real_path: The real path of the project.
+        :param save: Callable saving the project to the path it is given.
+        """
+        local_path = self.local_path(real_path)
+        _makedirs(os.path.dirname(local_path))
+        save(local_path)
+        if self._real_paths.get(local_path) != real_path:
+            self._real_paths[local_path] = real_path
+            self._write_state(local_path, real_path, None)
+        self._queue_sync(local_path)
+
+    def poll(self):
+        """
+        Queue the sync of the scratch copies saved from 3DE since their last
+        sync. Called from the 3DE timer.
+        """
+        now = time.time()
+        if now < self._next_poll:
+            return
+        self._next_poll = now + self._poll_interval
+        for local_path in list(self._real_paths):
+            try:
+                mtime = os.path.getmtime(local_path)
+            except OSError:
+                continue
+            if mtime != self._synced_mtimes.get(local_path):
+                self._queue_sync(local_path)
+
+    def flush(self):
+        """
+        Wait for all the queued syncs to finish.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        Finish the queued syncs, then stop the sync thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _queue_sync(self, local_path):
+        """
+        Queue the sync of a scratch copy, unless it is already queued.
+
+        :param str local_path: The scratch copy.
+        """
+        try:
+            self._synced_mtimes[local_path] = os.path.getmtime(local_path)
+        except OSError:
+            return
+        real_path = self._real_paths[local_path]
+        with self._lock:
+            if real_path in self._pending:
+                return
+            self._pending.add(real_path)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tk-3de4 project sync")
+            self._thread.daemon = True
+            self._thread.start()
+        self._queue.put((local_path, real_path))
+
+    def _run(self):
+        """
+        Sync thread loop.
+        """
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                local_path, real_path = item
+                with self._lock:
+                    # Saves from now on need a new sync.
+                    self._pending.discard(real_path)
+                try:
+                    synced_mtime = self._sync(local_path, real_path)
+                    if synced_mtime is not None:
+                        self._write_state(local_path, real_path, synced_mtime)
+                except Exception as error:
+                    self.logger.error(
+                        "Failed to sync '%s' to '%s', the latest save is kept in '%s': %s",
+                        local_path, real_path, local_path, error,
+                    )
+                    with self._lock:
+                        self.failures[real_path] = (local_path, str(error))
+                        self._new_failures.append((real_path, local_path, str(error)))
+                else:
+                    with self._lock:
+                        self.failures.pop(real_path, None)
+            finally:
+                self._queue.task_done()
+
+    def _sync(self, local_path, real_path):
+        """
+        Copy a scratch copy to its real path.
+
+        :param str local_path: The scratch copy.
+        :param str real_path: The real path of the project.
+        :returns: The modification time of the synced save, or None if the
+                  scratch copy changed while being copied.
+        :rtype: float or Nonetype
+        :raises IOError: If the copy doesn't match the scratch copy.
+        """
+        before = os.stat(local_path)
+        folder = os.path.dirname(real_path)
+        _makedirs(folder)
+        temp_path = os.path.join(
+            folder, ".{}.{}.tmp".format(os.path.basename(real_path), os.getpid())
+        )
+        try:
+            checksum = hashlib.sha1()
+            with open(local_path, "rb") as source, open(temp_path, "wb") as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    checksum.update(chunk)
+                    target.write(chunk)
+                target.flush()
+                os.fsync(target.fileno())
+            after = os.stat(local_path)
+            if (before.st_mtime, before.st_size) != (after.st_mtime, after.st_size):
+                # Saved again while copying, the new save has its own sync queued.
+                self.logger.debug("'%s' changed while syncing, skipping", local_path)
+                return None
+            if _file_checksum(temp_path) != checksum.hexdigest():
+                raise IOError("'{}' doesn't match '{}'".format(temp_path, local_path))
+            _replace(temp_path, real_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.logger.debug("Synced '%s' to '%s'", local_path, real_path)
+        return before.st_mtime
+
+    def _load_states(self):
+        """
+        Read the real paths and last synced saves of the scratch copies left
+        by earlier sessions. Scratch copies saved since their last sync are
+        synced by the next :meth:`poll`.
+        """
+        for state_path in glob.glob(os.path.join(self.local_root, "*", "*" + STATE_EXT)):
+            local_path = state_path[:-len(STATE_EXT)]
+            try:
+                with open(state_path) as state_file:
+                    state = json.load(state_file)
+            except (IOError, OSError, ValueError):
+                continue
+            if not isinstance(state, dict) or not state.get("real_path"):
+                continue
+            if not os.path.exists(local_path):
+                continue
+            self._real_paths[local_path] = state["real_path"]
+            self._synced_mtimes[local_path] = state.get("synced_mtime")
+
+    def _write_state(self, local_path, real_path, synced_mtime):
+        """
+        Atomically replace the ``.sync`` file of a scratch copy. Failures are
+        only logged, the sync itself doesn't depend on it.
+
+        :param str local_path: The scratch copy.
+        :param str real_path: The real path of the project.
+        :param synced_mtime: The modification time of the last synced save,
+                             or None if it was never synced.
+        :type synced_mtime: float or Nonetype
+        """
+        state_path = local_path + STATE_EXT
+        try:
+            handle, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(local_path), suffix=".tmp"
+            )
+            with os.fdopen(handle, "w") as state_file:
+                json.dump({"real_path": real_path, "synced_mtime": synced_mtime}, state_file)
+            _replace(temp_path, state_path)
+        except (IOError, OSError) as error:
+            self.logger.warning("Failed to write '%s': %s", state_path, error)
+
+
+def _file_checksum(path):
+    """
+    Get the SHA-1 checksum of a file.
+
+    :param str path: The file path.
+    :rtype: str
+    """
+    checksum = hashlib.sha1()
+    with open(path, "rb") as checked_file:
+        for chunk in iter(lambda: checked_file.read(CHUNK_SIZE), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def _replace(source, target):
+    """
+    Rename a file over another one.
+
+    :param str source: The file to rename.
+    :param str target: The file to replace.
+    """
+    replace = getattr(os, "replace", None)
+    if replace is not None:
+        replace(source, target)
+        return
+    if os.name == "nt" and os.path.exists(target):
+        os.remove(target)
+    os.rename(source, target)
+
+
+def _makedirs(path):
+    """
+    Create a directory and its parents, if they don't exist.
+
+    :param str path: The directory path.
+    """
+    try:
+        os.makedirs(path)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
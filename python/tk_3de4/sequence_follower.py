@@ -0,0 +1,135 @@
+"""
+Following image sequences that are still being written.
+
+"""
+import os
+import threading
+import time
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from sgtk.platform.qt import QtCore
+
+
+class SequenceFollower(object):
+    """
+    Watches the directory of a sequence for new frames and reports how far
+    the sequence runs without gaps from its first frame.
+
+    New frames are signalled by a file watcher on the directory and, as a
+    fallback for network file systems, by a low frequency poll. Only the
+    frames after the last one found are checked, on a worker thread, so the
+    cost of a check doesn't grow with the directory. The extension callback
+    runs on the main thread, from :meth:`tick`, at most once per tick.
+    """
+
+    def __init__(self, spec, start, end, step, expected_end=None, on_extend=None,
+                 on_done=None, poll_interval=2.0, idle_timeout=3600.0):
+        """
+        Initialise the class.
+
+        :param spec: The sequence.
+        :type spec: :class:`~tk_3de4.sequences.SequenceSpec`
+        :param int start: The first frame.
+        :param int end: The last frame already in use.
+        :param int step: The frame step.
+        :param int expected_end: The last frame of the complete sequence, if
+                                 known. Following stops once it is on disk.
+        :param on_extend: Callable run with the new last frame when the
+                          sequence grew.
+        :param on_done: Callable run with the last frame when following stops.
+        :param float poll_interval: Seconds between fallback rescans.
+        :param float idle_timeout: Seconds without new frames after which
+                                   following stops.
+        """
+        self.spec = spec
+        self.start = start
+        self.end = end
+        self.step = step
+        self.expected_end = expected_end
+        self.done = False
+        self._on_extend = on_extend
+        self._on_done = on_done
+        self._poll_interval = poll_interval
+        self._idle_timeout = idle_timeout
+        self._next_poll = 0.0
+        self._last_growth = time.time()
+        self._dirty = False
+        self._scanning = False
+        self._results = queue.Queue()
+        self._watcher = None
+
+    def start_watching(self):
+        """
+        Watch the sequence directory for new frames.
+        """
+        self._watcher = QtCore.QFileSystemWatcher([self.spec.directory])
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+
+    def stop(self):
+        """
+        Stop following the sequence.
+        """
+        self.done = True
+        self._watcher = None
+
+    def tick(self):
+        """
+        Run the main thread part of the following. Called from the 3DE timer.
+        """
+        if self.done:
+            return
+        now = time.time()
+        if not self._scanning and (self._dirty or now >= self._next_poll):
+            self._dirty = False
+            self._next_poll = now + self._poll_interval
+            self._scanning = True
+            worker = threading.Thread(target=self._scan, name="tk-3de4 sequence follow")
+            worker.daemon = True
+            worker.start()
+
+        end = self.end
+        while True:
+            try:
+                end = max(end, self._results.get_nowait())
+            except queue.Empty:
+                break
+        if end > self.end:
+            self.end = end
+            self._last_growth = now
+            if self._on_extend is not None:
+                self._on_extend(end)
+
+        if self.expected_end is not None and self.end >= self.expected_end:
+            self._finish()
+        elif now - self._last_growth > self._idle_timeout:
+            self._finish()
+
+    def _finish(self):
+        """
+        Stop following and report the final range.
+        """
+        self.stop()
+        if self._on_done is not None:
+            self._on_done(self.end)
+
+    def _on_directory_changed(self, _):
+        """
+        Called by the file watcher when the sequence directory changed.
+        """
+        self._dirty = True
+
+    def _scan(self):
+        """
+        Worker thread, checks for the frames following the last one found.
+        """
+        try:
+            end = self.end
+            while os.path.isfile(os.path.join(self.spec.directory, self.spec.frame_name(end + self.step))):
+                end += self.step
+            self._results.put(end)
+        finally:
+            self._scanning = False
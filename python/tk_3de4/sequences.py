@@ -0,0 +1,441 @@
+"""
+Image sequence scanning for 3DE4.
+
+"""
+from collections import defaultdict
+import errno
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+# %04d, %d, ####, @@@@, $F4, $F. Runs of # or @ only when a whole field of the
+# file name, so e.g. "plate@2x.exr" is a single image.
+FRAME_SPEC_PATTERN = re.compile(r"%0?(\d*)d|(?:^|(?<=[._-]))(?:#+|@+)(?=[._-]|$)|\$F(\d*)")
+
+
+class SequenceSpec(object):
+    """
+    The parts of a sequence path around its frame specification.
+    """
+    __slots__ = ("path", "directory", "prefix", "suffix", "padding")
+
+    def __init__(self, path, directory, prefix, suffix, padding):
+        """
+        Initialise the class.
+
+        :param str path: The sequence path, as given.
+        :param str directory: The directory holding the frames.
+        :param str prefix: The file name before the frame number.
+        :param str suffix: The file name after the frame number.
+        :param int padding: The minimum number of digits of a frame number.
+        """
+        self.path = path
+        self.directory = directory
+        self.prefix = prefix
+        self.suffix = suffix
+        self.padding = padding
+
+    @property
+    def key(self):
+        """
+        Identifies the sequence within its directory.
+
+        :rtype: str
+        """
+        return json.dumps([self.prefix, self.padding, self.suffix])
+
+    @property
+    def hash_path(self):
+        """
+        The sequence path in a format that 3DE can read (####).
+
+        :rtype: str
+        """
+        return os.path.join(self.directory, self.prefix + "#" * self.padding + self.suffix)
+
+    def frame_name(self, frame):
+        """
+        Get the file name of a frame of this sequence.
+
+        :param int frame: The frame number.
+        :rtype: str
+        """
+        return "{}{}{}".format(self.prefix, str(frame).zfill(self.padding), self.suffix)
+
+    def match(self, file_name):
+        """
+        Get the frame number of a file name belonging to this sequence.
+
+        :param str file_name: The name of the file, without directory.
+        :returns: The frame number, or None if the file isn't a frame of this sequence.
+        :rtype: int or Nonetype
+        """
+        if not (file_name.startswith(self.prefix) and file_name.endswith(self.suffix)):
+            return None
+        number = file_name[len(self.prefix):len(file_name) - len(self.suffix)]
+        if len(number) < self.padding or not number.isdigit():
+            return None
+        if len(number) > self.padding and number[0] == "0":
+            # Longer than the padding, so it can't be zero padded.
+            return None
+        return int(number)
+
+
+class SequenceInfo(object):
+    """
+    The frames found on disk for a sequence.
+    """
+    __slots__ = ("spec", "frames", "step", "missing")
+
+    def __init__(self, spec, frames):
+        """
+        Initialise the class.
+
+        :param SequenceSpec spec: The sequence.
+        :param list(int) frames: The sorted, non empty list of frame numbers found.
+        """
+        self.spec = spec
+        self.frames = frames
+        self.step = 1
+        self.missing = []
+        if len(frames) > 1:
+            self.step = min(b - a for a, b in zip(frames, frames[1:]))
+            for a, b in zip(frames, frames[1:]):
+                if b - a != self.step:
+                    self.missing.append((a + self.step, b - self.step))
+
+    @property
+    def start(self):
+        """
+        The first frame on disk.
+
+        :rtype: int
+        """
+        return self.frames[0]
+
+    @property
+    def end(self):
+        """
+        The last frame on disk.
+
+        :rtype: int
+        """
+        return self.frames[-1]
+
+    @property
+    def hash_path(self):
+        """
+        The sequence path in a format that 3DE can read (####).
+
+        :rtype: str
+        """
+        return self.spec.hash_path
+
+
+def parse_sequence_path(path):
+    """
+    Split a sequence path around its frame specification.
+
+    :param str path: A path using ``%0Nd``, ``####``, ``@`` or ``$F`` to
+                     denote the frame number.
+    :returns: The spec, or None if the path isn't a sequence.
+    :rtype: SequenceSpec or Nonetype
+    """
+    directory, file_name = os.path.split(path)
+    matches = list(FRAME_SPEC_PATTERN.finditer(file_name))
+    if not matches:
+        return None
+    # The frame number is the last specification in the file name.
+    frame_match = matches[-1]
+    spec = frame_match.group(0)
+    if spec.startswith("%"):
+        padding = int(frame_match.group(1) or 1)
+    elif spec.startswith("$F"):
+        padding = int(frame_match.group(2) or 1)
+    else:
+        padding = len(spec)
+    return SequenceSpec(
+        path,
+        directory,
+        file_name[:frame_match.start()],
+        file_name[frame_match.end():],
+        padding,
+    )
+
+
+def iter_file_names(directory):
+    """
+    Stream the names of the files in a directory.
+
+    :param str directory: The directory to list.
+    :raises OSError: The directory can't be read.
+    """
+    if scandir is None:
+        for name in os.listdir(directory):
+            yield name
+        return
+    for entry in scandir(directory):
+        if not entry.is_dir():
+            yield entry.name
+
+
+class SequenceIndex(object):
+    """
+    On disk index of sequence scans, so that sequences in a directory that
+    hasn't changed since it was last scanned can be resolved without listing
+    it again.
+
+    There is one JSON file per directory, recording the directory's mtime and
+    inode along with the frames, step and padding of every sequence scanned
+    in it. A directory whose mtime or inode differs from the recorded one is
+    scanned again.
+    """
+
+    # Directories modified this close to the scan are not trusted, as files
+    # could be added within the mtime resolution of the file system.
+    RACY_DELAY = 2.0
+
+    def __init__(self, root):
+        """
+        Initialise the class.
+
+        :param str root: The directory to store the index in.
+        """
+        self.root = root
+
+    def lookup(self, directory, dir_stat, specs):
+        """
+        Get the indexed frames of sequences in a directory.
+
+        :param str directory: The directory holding the sequences.
+        :param dir_stat: The current ``os.stat`` result of the directory.
+        :param list(SequenceSpec) specs: The sequences to look up.
+        :returns: A dictionary mapping the key of each indexed spec to its
+                  sorted frames, possibly empty.
+        :rtype: dict
+        """
+        data = self._read(directory)
+        if data is None or data["signature"] != _dir_signature(dir_stat):
+            return {}
+        found = {}
+        for spec in specs:
+            runs = data["sequences"].get(spec.key)
+            if runs is not None:
+                found[spec.key] = _frames_from_runs(runs)
+        return found
+
+    def store(self, directory, dir_stat, scanned, frames_by_key):
+        """
+        Record the frames of sequences in a directory.
+
+        :param str directory: The directory holding the sequences.
+        :param dir_stat: The ``os.stat`` result of the directory, taken before
+                         it was listed.
+        :param float scanned: When the directory was listed.
+        :param dict frames_by_key: Mapping of sequence key to its sorted frames.
+        """
+        if scanned - dir_stat.st_mtime < self.RACY_DELAY:
+            return
+        signature = _dir_signature(dir_stat)
+        data = self._read(directory)
+        if data is None or data["signature"] != signature:
+            data = {"directory": directory, "signature": signature, "sequences": {}}
+        for key, frames in frames_by_key.items():
+            data["sequences"][key] = _runs_from_frames(frames)
+        try:
+            self._write(directory, data)
+        except (IOError, OSError):
+            # The index is only an optimisation, scanning again is fine.
+            pass
+
+    def _index_path(self, directory):
+        """
+        Get the path to the index file of a directory.
+
+        :param str directory: The directory holding the sequences.
+        :rtype: str
+        """
+        name = directory
+        if not isinstance(name, bytes):
+            name = name.encode("utf-8")
+        return os.path.join(self.root, hashlib.sha1(name).hexdigest() + ".json")
+
+    def _read(self, directory):
+        """
+        Read the index file of a directory.
+
+        :param str directory: The directory holding the sequences.
+        :returns: The index data of the directory, or None if there is none.
+        :rtype: dict or Nonetype
+        """
+        try:
+            with open(self._index_path(directory)) as index_file:
+                data = json.load(index_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("directory") != directory
+            or not isinstance(data.get("signature"), list)
+            or not isinstance(data.get("sequences"), dict)
+        ):
+            # Another directory with the same hash, or a damaged file.
+            return None
+        data["signature"] = tuple(data["signature"])
+        return data
+
+    def _write(self, directory, data):
+        """
+        Atomically replace the index file of a directory.
+
+        :param str directory: The directory holding the sequences.
+        :param dict data: The index data.
+        """
+        try:
+            os.makedirs(self.root)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+        handle, temp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(handle, "w") as index_file:
+            json.dump(data, index_file)
+        index_path = self._index_path(directory)
+        try:
+            os.rename(temp_path, index_path)
+        except OSError:
+            # Windows won't rename over an existing file.
+            os.remove(index_path)
+            os.rename(temp_path, index_path)
+
+
+def _dir_signature(dir_stat):
+    """
+    Get the values that change when entries are added to or removed from a
+    directory.
+
+    :param dir_stat: The ``os.stat`` result of a directory.
+    :rtype: tuple
+    """
+    return (dir_stat.st_mtime, dir_stat.st_ino)
+
+
+def _runs_from_frames(frames):
+    """
+    Compress sorted frames into ``[start, end, step]`` runs.
+
+    :param list(int) frames: The sorted frames.
+    :rtype: list(list(int))
+    """
+    runs = []
+    for frame in frames:
+        if runs:
+            run = runs[-1]
+            if run[0] == run[1]:
+                run[1], run[2] = frame, frame - run[0]
+                continue
+            if frame - run[1] == run[2]:
+                run[1] = frame
+                continue
+        runs.append([frame, frame, 1])
+    return runs
+
+
+def _frames_from_runs(runs):
+    """
+    Expand ``[start, end, step]`` runs back into sorted frames.
+
+    :param list(list(int)) runs: The runs.
+    :rtype: list(int)
+    """
+    frames = []
+    for start, end, step in runs:
+        frames.extend(range(start, end + 1, step))
+    return frames
+
+
+def scan_sequences(paths, index=None):
+    """
+    Find the frames on disk of several sequences, listing each directory once.
+
+    :param list(str) paths: Sequence paths, see :func:`parse_sequence_path`.
+    :param SequenceIndex index: Optional index of previous scans. Directories
+                                that haven't changed since they were indexed
+                                are not listed again.
+    :returns: A dictionary mapping each path to its :class:`SequenceInfo`, or
+              None if it isn't a sequence or has no frames on disk.
+    :rtype: dict
+    """
+    results = dict.fromkeys(paths)
+    specs_by_dir = defaultdict(list)
+    for path in paths:
+        spec = parse_sequence_path(path)
+        if spec is not None:
+            specs_by_dir[spec.directory].append(spec)
+
+    for directory, specs in specs_by_dir.items():
+        frames_by_key = {}
+        try:
+            if index is not None:
+                dir_stat = os.stat(directory or os.curdir)
+                frames_by_key = index.lookup(directory, dir_stat, specs)
+            to_scan = [spec for spec in specs if spec.key not in frames_by_key]
+            if to_scan:
+                scanned = time.time()
+                frames_by_key.update(_scan_directory(directory, to_scan))
+        except (IOError, OSError):
+            continue
+        if index is not None and to_scan:
+            index.store(
+                directory,
+                dir_stat,
+                scanned,
+                dict((spec.key, frames_by_key[spec.key]) for spec in to_scan),
+            )
+        for spec in specs:
+            frames = frames_by_key.get(spec.key)
+            if frames:
+                results[spec.path] = SequenceInfo(spec, frames)
+    return results
+
+
+def scan_sequence(path, index=None):
+    """
+    Find the frames on disk of a sequence.
+
+    :param str path: The sequence path, see :func:`parse_sequence_path`.
+    :param SequenceIndex index: Optional index of previous scans.
+    :rtype: SequenceInfo or Nonetype
+    """
+    return scan_sequences([path], index)[path]
+
+
+def _scan_directory(directory, specs):
+    """
+    List a directory once, collecting the frames of the given sequences.
+
+    :param str directory: The directory holding the sequences.
+    :param list(SequenceSpec) specs: The sequences to collect.
+    :returns: A dictionary mapping the key of each spec to its sorted frames.
+    :rtype: dict
+    """
+    frames = [[] for _ in specs]
+    for file_name in iter_file_names(directory or os.curdir):
+        for spec, spec_frames in zip(specs, frames):
+            frame = spec.match(file_name)
+            if frame is not None:
+                spec_frames.append(frame)
+    for spec_frames in frames:
+        spec_frames.sort()
+    return dict((spec.key, spec_frames) for spec, spec_frames in zip(specs, frames))
@@ -0,0 +1,271 @@
+"""
+Deduplicating, compressed storage of 3DE4 project snapshots.
+
+Projects are split into content-defined chunks, cut at line ends picked from
+the content of the line, so an edit only changes the chunks around it. Each
+chunk is stored once, zlib compressed and named after its SHA-1, in a store
+folder next to the snapshots. A snapshot itself is a small manifest listing
+its chunks, restored back to a ``.3de`` file by :meth:`SnapshotStore.restore`.
+
+Chunks are shared between snapshots, so deleting a snapshot leaves its chunks
+in the store. :meth:`SnapshotStore.collect_garbage` removes the chunks no
+snapshot of the folder uses any more.
+
+"""
+import errno
+import hashlib
+import json
+import os
+import time
+import zlib
+
+#: First line of the snapshot manifests.
+MANIFEST_HEADER = b"# tk-3de4 snapshot\n"
+#: Name of the chunk store folder, created next to the snapshots.
+STORE_DIR = ".tk-3de4-chunks"
+
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+# Cut after one in 1024 lines on average, once past the minimum chunk size.
+CUT_MASK = 0x3FF
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def is_manifest(path):
+    """
+    Check whether a file is a snapshot manifest.
+
+    :param str path: The file path.
+    :rtype: bool
+    """
+    try:
+        with open(path, "rb") as manifest_file:
+            return manifest_file.read(len(MANIFEST_HEADER)) == MANIFEST_HEADER
+    except (IOError, OSError):
+        return False
+
+
+def iter_chunks(source_file):
+    """
+    Split a file into content-defined chunks.
+
+    :param source_file: The file, opened in binary mode.
+    :returns: The chunks, which join back into the file content.
+    :rtype: iterator(bytes)
+    """
+    pending = b""
+    for block in iter(lambda: source_file.read(BLOCK_SIZE), b""):
+        data = pending + block
+        start = 0
+        while True:
+            # Lines ending before the minimum chunk size are never cut after.
+            line_end = data.find(b"\n", start + MIN_CHUNK_SIZE - 1)
+            line_start = data.rfind(b"\n", start, max(line_end, start)) + 1 or start
+            while 0 <= line_end < start + MAX_CHUNK_SIZE - 1:
+                if not zlib.crc32(data[line_start:line_end + 1]) & CUT_MASK:
+                    break
+                line_start = line_end + 1
+                line_end = data.find(b"\n", line_start)
+            if 0 <= line_end < start + MAX_CHUNK_SIZE - 1:
+                end = line_end + 1
+            elif len(data) - start >= MAX_CHUNK_SIZE:
+                end = start + MAX_CHUNK_SIZE
+            else:
+                # Wait for more data.
+                break
+            yield data[start:end]
+            start = end
+        pending = data[start:]
+    if pending:
+        yield pending
+
+
+class SnapshotStore(object):
+    """
+    A folder of zlib compressed chunks, named after their SHA-1.
+    """
+
+    def __init__(self, root, compression=1):
+        """
+        Initialise the class.
+
+        :param str root: The store folder.
+        :param int compression: The zlib compression level of new chunks.
+        """
+        self.root = root
+        self.compression = compression
+
+    @classmethod
+    def for_snapshot(cls, path):
+        """
+        Get the store of the snapshots in a folder.
+
+        :param str path: The path of a snapshot in the folder.
+        :rtype: :class:`SnapshotStore`
+        """
+        return cls(os.path.join(os.path.dirname(path), STORE_DIR))
+
+    def snapshot(self, source_path, manifest_path):
+        """
+        Store a project and write its manifest.
+
+        :param str source_path: The project to snapshot.
+        :param str manifest_path: The path of the snapshot manifest.
+        :returns: The number of chunks of the project, the number of them new
+                  to the store and the bytes written to the store.
+        :rtype: tuple(int, int, int)
+        """
+        chunks = []
+        new_chunks = 0
+        written = 0
+        checksum = hashlib.sha1()
+        size = 0
+        with open(source_path, "rb") as source_file:
+            for chunk in iter_chunks(source_file):
+                checksum.update(chunk)
+                size += len(chunk)
+                chunk_hash = hashlib.sha1(chunk).hexdigest()
+                chunks.append([chunk_hash, len(chunk)])
+                chunk_path = self._chunk_path(chunk_hash)
+                try:
+                    # Refreshed, so the garbage collection leaves it alone
+                    # until the manifest is written.
+                    os.utime(chunk_path, None)
+                    continue
+                except OSError:
+                    pass
+                data = zlib.compress(chunk, self.compression)
+                _write_atomic(chunk_path, [data])
+                new_chunks += 1
+                written += len(data)
+
+        manifest = {"size": size, "sha1": checksum.hexdigest(), "chunks": chunks}
+        _write_atomic(
+            manifest_path,
+            [MANIFEST_HEADER, json.dumps(manifest, separators=(",", ":")).encode("utf-8")],
+        )
+        return len(chunks), new_chunks, written
+
+    def restore(self, manifest_path, target_path):
+        """
+        Restore a snapshot to a project file.
+
+        :param str manifest_path: The path of the snapshot manifest.
+        :param str target_path: The project file to write.
+        :raises IOError: If a chunk is missing or the restored project doesn't
+                         match the snapshot.
+        """
+        manifest = _read_manifest(manifest_path)
+        checksum = hashlib.sha1()
+
+        def chunks():
+            for chunk_hash, _ in manifest["chunks"]:
+                with open(self._chunk_path(chunk_hash), "rb") as chunk_file:
+                    chunk = zlib.decompress(chunk_file.read())
+                checksum.update(chunk)
+                yield chunk
+
+        _write_atomic(target_path, chunks(), lambda: checksum.hexdigest() == manifest["sha1"])
+
+    def collect_garbage(self, snapshot_dir, min_age=3600):
+        """
+        Remove the chunks not used by any snapshot of a folder, e.g. once old
+        snapshots were deleted, along with the temporary files left behind.
+
+        Chunks written or reused in the last ``min_age`` seconds are kept, as
+        they may belong to a snapshot whose manifest isn't written yet.
+
+        :param str snapshot_dir: The folder of the snapshots using the store.
+        :param int min_age: The age in seconds under which chunks are kept.
+        :returns: The number of files removed and the bytes freed.
+        :rtype: tuple(int, int)
+        :raises ValueError: If a manifest can't be read, in which case nothing
+                            is removed.
+        """
+        referenced = set()
+        for name in os.listdir(snapshot_dir):
+            path = os.path.join(snapshot_dir, name)
+            if is_manifest(path):
+                referenced.update(chunk_hash for chunk_hash, _ in _read_manifest(path)["chunks"])
+
+        removed = 0
+        freed = 0
+        now = time.time()
+        try:
+            prefixes = os.listdir(self.root)
+        except OSError:
+            return removed, freed
+        for prefix in prefixes:
+            folder = os.path.join(self.root, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if prefix + name in referenced:
+                    continue
+                path = os.path.join(folder, name)
+                try:
+                    chunk_stat = os.stat(path)
+                    if now - chunk_stat.st_mtime < min_age:
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+                freed += chunk_stat.st_size
+        return removed, freed
+
+    def _chunk_path(self, chunk_hash):
+        """
+        :param str chunk_hash: The SHA-1 of a chunk.
+        :returns: The path of the chunk in the store.
+        :rtype: str
+        """
+        return os.path.join(self.root, chunk_hash[:2], chunk_hash[2:])
+
+
+def _read_manifest(path):
+    """
+    Read a snapshot manifest.
+
+    :param str path: The path of the manifest.
+    :returns: The size, SHA-1 and chunks of the snapshot.
+    :rtype: dict
+    :raises ValueError: If the manifest can't be parsed.
+    """
+    with open(path, "rb") as manifest_file:
+        return json.loads(manifest_file.read()[len(MANIFEST_HEADER):].decode("utf-8"))
+
+
+def _write_atomic(path, chunks, check=None):
+    """
+    Write a file through a temporary file renamed into place.
+
+    :param str path: The file path.
+    :param chunks: The content of the file.
+    :type chunks: iterable(bytes)
+    :param check: Optional callable, returning False if the written content
+                  is wrong and the file shouldn't be replaced.
+    :raises IOError: If the check failed.
+    """
+    folder = os.path.dirname(path)
+    try:
+        os.makedirs(folder)
+    except OSError as error:
+        if error.errno != errno.EEXIST:
+            raise
+    temp_path = os.path.join(folder, ".{}.{}.tmp".format(os.path.basename(path), os.getpid()))
+    try:
+        with open(temp_path, "wb") as temp_file:
+            for chunk in chunks:
+                temp_file.write(chunk)
+        if check is not None and not check():
+            raise IOError("Content of '{}' doesn't match its checksum".format(path))
+        if hasattr(os, "replace"):
+            os.replace(temp_path, path)
+        else:
+            if os.name == "nt" and os.path.exists(path):
+                os.remove(path)
+            os.rename(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
@@ -0,0 +1,152 @@
+"""
+Startup instrumentation for 3DE4.
+
+"""
+from collections import OrderedDict
+import json
+import time
+
+#: Set by the launcher to the path of the JSON startup report to write.
+PROFILE_ENV = "TK_3DE4_PROFILE_STARTUP"
+#: Set by the launcher to the time 3DE was launched at.
+LAUNCH_TIME_ENV = "TK_3DE4_LAUNCH_TIME"
+
+
+class StartupProfiler(object):
+    """
+    Records the wall time of each phase of the engine startup, from the
+    launcher to the menu being built, and reports them.
+
+    Apps are loaded by the core without any hook around each of them, so the
+    init time of an app is measured from the previous app (or the start of
+    app loading) to the first command it registers.
+    """
+
+    def __init__(self):
+        """
+        Initialise the class.
+        """
+        self.phases = []
+        self.apps = OrderedDict()
+        self._apps_start = None
+        self._last_app_time = None
+
+    def add_phase(self, name, start, end):
+        """
+        Record a phase.
+
+        :param str name: The name of the phase.
+        :param float start: When the phase started, as returned by :func:`time.time`.
+        :param float end: When the phase ended, as returned by :func:`time.time`.
+        """
+        self.phases.append((name, start, end - start))
+
+    def phase(self, name):
+        """
+        Record the code run in a ``with`` block as a phase.
+
+        :param str name: The name of the phase.
+        """
+        return _Phase(self, name)
+
+    def apps_started(self):
+        """
+        Mark the start of app loading.
+        """
+        self._apps_start = self._last_app_time = time.time()
+
+    def apps_finished(self):
+        """
+        Mark the end of app loading.
+        """
+        if self._apps_start is not None:
+            self.add_phase("apps", self._apps_start, time.time())
+
+    def app_command_registered(self, app_name):
+        """
+        Called when an app registers a command during app loading.
+
+        :param str app_name: The instance name of the app.
+        """
+        if self._last_app_time is None or app_name in self.apps:
+            return
+        now = time.time()
+        self.apps[app_name] = now - self._last_app_time
+        self._last_app_time = now
+
+    def report(self):
+        """
+        Get the startup report.
+
+        :returns: A dictionary holding the start time, total time and the list
+                  of phases and app init times, in seconds.
+        :rtype: dict
+        """
+        if not self.phases:
+            return {"start": None, "total": 0.0, "phases": [], "apps": []}
+        start = min(phase_start for _, phase_start, _ in self.phases)
+        end = max(phase_start + elapsed for _, phase_start, elapsed in self.phases)
+        return {
+            "start": start,
+            "total": end - start,
+            "phases": [
+                {"name": name, "offset": phase_start - start, "elapsed": elapsed}
+                for name, phase_start, elapsed in sorted(self.phases, key=lambda phase: phase[1])
+            ],
+            "apps": [
+                {"name": name, "elapsed": elapsed} for name, elapsed in self.apps.items()
+            ],
+        }
+
+    def write(self, path, logger):
+        """
+        Log the startup report and write it to a JSON file.
+
+        :param str path: The path of the JSON file.
+        :param logger: The logger to log the report to.
+        """
+        report = self.report()
+        logger.info("3DE startup took %.3fs", report["total"])
+        for phase in report["phases"]:
+            logger.info(
+                "  %-20s +%.3fs %.3fs", phase["name"], phase["offset"], phase["elapsed"]
+            )
+        for app in report["apps"]:
+            logger.info("  app %-16s %.3fs", app["name"], app["elapsed"])
+        try:
+            with open(path, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+        except (IOError, OSError):
+            logger.exception("Failed to write startup report to '%s'", path)
+        else:
+            logger.info("Startup report written to '%s'", path)
+
+
+class _Phase(object):
+    """
+    Context manager recording a phase of a :class:`StartupProfiler`.
+    """
+
+    def __init__(self, profiler, name):
+        """
+        Initialise the class.
+
+        :param StartupProfiler profiler: The profiler to record the phase in.
+        :param str name: The name of the phase.
+        """
+        self.profiler = profiler
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        """
+        Start timing.
+        """
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        """
+        Stop timing and record the phase.
+        """
+        self.profiler.add_phase(self.name, self.start, time.time())
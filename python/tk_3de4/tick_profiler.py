@@ -0,0 +1,155 @@
+"""
+Latency tracking for the 3DE4 timer callback.
+
+"""
+from collections import deque
+
+from .file_log import monotonic
+
+#: Parts of a timer tick that are timed separately.
+PARTS = ("process_events", "project_path", "context_change")
+
+#: Upper bounds of the histogram buckets, in milliseconds.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class TickProfiler(object):
+    """
+    Keeps the timings of the last timer ticks, split into Qt event processing,
+    project path polling and context change time, and reports the ticks that
+    go over budget.
+
+    Each slow tick is logged at debug level, with a single warning summing
+    them up every ``report_interval`` seconds. Ticks running a command or a
+    dialog, see :meth:`exclude_tick`, are slow by nature and only counted.
+    """
+
+    #: The clock the ticks are timed with.
+    clock = staticmethod(monotonic)
+
+    def __init__(self, logger, budget=0.02, size=1000, report_interval=60.0):
+        """
+        Initialise the class.
+
+        :param logger: The logger to report slow ticks to.
+        :param float budget: Ticks slower than this many seconds are reported.
+        :param int size: The number of ticks the histogram covers.
+        :param float report_interval: Seconds between warnings about slow ticks.
+        """
+        self.logger = logger
+        self.budget = budget
+        self.report_interval = report_interval
+        self.slow_ticks = 0
+        self.excluded_ticks = 0
+        self._ticks = deque(maxlen=size)
+        self._exclude = False
+        self._interval_start = None
+        self._interval_slow = 0
+        self._interval_worst = None
+
+    def exclude_tick(self):
+        """
+        Keep the current tick, or the next one when called between ticks, out
+        of the statistics, e.g. as it runs a command or shows a dialog.
+        """
+        self._exclude = True
+
+    def add(self, total, parts):
+        """
+        Record a tick.
+
+        :param float total: The duration of the tick, in seconds.
+        :param dict parts: The duration in seconds of each of :data:`PARTS`.
+        """
+        now = self.clock()
+        if self._interval_start is None:
+            self._interval_start = now
+        if self._exclude:
+            self._exclude = False
+            self.excluded_ticks += 1
+        else:
+            self._ticks.append((total, tuple(parts.get(part, 0.0) for part in PARTS)))
+            if total > self.budget:
+                self.slow_ticks += 1
+                self._interval_slow += 1
+                if self._interval_worst is None or total > self._interval_worst[0]:
+                    self._interval_worst = (total, parts)
+                self.logger.debug("Slow 3DE timer tick: %.1fms (%s)", total * 1000, _format_parts(parts))
+        if now - self._interval_start >= self.report_interval:
+            if self._interval_slow:
+                worst_total, worst_parts = self._interval_worst
+                self.logger.warning(
+                    "%d 3DE timer ticks over the %.0fms budget in the last %.0fs, "
+                    "the slowest %.1fms (%s)",
+                    self._interval_slow,
+                    self.budget * 1000,
+                    now - self._interval_start,
+                    worst_total * 1000,
+                    _format_parts(worst_parts),
+                )
+            self._interval_start = now
+            self._interval_slow = 0
+            self._interval_worst = None
+
+    def histogram(self):
+        """
+        Get the histogram of the recorded ticks.
+
+        :returns: A dictionary mapping ``total`` and each of :data:`PARTS` to
+                  the tick counts of each bucket, the last bucket counting the
+                  ticks above the last bound of :data:`BUCKETS`.
+        :rtype: dict
+        """
+        counts = dict((name, [0] * (len(BUCKETS) + 1)) for name in ("total",) + PARTS)
+        for total, parts in self._ticks:
+            counts["total"][_bucket(total)] += 1
+            for part, duration in zip(PARTS, parts):
+                counts[part][_bucket(duration)] += 1
+        return counts
+
+    def report(self):
+        """
+        Format the histogram as a text table.
+
+        :rtype: str
+        """
+        counts = self.histogram()
+        names = ("total",) + PARTS
+        labels = ["<{}ms".format(bound) for bound in BUCKETS] + [">={}ms".format(BUCKETS[-1])]
+        lines = [
+            "Last {} ticks, {} over the {:.0f}ms budget since startup, "
+            "{} running commands or dialogs not counted".format(
+                len(self._ticks), self.slow_ticks, self.budget * 1000, self.excluded_ticks
+            ),
+            "{:>8} ".format("") + " ".join("{:>14}".format(name) for name in names),
+        ]
+        for index, label in enumerate(labels):
+            lines.append(
+                "{:>8} ".format(label)
+                + " ".join("{:>14}".format(counts[name][index]) for name in names)
+            )
+        return "\n".join(lines)
+
+
+def _format_parts(parts):
+    """
+    Format the duration of the parts of a tick.
+
+    :param dict parts: The duration in seconds of each of :data:`PARTS`.
+    :rtype: str
+    """
+    return ", ".join("{} {:.1f}ms".format(part, parts.get(part, 0.0) * 1000) for part in PARTS)
+
+
+def _bucket(duration):
+    """
+    Get the histogram bucket of a duration.
+
+    :param float duration: The duration, in seconds.
+    :rtype: int
+    """
+    milliseconds = duration * 1000
+    for index, bound in enumerate(BUCKETS):
+        if milliseconds < bound:
+            return index
+    return len(BUCKETS)
@@ -1,7 +1,19 @@
+import glob
+import hashlib
+import json
 import os
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+
+try:
+    import importlib.util as importlib_util
+except ImportError:
+    # Python 2
+    import imp
+    importlib_util = None
 
 import sgtk
 from sgtk.platform import SoftwareLauncher, SoftwareVersion, LaunchInformation
@@ -14,6 +26,12 @@ class TDE4Launcher(SoftwareLauncher):
     of 3DEqualizer4.
     """
 
+    # Seconds the user handed over to 3DE can be picked up for, after which
+    # the file holding it is deleted.
+    USER_HANDOFF_TTL = 600
+    USER_HANDOFF_PREFIX = 'tk-3de4_user_'
+    _user_handoff_timer = None
+
     def prepare_launch(self, exec_path, args, file_to_open=None):
         """
         Prepares an environment to launch 3DEqualizer4 in that will automatically
@@ -30,8 +48,33 @@ class TDE4Launcher(SoftwareLauncher):
         # by appending it to the env PYTHON_CUSTOM_SCRIPTS_3DE4.
         startup_path = os.path.join(self.disk_location, 'startup')
 
-        # Get path to temp menu folder, and add it to the environment.
-        menufolder = tempfile.mkdtemp(prefix='tk-3de4_')
+        # Keep a manifest of the menu commands for this configuration and
+        # context. With TK_3DE4_DEFERRED_START set, the menu is rendered from
+        # it and the engine only starts when a menu item is first run.
+        manifest_key = '{}|{}'.format(
+            self.sgtk.pipeline_configuration.get_path(), self.context
+        ).encode('utf-8')
+        cache_root = os.path.join(
+            sgtk.util.LocalFileStorageManager.get_global_root(
+                sgtk.util.LocalFileStorageManager.CACHE
+            ),
+            'tk-3de4',
+        )
+        manifest_path = os.path.join(
+            cache_root, 'manifests', '{}.json'.format(hashlib.sha1(manifest_key).hexdigest())
+        )
+        required_env['TK_3DE4_MENU_MANIFEST'] = manifest_path
+        if os.getenv('TK_3DE4_DEFERRED_START'):
+            required_env['TK_3DE4_DEFERRED_START'] = '1'
+            required_env['TK_3DE4_PYTHON_PATH'] = os.path.join(self.disk_location, 'python')
+
+        # Get path to the menu folder, and add it to the environment.
+        if os.getenv('TK_3DE4_PERSISTENT_MENU'):
+            menufolder = self._persistent_menu_folder(
+                os.path.join(cache_root, 'menus'), manifest_path, required_env
+            )
+        else:
+            menufolder = tempfile.mkdtemp(prefix='tk-3de4_')
         required_env['TK_3DE4_MENU_DIR'] = menufolder
 
         required_env['PYTHON_CUSTOM_SCRIPTS_3DE4'] = os.pathsep.join(
@@ -41,12 +84,108 @@ class TDE4Launcher(SoftwareLauncher):
         # Add context information info to the env.
         required_env['TANK_CONTEXT'] = sgtk.Context.serialize(self.context)
 
+        # Hand the current user over, so 3DE doesn't authenticate again.
+        user_file = self._write_user_handoff()
+        if user_file:
+            required_env['TK_3DE4_USER_FILE'] = user_file
+
+        # Profile the startup when asked to, by setting TK_3DE4_PROFILE_STARTUP
+        # to 1 or to the path of the JSON report to write.
+        profile = os.getenv('TK_3DE4_PROFILE_STARTUP')
+        if profile:
+            if profile == '1':
+                profile = os.path.join(
+                    tempfile.gettempdir(),
+                    'tk-3de4_startup_{}.json'.format(time.strftime('%Y%m%d-%H%M%S')),
+                )
+            required_env['TK_3DE4_PROFILE_STARTUP'] = profile
+            required_env['TK_3DE4_LAUNCH_TIME'] = repr(time.time())
+
         # open a file
         if file_to_open:
             args += ' {}'.format(subprocess.list2cmdline(('-open', file_to_open)))
 
         return LaunchInformation(exec_path, args, required_env)
 
+    def _write_user_handoff(self):
+        """
+        Write the authenticated user to a file only readable by the current
+        user, for the 3DE startup script to pick up and delete within
+        :attr:`USER_HANDOFF_TTL` seconds. The launcher deletes the file past
+        that, in case 3DE never started, along with the files left behind by
+        previous launchers.
+
+        :returns: The path to the file, or None if there is no user to hand over.
+        :rtype: str or Nonetype
+        """
+        user = sgtk.get_authenticated_user()
+        if user is None:
+            return None
+        try:
+            serialized = sgtk.authentication.serialize_user(user)
+        except Exception:
+            self.logger.debug('Unable to serialize %s, 3DE will authenticate', user)
+            return None
+        self._remove_expired_user_handoffs()
+        # mkstemp creates the file readable and writable by the owner only,
+        # make sure of it whatever the umask and platform.
+        handle, path = tempfile.mkstemp(prefix=self.USER_HANDOFF_PREFIX, suffix='.json')
+        os.chmod(path, 0o600)
+        with os.fdopen(handle, 'w') as user_file:
+            json.dump({'expires': time.time() + self.USER_HANDOFF_TTL, 'user': serialized}, user_file)
+        self._user_handoff_timer = threading.Timer(self.USER_HANDOFF_TTL, _remove_file, [path])
+        self._user_handoff_timer.daemon = True
+        self._user_handoff_timer.start()
+        return path
+
+    def _remove_expired_user_handoffs(self):
+        """
+        Delete the user handoff files of the current user older than
+        :attr:`USER_HANDOFF_TTL`, left behind by launchers which exited before
+        deleting them.
+        """
+        now = time.time()
+        for path in glob.glob(
+            os.path.join(tempfile.gettempdir(), '{}*.json'.format(self.USER_HANDOFF_PREFIX))
+        ):
+            try:
+                path_stat = os.stat(path)
+            except OSError:
+                continue
+            if hasattr(os, 'getuid') and path_stat.st_uid != os.getuid():
+                continue
+            if now - path_stat.st_mtime > self.USER_HANDOFF_TTL:
+                _remove_file(path)
+
+    def _persistent_menu_folder(self, root, manifest_path, required_env):
+        """
+        Create a menu folder for the session, seeded with the menu already
+        rendered for the same pipeline configuration, environment and command
+        manifest, and remove the folders left behind by crashed sessions.
+        Without a manifest, e.g. on the first launch, the folder starts empty.
+
+        :param str root: Folder holding the menu templates and session folders.
+        :param str manifest_path: Path to the command manifest.
+        :param dict required_env: The launch environment, updated with the
+                                  template folder for the engine.
+        :returns: The session menu folder.
+        :rtype: str
+        """
+        # Only the standard library is used by this module, so it can be
+        # loaded outside of the engine.
+        menu_cache = _load_source(
+            'tk_3de4_menu_cache',
+            os.path.join(self.disk_location, 'python', 'tk_3de4', 'menu_cache.py'),
+        )
+        for stale in menu_cache.clean_stale_sessions(root):
+            self.logger.debug('Removed stale menu folder %s', stale)
+
+        env_name = self.sgtk.execute_core_hook('pick_environment', context=self.context)
+        key = menu_cache.menu_key(self.sgtk.pipeline_configuration.get_path(), env_name or '')
+        menufolder, templates = menu_cache.create_session_dir(root, key, manifest_path)
+        required_env[menu_cache.TEMPLATE_ENV] = templates
+        return menufolder
+
     def _icon_from_engine(self):
         """
         Use the default engine icon as natron does not supply
@@ -57,3 +196,31 @@ class TDE4Launcher(SoftwareLauncher):
         # the engine icon
         engine_icon = os.path.join(self.disk_location, "icon_256.png")
         return engine_icon
+
+
+def _remove_file(path):
+    """
+    Delete a file, if it still exists.
+
+    :param str path: The file path.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _load_source(name, path):
+    """
+    Load a python file as a module.
+
+    :param str name: The name to give the module.
+    :param str path: The path to the file.
+    :returns: The module.
+    """
+    if importlib_util is None:
+        return imp.load_source(name, path)
+    spec = importlib_util.spec_from_file_location(name, path)
+    module = importlib_util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -1,8 +1,11 @@
 # 3DE4.script.hide: 			true
 # 3DE4.script.startup: 			true
 
+from __future__ import print_function
+import json
 import os
 import sys
+import time
 import tde4
 
 sys.path.append(
@@ -10,41 +13,124 @@ sys.path.append(
 )
 import sgtk
 
+QtCore = None
+
 
 def _timer():
     """
-    Poller to listen to the change of the scene file to determine the new
-    context.
+    Keep Qt responsive and let the engine apply any pending context change
+    for the open project.
     """
-    QtCore.QCoreApplication.processEvents()
-    # check for open file change
-    global g_current_file
-    cur_file = tde4.getProjectPath()
-    if g_current_file != cur_file:
-        if cur_file:
-            engine = sgtk.platform.current_engine()
-            context = engine.context
-            new_context = engine.sgtk.context_from_path(cur_file, context)
-            if new_context != context:
-                sgtk.platform.change_context(new_context)
-        g_current_file = cur_file
+    if QtCore is None:
+        return
+    engine = sgtk.platform.current_engine()
+    if engine:
+        engine.timer_tick()
+    else:
+        QtCore.QCoreApplication.processEvents()
 
 
-if __name__ == '__main__':
+def _get_user():
+    """
+    Get the user handed over by the launcher, falling back to authenticating
+    when the handoff is missing, expired or unreadable.
+
+    :rtype: :class:`sgtk.authentication.ShotgunUser`
+    """
+    path = os.environ.pop("TK_3DE4_USER_FILE", None)
+    if path:
+        try:
+            if hasattr(os, "getuid") and os.stat(path).st_uid != os.getuid():
+                raise ValueError("'{}' is not owned by the current user".format(path))
+            with open(path) as user_file:
+                handoff = json.load(user_file)
+            if handoff["expires"] > time.time():
+                return sgtk.authentication.deserialize_user(handoff["user"])
+        except Exception as error:
+            print("tk-3de4: Ignoring user handoff:", error)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    from tank_vendor.shotgun_authentication import ShotgunAuthenticator
+    return ShotgunAuthenticator(sgtk.util.CoreDefaultsManager()).get_user()
+
+
+def _start(phases):
+    """
+    Start the engine, if not running yet, and Qt.
+
+    :param list phases: (name, start, end) of the phases run before the engine
+                        exists, for the startup profiler.
+    """
+    global QtCore
+
     engine = sgtk.platform.current_engine()
     if not engine:
-        from tank_vendor.shotgun_authentication import ShotgunAuthenticator
-        user = ShotgunAuthenticator(sgtk.util.CoreDefaultsManager()).get_user()
+        start = time.time()
+        user = _get_user()
         sgtk.set_authenticated_user(user)
+        phases.append(("authenticate", start, time.time()))
+        start = time.time()
         context = sgtk.context.deserialize(os.environ.get("TANK_CONTEXT"))
+        phases.append(("deserialize_context", start, time.time()))
+        start = time.time()
         engine = sgtk.platform.start_engine('tk-3de4', context.sgtk, context)
+        phases.append(("start_engine", start, time.time()))
 
-    from sgtk.platform.qt import QtCore, QtGui
+    from sgtk.platform.qt import QtCore as _QtCore, QtGui
 
     # Qt
-    if not QtCore.QCoreApplication.instance():
+    if not _QtCore.QCoreApplication.instance():
+        start = time.time()
         QtGui.QApplication([])
-        global g_current_file
-        g_current_file = tde4.getProjectPath()
+        QtCore = _QtCore
         tde4.setTimerCallbackFunction("_timer", 50)
         engine.post_qt_init()
+        phases.append(("qt_init", start, time.time()))
+
+    if engine.startup_profiler is not None:
+        for name, start, end in phases:
+            engine.startup_profiler.add_phase(name, start, end)
+        engine.finish_startup_profile()
+
+
+def _defer_start(phases):
+    """
+    Render the Shotgun menu from the manifest of the previous session and
+    start the engine when a menu item is first run.
+
+    :param list phases: (name, start, end) of the phases run so far.
+    :returns: True if the start was deferred, False if there is no manifest.
+    :rtype: bool
+    """
+    sys.path.append(os.environ['TK_3DE4_PYTHON_PATH'])
+    from tk_3de4 import deferred_start
+
+    entries = deferred_start.read_manifest(os.environ.get(deferred_start.MANIFEST_ENV, ''))
+    if not entries:
+        return False
+    start = time.time()
+    deferred_start.render_menu(os.environ['TK_3DE4_MENU_DIR'], entries)
+    tde4.rescanPythonDirs()
+    phases.append(("deferred_menu", start, time.time()))
+
+    deferred_start.DeferredStart(lambda: _start(phases)).install()
+    return True
+
+
+if __name__ == '__main__':
+    phases = []
+    launch_time = os.environ.get("TK_3DE4_LAUNCH_TIME")
+    if launch_time:
+        phases.append(("launch", float(launch_time), time.time()))
+
+    deferred = (
+        os.environ.get("TK_3DE4_DEFERRED_START")
+        and not sgtk.platform.current_engine()
+        and _defer_start(phases)
+    )
+    if not deferred:
+        _start(phases)
@@ -0,0 +1,108 @@
+"""
+Helpers for running the engine against the ``tde4`` and ``sgtk`` stand-ins
+of ``benchmarks/fakes``.
+
+"""
+import logging
+import os
+import sys
+
+try:
+    import importlib.util as importlib_util
+except ImportError:
+    importlib_util = None
+    import imp
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ENGINE_DIR = os.path.dirname(TESTS_DIR)
+FAKES_DIR = os.path.join(ENGINE_DIR, "benchmarks", "fakes")
+PYTHON_DIR = os.path.join(ENGINE_DIR, "python")
+
+if FAKES_DIR not in sys.path:
+    sys.path.insert(0, FAKES_DIR)
+
+
+def load_source(name, path):
+    """
+    Load a module from a file of the engine.
+
+    :param str name: The name to give the module.
+    :param str path: The path to the file, relative to the engine root.
+    """
+    path = os.path.join(ENGINE_DIR, path)
+    if importlib_util is None:
+        return imp.load_source(name, path)
+    spec = importlib_util.spec_from_file_location(name, path)
+    module = importlib_util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_engine(settings=None):
+    """
+    Create a 3DE engine on top of the fake core, with the default settings of
+    the benchmarks.
+
+    :param dict settings: Settings overriding the defaults.
+    """
+    import sgtk
+    engine_module = load_source("tk_3de4_engine", "engine.py")
+    defaults = {
+        "debug_logging": False,
+        "menu_favourites": [],
+        "menu_dispatcher": False,
+        "context_poll_interval": 1000,
+        "context_cache_size": 32,
+        "sequence_index": False,
+        "sequence_scan_workers": 4,
+        "log_buffer_size": 1000,
+        "log_file": False,
+        "timer_tick_budget": 20,
+        "local_save": False,
+        "footage_cache": False,
+        "sequence_prefetch": False,
+        "sequence_prefetch_max_age": 300,
+        "sequence_last_frame_field": "sg_last_frame",
+        "validate_footage_on_open": False,
+    }
+    defaults.update(settings or {})
+    return engine_module.TDE4Engine(defaults, sgtk.Context())
+
+
+def unload_plain_modules():
+    """
+    Forget the modules of the python folder imported without the engine's
+    alias, and the menu dispatcher registered for the menu scripts.
+    """
+    for name in list(sys.modules):
+        if name == "tk_3de4" or name.startswith("tk_3de4.") or name == "tk_3de4_menu_dispatch":
+            del sys.modules[name]
+    if PYTHON_DIR in sys.path:
+        sys.path.remove(PYTHON_DIR)
+
+
+class capture_logs(object):
+    """
+    Collect the records logged to a logger and its children, as a context
+    manager returning the list of records.
+    """
+
+    def __init__(self, name):
+        """
+        :param str name: The logger name.
+        """
+        self.logger = logging.getLogger(name)
+        self.records = []
+        self.handler = logging.Handler()
+        self.handler.emit = self.records.append
+
+    def __enter__(self):
+        self.level = self.logger.level
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+        return self.records
+
+    def __exit__(self, *args):
+        self.logger.removeHandler(self.handler)
+        self.logger.setLevel(self.level)
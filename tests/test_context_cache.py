@@ -0,0 +1,82 @@
+"""
+Cache of project path to context resolutions.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+import sgtk
+
+
+class FakePipelineConfiguration(object):
+
+    def __init__(self, root):
+        self.root = root
+
+    def get_path(self):
+        return self.root
+
+    def get_schema_config_location(self):
+        return os.path.join(self.root, "schema")
+
+    def get_path_cache_location(self):
+        return os.path.join(self.root, "path_cache.db")
+
+
+class FakeTk(object):
+    """
+    Resolves every path to the same shot, carrying over the task of the
+    previous context like the core does.
+    """
+
+    def __init__(self, root):
+        self.pipeline_configuration = FakePipelineConfiguration(root)
+        self.resolved = 0
+
+    def context_from_path(self, path, previous_context=None):
+        self.resolved += 1
+        entity = {"type": "Shot", "id": 1, "name": "sh010"}
+        task = previous_context.task if previous_context is not None else None
+        return sgtk.Context(entity, task)
+
+
+class ContextCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="tk-3de4_test_config_")
+        os.makedirs(os.path.join(self.root, "schema"))
+        self.tk = FakeTk(self.root)
+        self.cache = support.make_engine().import_module("tk_3de4").ContextCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_hits(self):
+        first = self.cache.context_from_path(self.tk, "/a.3de")
+        second = self.cache.context_from_path(self.tk, "/a.3de")
+        self.assertEqual(first, second)
+        self.assertEqual(self.tk.resolved, 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_previous_context_task_is_part_of_the_key(self):
+        comp = sgtk.Context(task={"type": "Task", "id": 1})
+        track = sgtk.Context(task={"type": "Task", "id": 2})
+        self.assertEqual(self.cache.context_from_path(self.tk, "/a.3de", comp).task["id"], 1)
+        self.assertEqual(self.cache.context_from_path(self.tk, "/a.3de", track).task["id"], 2)
+        self.assertEqual(self.cache.context_from_path(self.tk, "/a.3de", comp).task["id"], 1)
+        self.assertEqual(self.tk.resolved, 2)
+
+    def test_path_cache_change_invalidates(self):
+        self.cache.context_from_path(self.tk, "/a.3de")
+        with open(self.tk.pipeline_configuration.get_path_cache_location(), "w") as path_cache:
+            path_cache.write("changed")
+        self.cache.context_from_path(self.tk, "/a.3de")
+        self.assertEqual(self.tk.resolved, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
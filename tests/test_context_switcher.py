@@ -0,0 +1,58 @@
+"""
+Watching of the project open in 3DE.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+import tde4
+
+
+class ProjectWatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.project_dir = tempfile.mkdtemp(prefix="tk-3de4_test_switcher_")
+        self.path = os.path.join(self.project_dir, "shot.3de")
+        open(self.path, "w").close()
+        tde4.set_project_path(self.path)
+        engine = support.make_engine()
+        self.switcher = engine.import_module("tk_3de4").ContextSwitcher(engine, 0)
+        self.switcher.start(self.path)
+        self.watcher = self.switcher._watcher
+
+    def tearDown(self):
+        tde4.set_project_path("")
+        shutil.rmtree(self.project_dir, ignore_errors=True)
+
+    def save_atomically(self):
+        """
+        Replace the project by a new file, which the file watcher stops
+        watching, as Qt does.
+        """
+        temp_path = self.path + ".tmp"
+        open(temp_path, "w").close()
+        os.rename(temp_path, self.path)
+        self.watcher.removePaths([self.path])
+
+    def test_rewatches_project_replaced_by_a_save(self):
+        self.assertEqual(self.watcher.files(), [self.path])
+        self.save_atomically()
+        self.switcher._on_file_changed(self.path)
+        self.assertEqual(self.watcher.files(), [self.path])
+
+    def test_poll_rewatches_project_once_back(self):
+        os.remove(self.path)
+        self.watcher.removePaths([self.path])
+        self.switcher._on_file_changed(self.path)
+        self.assertEqual(self.watcher.files(), [])
+        open(self.path, "w").close()
+        self.switcher.tick()
+        self.assertEqual(self.watcher.files(), [self.path])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Deferred engine starts: menu items run before the engine started.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+
+class FirstClickTest(unittest.TestCase):
+    """
+    Runs a menu item rendered by the startup script from the manifest of the
+    previous session, before the engine started.
+    """
+
+    def setUp(self):
+        self.menu_dir = tempfile.mkdtemp(prefix="tk-3de4_test_menu_")
+        self.manifest_path = os.path.join(tempfile.mkdtemp(prefix="tk-3de4_test_manifest_"), "menu.json")
+        self.environ = dict(os.environ)
+        os.environ.update({
+            "TANK_CURRENT_PC": support.ENGINE_DIR,
+            "TK_3DE4_PYTHON_PATH": support.PYTHON_DIR,
+            "TK_3DE4_MENU_DIR": self.menu_dir,
+            "TK_3DE4_DEFERRED_START": "1",
+            "TK_3DE4_MENU_MANIFEST": self.manifest_path,
+        })
+        support.unload_plain_modules()
+        self.calls = []
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        support.unload_plain_modules()
+        shutil.rmtree(self.menu_dir, ignore_errors=True)
+        shutil.rmtree(os.path.dirname(self.manifest_path), ignore_errors=True)
+
+    def start_engine(self):
+        """
+        Start an engine registering a single command, and build its menu.
+        """
+        engine = support.make_engine()
+        engine.register_command("Load", lambda: self.calls.append("Load"), {"type": "context_menu"})
+        generator = engine.import_module("tk_3de4").MenuGenerator(engine)
+        generator.create_menu()
+        return engine
+
+    def run_menu_scripts(self):
+        """
+        Run the menu scripts the way 3DE does.
+        """
+        for name in sorted(os.listdir(self.menu_dir)):
+            if name.endswith(".py"):
+                with open(os.path.join(self.menu_dir, name)) as script_file:
+                    exec(compile(script_file.read(), name, "exec"), {"__name__": "__main__"})
+
+    def test_first_click_starts_engine_and_runs_command(self):
+        # Previous session, writing the manifest.
+        self.start_engine()
+        support.unload_plain_modules()
+        shutil.rmtree(self.menu_dir)
+        self.calls = []
+
+        startup = support.load_source("tk_3de4_test_startup", os.path.join("startup", "startup.py"))
+        started = []
+
+        def start(phases):
+            started.append(phases)
+            self.start_engine()
+
+        startup._start = start
+        self.assertTrue(startup._defer_start([]))
+        self.assertEqual(started, [])
+
+        # Nothing starts the engine on its own, e.g. the 3DE timer.
+        for _ in range(100):
+            startup._timer()
+        self.assertEqual(started, [])
+
+        self.run_menu_scripts()
+        self.assertEqual(len(started), 1)
+        self.assertEqual(self.calls, ["Load"])
+
+        # Once started, menu items run straight away.
+        self.run_menu_scripts()
+        self.assertEqual(len(started), 1)
+        self.assertEqual(self.calls, ["Load", "Load"])
+
+    def test_menu_scripts_do_nothing_on_import(self):
+        self.start_engine()
+        for name in os.listdir(self.menu_dir):
+            with open(os.path.join(self.menu_dir, name)) as script_file:
+                exec(compile(script_file.read(), name, "exec"), {"__name__": "menu_script"})
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
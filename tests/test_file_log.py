@@ -0,0 +1,88 @@
+"""
+JSON lines log file.
+
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+
+class JsonLinesLogWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp(prefix="tk-3de4_test_log_")
+        self.file_log = support.make_engine().import_module("tk_3de4").file_log
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def writer(self, max_bytes=1024 * 1024):
+        return self.file_log.JsonLinesLogWriter(os.path.join(self.log_dir, "tk-3de4.jsonl"), max_bytes)
+
+    def push(self, writer, msg, *args):
+        writer.push(logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None))
+
+    def read(self, path):
+        with open(path, "rb") as log_file:
+            return [json.loads(line.decode("utf-8"))["msg"] for line in log_file]
+
+    def test_each_process_has_its_own_file(self):
+        writer = self.writer()
+        self.push(writer, "Started")
+        writer.close()
+        self.assertEqual(
+            os.listdir(self.log_dir), ["tk-3de4.{}.jsonl".format(os.getpid())]
+        )
+
+    def test_message_is_built_when_queued(self):
+        writer = self.writer()
+        frames = [1001]
+        self.push(writer, "Frames %s", frames)
+        frames.append(1002)
+        writer.close()
+        self.assertEqual(self.read(writer.path), ["Frames [1001]"])
+
+    def test_rotation_is_by_bytes(self):
+        writer = self.writer(max_bytes=400)
+        for index in range(20):
+            self.push(writer, u"Plate \u00e9t\u00e9 %d", index)
+        writer.close()
+        messages = []
+        for index in range(5, 0, -1):
+            path = "{}.{}".format(writer.path, index)
+            if os.path.exists(path):
+                self.assertLessEqual(os.path.getsize(path), 400)
+                messages.extend(self.read(path))
+        messages.extend(self.read(writer.path))
+        self.assertEqual(messages[-1], u"Plate \u00e9t\u00e9 19")
+        self.assertEqual(writer.errors, 0)
+
+    def test_failed_rotation_keeps_writing(self):
+        writer = self.writer(max_bytes=1000)
+        rename = os.rename
+        renames = []
+
+        def fail(source, target):
+            renames.append(source)
+            raise OSError("In use")
+
+        os.rename = fail
+        try:
+            for index in range(40):
+                self.push(writer, "Record %d", index)
+            writer.close()
+        finally:
+            os.rename = rename
+        self.assertEqual(self.read(writer.path), ["Record {}".format(index) for index in range(40)])
+        # Retried once every max_bytes, not for every record.
+        self.assertEqual(writer.errors, len(renames))
+        self.assertLess(len(renames), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
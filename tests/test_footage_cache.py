@@ -0,0 +1,105 @@
+"""
+Local disk cache of the imported footage.
+
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import support
+
+import tde4
+
+
+class FootageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="tk-3de4_test_footage_")
+        self.seq_dir = os.path.join(self.temp_dir, "plates")
+        os.mkdir(self.seq_dir)
+        for frame in range(1001, 1051):
+            with open(os.path.join(self.seq_dir, "plate.{}.exr".format(frame)), "w") as frame_file:
+                frame_file.write("frame {}".format(frame))
+        self.hash_path = os.path.join(self.seq_dir, "plate.####.exr")
+        self.engine = support.make_engine({
+            "footage_cache": True,
+            "footage_cache_root": os.path.join(self.temp_dir, "cache"),
+            "footage_cache_max_bytes": 1024 * 1024,
+            "footage_cache_workers": 2,
+        })
+        self.engine.pre_app_init()
+        self.spec = self.engine.import_module("tk_3de4").sequences.parse_sequence_path(self.hash_path)
+        tde4.reset(1)
+        tde4.setCameraPath(1, self.hash_path)
+
+    def tearDown(self):
+        self.engine.footage_cache.close()
+        tde4.reset()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def cache_footage(self):
+        cached = []
+
+        def repoint(cached_path):
+            self.engine.use_cached_footage(1, self.hash_path, cached_path)
+            cached.append(cached_path)
+
+        self.engine.footage_cache.request(self.spec, list(range(1001, 1051)), 1025, repoint)
+        deadline = time.time() + 5
+        while not cached and time.time() < deadline:
+            self.engine.timer_tick()
+            time.sleep(0.01)
+        self.assertEqual(tde4.getCameraPath(1), cached[0])
+        return cached[0]
+
+    def test_frames_are_checked_by_the_copier_threads(self):
+        main_thread = threading.current_thread()
+        calls = []
+        isfile = os.path.isfile
+
+        def record(path):
+            calls.append(threading.current_thread())
+            return isfile(path)
+
+        os.path.isfile = record
+        try:
+            cached_path = self.cache_footage()
+        finally:
+            os.path.isfile = isfile
+        self.assertTrue(calls)
+        self.assertNotIn(main_thread, calls)
+        self.assertEqual(self.engine.footage_cache.source_path(cached_path), self.hash_path)
+        self.assertIsNone(self.engine.footage_cache.source_path(self.hash_path))
+
+    def test_saved_projects_use_the_original_footage(self):
+        cached_path = self.cache_footage()
+        project = os.path.join(self.temp_dir, "scene.v001.3de")
+        self.engine.save_project(project)
+        with open(project) as project_file:
+            self.assertEqual(project_file.read(), "cam1 {}\n".format(self.hash_path))
+        self.assertEqual(tde4.getCameraPath(1), cached_path)
+
+    def test_cameras_given_another_sequence_are_saved_as_they_are(self):
+        self.cache_footage()
+        tde4.setCameraPath(1, "/other/plate.####.exr")
+        project = os.path.join(self.temp_dir, "scene.v001.3de")
+        self.engine.save_project(project)
+        self.assertEqual(tde4.getCameraPath(1), "/other/plate.####.exr")
+        with open(project) as project_file:
+            self.assertEqual(project_file.read(), "cam1 /other/plate.####.exr\n")
+
+    def test_opened_projects_use_the_original_footage(self):
+        cached_path = self.cache_footage()
+        # Saved from the 3DE menu.
+        project = os.path.join(self.temp_dir, "scene.v001.3de")
+        tde4.saveProject(project)
+        self.engine.open_project(project)
+        self.assertEqual(tde4.getCameraPath(1), self.hash_path)
+        self.assertNotEqual(cached_path, self.hash_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
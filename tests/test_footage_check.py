@@ -0,0 +1,65 @@
+"""
+Checking the footage of the cameras of a project.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+import tde4
+from sgtk.platform.qt import QtGui
+
+
+class FootageCheckTest(unittest.TestCase):
+
+    def setUp(self):
+        self.project_dir = tempfile.mkdtemp(prefix="tk-3de4_test_project_")
+        self.plates = os.path.join(self.project_dir, "plates")
+        os.makedirs(self.plates)
+        for frame in (1001, 1002, 1004):
+            open(os.path.join(self.plates, "plate.{}.exr".format(frame)), "w").close()
+        self.engine = support.make_engine({"validate_footage_on_open": True})
+        self.footage_check = self.engine.import_module("tk_3de4").footage_check
+        tde4.reset(3)
+        tde4.setCameraPath(1, os.path.join(self.plates, "plate.####.exr"))
+        tde4.setCameraSequenceAttr(1, 1001, 1004, 1)
+        self.witness = tde4.createCamera("REF_FRAME")
+        tde4.setCameraPath(self.witness, "/missing/witness.exr")
+        tde4.setCameraPath(2, os.path.join(self.plates, "plate.####.exr"))
+        self.warnings = []
+        self.warning = QtGui.QMessageBox.__dict__["warning"]
+        QtGui.QMessageBox.warning = staticmethod(lambda *args: self.warnings.append(args))
+
+    def tearDown(self):
+        QtGui.QMessageBox.warning = self.warning
+        tde4.reset()
+        shutil.rmtree(self.project_dir, ignore_errors=True)
+
+    def test_reads_the_cameras_with_footage(self):
+        refs = self.footage_check.camera_footage(tde4)
+        self.assertEqual(
+            [(ref.camera, ref.start, ref.end, ref.step) for ref in refs],
+            [("cam1", 1001, 1004, 1), ("cam2", 1, 1, 1), ("cam4", None, None, None)],
+        )
+
+    def test_reports_missing_frames(self):
+        tde4.setCameraPath(2, "")
+        problems = self.footage_check.check_footage(self.footage_check.camera_footage(tde4))
+        self.assertEqual(
+            sorted((ref.camera, problem) for ref, problem in problems),
+            [("cam1", "1 of frames 1001-1004 missing"), ("cam4", "missing")],
+        )
+
+    def test_opening_warns_about_missing_footage(self):
+        project = os.path.join(self.project_dir, "shot.3de")
+        tde4.saveProject(project)
+        self.engine.open_project(project)
+        self.assertEqual(len(self.warnings), 1)
+        self.assertIn("/missing/witness.exr (cam4): missing", self.warnings[0][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
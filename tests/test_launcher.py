@@ -0,0 +1,120 @@
+"""
+Opening folders in the file browser.
+
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import support
+
+import sgtk
+
+
+class CollapsePathsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.launcher = support.make_engine().import_module("tk_3de4").launcher
+
+    def test_duplicates_and_nested_folders_are_removed(self):
+        paths = [
+            os.path.join("shots", "sh010", "work"),
+            os.path.join("shots", "sh010"),
+            os.path.join("shots", "sh010") + os.sep,
+            os.path.join("shots", "sh020"),
+            os.path.join("shots", "sh010", "publish"),
+        ]
+        self.assertEqual(
+            self.launcher.collapse_paths(paths),
+            [os.path.join("shots", "sh010"), os.path.join("shots", "sh020")],
+        )
+
+    def test_folders_sharing_a_prefix_are_kept(self):
+        paths = [os.path.join("shots", "sh010"), os.path.join("shots", "sh0100")]
+        self.assertEqual(self.launcher.collapse_paths(paths), paths)
+
+    def test_order_is_kept(self):
+        paths = [os.path.join("shots", "sh020"), os.path.join("shots", "sh010")]
+        self.assertEqual(self.launcher.collapse_paths(paths), paths)
+
+
+class FileBrowserCommandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.launcher = support.make_engine().import_module("tk_3de4").launcher
+        self.platform = sys.platform
+
+    def tearDown(self):
+        sys.platform = self.platform
+
+    def command(self, platform):
+        sys.platform = platform
+        return self.launcher.file_browser_command()
+
+    def test_linux(self):
+        # Python 2 reports "linux2", Python 3 "linux".
+        self.assertEqual(self.command("linux"), ["xdg-open"])
+        self.assertEqual(self.command("linux2"), ["xdg-open"])
+
+    def test_other_platforms(self):
+        self.assertEqual(self.command("darwin"), ["open"])
+        self.assertEqual(self.command("win32"), ["cmd.exe", "/C", "start", "Folder"])
+        with self.assertRaises(OSError):
+            self.command("sunos5")
+
+
+class PathLauncherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="tk-3de4_test_launcher_")
+        self.engine = support.make_engine()
+        self.launched = []
+        self.popen = subprocess.Popen
+        launched = self.launched
+
+        class Process(object):
+            returncode = 0
+
+            def __init__(self, args):
+                launched.append(args)
+
+            def wait(self):
+                return 0
+
+        subprocess.Popen = Process
+
+    def tearDown(self):
+        subprocess.Popen = self.popen
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def wait_for_launches(self, count):
+        deadline = time.time() + 5
+        while len(self.launched) < count and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.launched), count)
+
+    def test_context_folders_are_resolved_by_the_worker(self):
+        threads = []
+        temp_dir = self.temp_dir
+
+        class Context(sgtk.Context):
+            @property
+            def filesystem_locations(self):
+                threads.append(threading.current_thread())
+                return [temp_dir, os.path.join(temp_dir, "missing")]
+
+        self.engine.context = Context()
+        self.engine._jump_to_filesystem()
+        self.wait_for_launches(1)
+        self.assertEqual(self.launched[0][-1], temp_dir)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.current_thread())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Importing several sequences from the loader.
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import support
+
+import sgtk
+import tde4
+from sgtk.platform.qt import QtGui
+
+
+class Shotgun(object):
+    """
+    Shotgun connection answering Version queries, recording the threads
+    it is used from.
+    """
+
+    def __init__(self, fields):
+        """
+        :param dict fields: The fields of the Versions, by name.
+        """
+        self.fields = fields
+        self.threads = []
+
+    def schema_field_read(self, entity_type):
+        self.threads.append(threading.current_thread())
+        return dict((name, {}) for name in ["id", "code"] + list(self.fields))
+
+    def find(self, entity_type, filters, fields):
+        self.threads.append(threading.current_thread())
+        for name in fields:
+            if name not in self.fields:
+                raise AssertionError("Unknown field {}".format(name))
+        return [
+            dict([("type", entity_type), ("id", version_id)] + list(self.fields.items()))
+            for version_id in filters[0][2]
+        ]
+
+
+class BatchImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seq_dir = tempfile.mkdtemp(prefix="tk-3de4_test_seq_")
+        for name in ("plate", "witness"):
+            for frame in range(1001, 1004):
+                open(os.path.join(self.seq_dir, "{}.{}.exr".format(name, frame)), "w").close()
+        engine = support.make_engine()
+        self.actions = support.load_source(
+            "tk_3de4_test_actions", os.path.join("hooks", "tk-multi-loader2", "tk-3de4_actions.py")
+        )
+
+        class App(object):
+            logger = logging.getLogger("sgtk.env.test.tk-multi-loader2")
+
+        self.app = App()
+        self.app.engine = engine
+        self.hook = self.actions.TDE4Actions()
+        self.hook.parent = self.app
+        self.hook.get_publish_path = lambda sg_publish_data: sg_publish_data["path"].encode("utf-8")
+
+        self.warnings = []
+        self.warning = QtGui.QMessageBox.__dict__["warning"]
+        QtGui.QMessageBox.warning = staticmethod(lambda *args: self.warnings.append(args))
+
+    def tearDown(self):
+        QtGui.QMessageBox.warning = self.warning
+        for follower in self.app.engine._sequence_followers:
+            follower.stop()
+        tde4.reset()
+        shutil.rmtree(self.seq_dir, ignore_errors=True)
+
+    def action(self, name, publish_id):
+        return {
+            "name": "import_image_seq",
+            "params": {},
+            "sg_publish_data": {
+                "id": publish_id,
+                "path": os.path.join(self.seq_dir, "{}.%04d.exr".format(name)),
+            },
+        }
+
+    def test_problems_are_reported_once(self):
+        tde4.reset(0)
+        actions = [self.action("plate", 1), self.action("witness", 2), self.action("missing", 3)]
+        with support.capture_logs("sgtk.env.test.tk-multi-loader2") as records:
+            self.hook.execute_multiple_actions(actions)
+        self.assertEqual(len(self.warnings), 1)
+        text = self.warnings[0][2]
+        self.assertEqual(text.count("Please create a sequence camera"), 1)
+        self.assertIn("missing.%04d.exr", text)
+        self.assertEqual(len([record for record in records if record.levelno >= logging.WARNING]), 1)
+
+    def test_selected_cameras_are_assigned(self):
+        tde4.reset(2, 2)
+        self.hook.execute_multiple_actions([self.action("plate", 1)])
+        self.assertEqual(self.warnings, [])
+        self.assertEqual(
+            [tde4.getCameraPath(cam_id) for cam_id in tde4.getCameraList()],
+            [os.path.join(self.seq_dir, "plate.####.exr")] * 2,
+        )
+
+    def test_prefetch_from_text_path(self):
+        self.app.engine.settings["sequence_prefetch"] = True
+        sg_publish_data = self.action("plate", 1)["sg_publish_data"]
+        # The path is not encoded on Python 3.
+        self.hook.get_publish_path = lambda sg_publish_data: sg_publish_data["path"]
+        self.assertEqual(self.hook._prefetch_image_seq(sg_publish_data), "")
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            found, info = self.app.engine.sequence_prefetcher.lookup(1, sg_publish_data["path"])
+            if found:
+                break
+            time.sleep(0.01)
+        self.assertEqual(info.frames, [1001, 1002, 1003])
+
+    def test_generated_actions(self):
+        self.app.engine.settings["sequence_prefetch"] = True
+        sg_publish_data = self.action("plate", 1)["sg_publish_data"]
+        before = self.hook.generate_actions(sg_publish_data, ["import_image_seq"], "main")
+        deadline = time.time() + 5
+        while not self.app.engine.sequence_prefetcher.lookup(1, sg_publish_data["path"])[0]:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.01)
+        after = self.hook.generate_actions(sg_publish_data, ["import_image_seq"], "main")
+        names = [action["name"] for action in after]
+        self.assertEqual(len(set(names)), 3)
+        self.assertEqual(
+            [action["caption"] for action in before], [action["caption"] for action in after]
+        )
+        self.assertNotIn("1001", before[0]["description"])
+        self.assertIn("Frames 1001-1003 on disk.", after[0]["description"])
+
+    def test_prefetch_without_path(self):
+        self.app.engine.settings["sequence_prefetch"] = True
+
+        def get_publish_path(sg_publish_data):
+            raise sgtk.TankError("No path")
+
+        self.hook.get_publish_path = get_publish_path
+        with support.capture_logs("sgtk.env.test.tk-multi-loader2") as records:
+            self.assertEqual(self.hook._prefetch_image_seq({"id": 1}), "")
+        self.assertEqual([record.levelno for record in records], [logging.DEBUG])
+
+    def live_import(self):
+        tde4.reset(1, 1)
+        action = self.action("plate", 1)
+        action["name"] = "import_image_seq_live"
+        action["sg_publish_data"]["version"] = {"type": "Version", "id": 7}
+        self.hook.execute_multiple_actions([action])
+        self.assertEqual(self.warnings, [])
+        self.assertNotIn(threading.current_thread(), self.app.shotgun.threads)
+        return self.app.engine._sequence_followers
+
+    def test_live_import_follows_to_the_last_frame(self):
+        self.app.shotgun = Shotgun({"sg_last_frame": 1010})
+        followers = self.live_import()
+        self.assertEqual([follower.expected_end for follower in followers], [1010])
+
+    def test_live_import_without_last_frame_field(self):
+        self.app.shotgun = Shotgun({})
+        followers = self.live_import()
+        self.assertEqual([follower.expected_end for follower in followers], [None])
+        self.assertEqual(len(self.app.shotgun.threads), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Queued log output.
+
+"""
+import logging
+import unittest
+
+import support
+
+
+class LogSinkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sink = support.make_engine().import_module("tk_3de4").LogSink(10)
+        self.handler = logging.StreamHandler()
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        self.lines = []
+
+    def push(self, msg, *args):
+        self.sink.push(self.handler, logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None))
+
+    def flush(self):
+        self.sink.flush(lambda text: self.lines.extend(line.split(" ", 2)[2] for line in text.splitlines()))
+
+    def test_message_is_built_when_queued(self):
+        frames = [1001]
+        self.push("Frames %s", frames)
+        frames.append(1002)
+        self.flush()
+        self.assertEqual(self.lines, ["Frames [1001]"])
+
+    def test_repeats_are_coalesced(self):
+        for _ in range(3):
+            self.push("Frame %d", 1001)
+        self.push("Frame %d", 1002)
+        self.flush()
+        self.assertEqual(self.lines, ["Frame 1001 (repeated 3 times)", "Frame 1002"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Persistent menu folders: removal of the folders of crashed sessions.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+
+class CleanStaleSessionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="tk-3de4_test_menus_")
+        self.menu_cache = support.load_source(
+            "tk_3de4_menu_cache", os.path.join("python", "tk_3de4", "menu_cache.py")
+        )
+        self.locks = []
+
+    def tearDown(self):
+        for lock in self.locks:
+            lock.release()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def session(self, locked=None, age=7200):
+        """
+        Create a session menu folder.
+
+        :param locked: None if the engine never took the lock, else whether
+                       it still holds it.
+        :param int age: The age of the folder in seconds.
+        """
+        session_dir, _ = self.menu_cache.create_session_dir(self.root, "key")
+        open(os.path.join(session_dir, "menu.py"), "w").close()
+        if locked is not None:
+            lock = self.menu_cache.SessionLock(session_dir)
+            self.assertTrue(lock.acquire())
+            if locked:
+                self.locks.append(lock)
+            else:
+                lock.release()
+        mtime = os.path.getmtime(session_dir) - age
+        os.utime(session_dir, (mtime, mtime))
+        return session_dir
+
+    def test_removes_only_unlocked_sessions(self):
+        crashed = self.session(locked=False)
+        running = self.session(locked=True)
+        starting = self.session(locked=None)
+        recent = self.session(locked=False, age=0)
+
+        self.assertEqual(self.menu_cache.clean_stale_sessions(self.root), [crashed])
+        self.assertFalse(os.path.exists(crashed))
+        for session_dir in (running, starting, recent):
+            self.assertTrue(os.path.isfile(os.path.join(session_dir, "menu.py")))
+
+    def test_completes_interrupted_removals(self):
+        stale = self.session(locked=None) + self.menu_cache.STALE_SUFFIX
+        os.rename(stale[:-len(self.menu_cache.STALE_SUFFIX)], stale)
+        self.menu_cache.clean_stale_sessions(self.root)
+        self.assertFalse(os.path.exists(stale))
+
+
+class MenuTemplateTest(unittest.TestCase):
+    """
+    Seeding session menu folders from the menu rendered by the previous
+    session, without the dispatcher.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="tk-3de4_test_menus_")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        self.environ = dict(os.environ)
+        self.menu_cache = support.load_source(
+            "tk_3de4_menu_cache", os.path.join("python", "tk_3de4", "menu_cache.py")
+        )
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def run_session(self, commands):
+        """
+        Launch a session rendering a menu of the given commands.
+
+        :returns: The names of the files the session menu folder was seeded with.
+        """
+        session_dir, templates = self.menu_cache.create_session_dir(self.root, "key", self.manifest_path)
+        seeded = sorted(os.listdir(session_dir))
+        os.environ.update({
+            "TK_3DE4_MENU_DIR": session_dir,
+            "TK_3DE4_MENU_MANIFEST": self.manifest_path,
+            self.menu_cache.TEMPLATE_ENV: templates,
+        })
+        engine = support.make_engine()
+        for name in commands:
+            engine.register_command(name, lambda: None)
+        if engine.import_module("tk_3de4").MenuGenerator(engine).create_menu():
+            engine._save_menu_template()
+        self.assertTrue(os.path.isfile(self.manifest_path))
+        shutil.rmtree(session_dir)
+        return seeded
+
+    def test_sessions_are_seeded_for_their_commands(self):
+        # No manifest on the first launch.
+        self.assertEqual(self.run_session(["Load", "Publish"]), [])
+        self.assertEqual(len(self.run_session(["Load", "Publish"])), 2)
+        # A command added: seeded with the last menu, then saved with the new one.
+        self.assertEqual(len(self.run_session(["Load", "Publish", "Snapshot"])), 2)
+        self.assertEqual(len(self.run_session(["Load", "Publish", "Snapshot"])), 3)
+
+    def test_no_template_without_manifest(self):
+        self.assertIsNone(self.menu_cache.template_for_manifest(self.root, self.manifest_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Incremental rebuilds of the Shotgun menu folder.
+
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+import sgtk
+
+
+class IncrementalMenuTest(unittest.TestCase):
+
+    def setUp(self):
+        self.menu_dir = tempfile.mkdtemp(prefix="tk-3de4_test_menu_")
+        self.environ = dict(os.environ)
+        os.environ["TK_3DE4_MENU_DIR"] = self.menu_dir
+        self.engine = support.make_engine()
+        self.engine.register_command("Jump to Shotgun", lambda: None, {"type": "context_menu"})
+        for index in range(5):
+            self.engine.register_command("Command {}".format(index), lambda: None)
+        self.generator = self.engine.import_module("tk_3de4").MenuGenerator(self.engine)
+        self.assertTrue(self.generator.create_menu())
+        self.assertEqual(self.generator.last_stats, {"written": 6, "skipped": 0, "deleted": 0})
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.menu_dir, ignore_errors=True)
+
+    def scripts(self):
+        return sorted(os.listdir(self.menu_dir))
+
+    def test_unchanged_rescan_writes_nothing(self):
+        before = self.scripts()
+        self.assertFalse(self.generator.create_menu())
+        self.assertEqual(self.generator.last_stats, {"written": 0, "skipped": 6, "deleted": 0})
+        self.assertEqual(self.scripts(), before)
+
+    def test_renamed_command(self):
+        before = set(self.scripts())
+        self.engine.commands["Command 5"] = self.engine.commands.pop("Command 0")
+        self.assertTrue(self.generator.create_menu())
+        self.assertEqual(self.generator.last_stats, {"written": 1, "skipped": 5, "deleted": 1})
+        after = set(self.scripts())
+        self.assertEqual(len(before - after), 1)
+        self.assertEqual(len(after - before), 1)
+        with open(os.path.join(self.menu_dir, (after - before).pop())) as script_file:
+            self.assertIn("# 3DE4.script.name: Command 5", script_file.read())
+
+    def test_context_change_moves_the_context_menu(self):
+        self.engine.context = sgtk.Context({"type": "Shot", "id": 2, "name": "sh020"})
+        self.assertTrue(self.generator.create_menu())
+        self.assertEqual(self.generator.last_stats, {"written": 1, "skipped": 5, "deleted": 1})
+        contents = []
+        for name in self.scripts():
+            with open(os.path.join(self.menu_dir, name)) as script_file:
+                contents.append(script_file.read())
+        self.assertTrue(any("Shotgun:: Shot sh020" in content for content in contents))
+        self.assertFalse(any("sh010" in content for content in contents))
+
+    def test_changed_script_is_rewritten(self):
+        name = self.scripts()[0]
+        with open(os.path.join(self.menu_dir, name), "a") as script_file:
+            script_file.write("# edited")
+        self.assertTrue(self.generator.create_menu())
+        self.assertEqual(self.generator.last_stats, {"written": 1, "skipped": 5, "deleted": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Background scans of the sequences shown in the loader.
+
+"""
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import support
+
+
+class SequencePrefetcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seq_dir = tempfile.mkdtemp(prefix="tk-3de4_test_prefetch_")
+        for frame in range(1001, 1004):
+            open(os.path.join(self.seq_dir, "plate.{}.exr".format(frame)), "w").close()
+        self.path = os.path.join(self.seq_dir, "plate.####.exr")
+        self.tk_3de4 = support.make_engine().import_module("tk_3de4")
+        self.logger = logging.getLogger("sgtk.env.test.prefetch")
+        self.prefetcher = self.tk_3de4.SequencePrefetcher(logger=self.logger)
+
+    def tearDown(self):
+        shutil.rmtree(self.seq_dir, ignore_errors=True)
+
+    def wait_for(self, publish_id, path):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            found, info = self.prefetcher.lookup(publish_id, path)
+            if found:
+                return info
+            time.sleep(0.01)
+        self.fail("'{}' wasn't prefetched".format(path))
+
+    def age_directory(self, age):
+        past = time.time() - age
+        os.utime(self.seq_dir, (past, past))
+
+    def write_frame(self, name, frame):
+        open(os.path.join(self.seq_dir, "{}.{}.exr".format(name, frame)), "w").close()
+
+    def test_import_sees_new_frames(self):
+        self.age_directory(100)
+        self.prefetcher.prefetch(1, self.path)
+        self.assertEqual(self.wait_for(1, self.path).frames, [1001, 1002, 1003])
+        self.write_frame("plate", 1004)
+        self.age_directory(50)
+        # Captions may show the old scan...
+        self.assertEqual(self.prefetcher.lookup(1, self.path)[1].frames, [1001, 1002, 1003])
+        # ...imports never do.
+        info = self.prefetcher.scanner(1)(self.path)
+        self.assertEqual(info.frames, [1001, 1002, 1003, 1004])
+        self.assertEqual(self.prefetcher.misses, 1)
+
+    def test_import_uses_scan_of_unchanged_directory(self):
+        self.age_directory(100)
+        self.prefetcher.prefetch(1, self.path)
+        self.wait_for(1, self.path)
+        info = self.prefetcher.scanner(1)(self.path)
+        self.assertEqual(info.frames, [1001, 1002, 1003])
+        self.assertEqual((self.prefetcher.hits, self.prefetcher.misses), (1, 0))
+
+    def test_import_rescans_recently_modified_directory(self):
+        self.prefetcher.prefetch(1, self.path)
+        self.wait_for(1, self.path)
+        self.prefetcher.scanner(1)(self.path)
+        self.assertEqual((self.prefetcher.hits, self.prefetcher.misses), (0, 1))
+
+    def test_import_rescans_when_no_frames_were_found(self):
+        path = os.path.join(self.seq_dir, "comp.####.exr")
+        self.age_directory(100)
+        mtime = os.path.getmtime(self.seq_dir)
+        self.prefetcher.prefetch(1, path)
+        self.assertIsNone(self.wait_for(1, path))
+        self.write_frame("comp", 1001)
+        os.utime(self.seq_dir, (mtime, mtime))
+        self.assertEqual(self.prefetcher.scanner(1)(path).frames, [1001])
+
+    def test_failed_scan_doesnt_stop_prefetching(self):
+        class BrokenIndex(object):
+            def lookup(self, *args):
+                raise RuntimeError("broken index")
+
+        with support.capture_logs(self.logger.name) as records:
+            self.prefetcher.prefetch(1, self.path, BrokenIndex())
+            deadline = time.time() + 5
+            while not records and time.time() < deadline:
+                time.sleep(0.01)
+            self.prefetcher.prefetch(2, self.path)
+            self.wait_for(2, self.path)
+        self.assertEqual(self.prefetcher.lookup(1, self.path), (False, None))
+        self.assertEqual([record.levelno for record in records], [logging.ERROR])
+
+
+if __name__ == "__main__":
+    unittest.main()
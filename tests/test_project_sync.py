@@ -0,0 +1,176 @@
+"""
+Local-first project saves.
+
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+
+import sgtk
+import tde4
+from sgtk.platform.qt import QtGui
+
+
+class ProjectSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="tk-3de4_test_sync_")
+        self.local_root = os.path.join(self.temp_dir, "local")
+        self.real_path = os.path.join(self.temp_dir, "work", "scene.v001.3de")
+        self.project_sync_module = support.make_engine().import_module("tk_3de4").project_sync
+        self.project_sync = self.sync()
+
+    def tearDown(self):
+        self.project_sync.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def sync(self):
+        return self.project_sync_module.ProjectSync(
+            self.local_root, logging.getLogger("sgtk.env.test.sync"), poll_interval=0
+        )
+
+    def save(self, content):
+        def write(path):
+            with open(path, "wb") as project_file:
+                project_file.write(content)
+        self.project_sync.save(self.real_path, write)
+        self.project_sync.flush()
+
+    def read(self, path):
+        with open(path, "rb") as project_file:
+            return project_file.read()
+
+    def test_saves_verifies_and_renames(self):
+        self.save(b"points 1")
+        local_path = self.project_sync.local_path(self.real_path)
+        self.assertEqual(self.read(self.real_path), b"points 1")
+        self.assertEqual(os.listdir(os.path.dirname(self.real_path)), ["scene.v001.3de"])
+        self.assertEqual(self.project_sync.real_path(local_path), self.real_path)
+        self.assertEqual(self.project_sync.failures, {})
+        with open(local_path + ".sync") as state_file:
+            state = json.load(state_file)
+        self.assertEqual(state["real_path"], self.real_path)
+        self.assertEqual(state["synced_mtime"], os.path.getmtime(local_path))
+
+    def test_failed_copy(self):
+        self.save(b"points 1")
+        checksum = self.project_sync_module._file_checksum
+        self.project_sync_module._file_checksum = lambda path: "damaged"
+        try:
+            with support.capture_logs("sgtk.env.test.sync") as records:
+                self.save(b"points 2")
+        finally:
+            self.project_sync_module._file_checksum = checksum
+        local_path = self.project_sync.local_path(self.real_path)
+        self.assertEqual(self.read(self.real_path), b"points 1")
+        self.assertEqual(os.listdir(os.path.dirname(self.real_path)), ["scene.v001.3de"])
+        self.assertEqual([record.levelno for record in records], [logging.ERROR])
+        self.assertEqual(list(self.project_sync.failures), [self.real_path])
+        failures = self.project_sync.new_failures()
+        self.assertEqual([failure[:2] for failure in failures], [(self.real_path, local_path)])
+        self.assertEqual(self.project_sync.new_failures(), [])
+        # Saving again clears it.
+        self.save(b"points 3")
+        self.assertEqual(self.read(self.real_path), b"points 3")
+        self.assertEqual(self.project_sync.failures, {})
+
+    def test_change_during_sync(self):
+        local_path = self.project_sync.local_path(self.real_path)
+        fsync = os.fsync
+
+        def save_again(handle):
+            fsync(handle)
+            os.fsync = fsync
+            with open(local_path, "wb") as project_file:
+                project_file.write(b"points 2, saved from 3DE")
+            mtime = os.path.getmtime(local_path) + 10
+            os.utime(local_path, (mtime, mtime))
+
+        os.fsync = save_again
+        try:
+            self.save(b"points 1")
+        finally:
+            os.fsync = fsync
+        self.assertFalse(os.path.exists(self.real_path))
+        self.assertEqual(self.project_sync.failures, {})
+        self.project_sync.poll()
+        self.project_sync.flush()
+        self.assertEqual(self.read(self.real_path), b"points 2, saved from 3DE")
+
+    def test_mapping_survives_a_crash(self):
+        self.save(b"points 1")
+        self.project_sync.close()
+        local_path = self.project_sync.local_path(self.real_path)
+        # Saved from 3DE after the sync, then 3DE crashed.
+        with open(local_path, "wb") as project_file:
+            project_file.write(b"points 2")
+        mtime = os.path.getmtime(local_path) + 10
+        os.utime(local_path, (mtime, mtime))
+
+        self.project_sync = self.sync()
+        self.assertEqual(self.project_sync.real_path(local_path), self.real_path)
+        self.project_sync.poll()
+        self.project_sync.flush()
+        self.assertEqual(self.read(self.real_path), b"points 2")
+
+    def test_synced_saves_are_not_synced_again(self):
+        self.save(b"points 1")
+        self.project_sync.close()
+        self.project_sync = self.sync()
+        self.project_sync.poll()
+        self.assertEqual(self.project_sync.pending, set())
+
+
+class EngineProjectSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="tk-3de4_test_sync_")
+        self.real_path = os.path.join(self.temp_dir, "work", "scene.v001.3de")
+        self.engine = support.make_engine({"local_save": True})
+        self.engine.cache_location = self.temp_dir
+        self.engine.pre_app_init()
+        self.project_sync_module = self.engine.import_module("tk_3de4").project_sync
+        self.warnings = []
+        self.warning = QtGui.QMessageBox.__dict__["warning"]
+        QtGui.QMessageBox.warning = staticmethod(lambda *args: self.warnings.append(args))
+        tde4.reset(1)
+
+    def tearDown(self):
+        self.engine._close_project_sync()
+        QtGui.QMessageBox.warning = self.warning
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def fail_syncs(self):
+        self.project_sync_module._file_checksum = lambda path: "damaged"
+
+    def test_waiting_save_raises(self):
+        self.fail_syncs()
+        with self.assertRaises(sgtk.TankError):
+            self.engine.save_project(self.real_path, wait=True)
+        self.engine.timer_tick()
+        self.assertEqual(self.warnings, [])
+
+    def test_failures_are_shown_from_the_timer(self):
+        self.fail_syncs()
+        self.engine.save_project(self.real_path)
+        self.engine._project_sync.flush()
+        self.engine.timer_tick()
+        self.engine.timer_tick()
+        self.assertEqual(len(self.warnings), 1)
+        self.assertIn(self.real_path, self.warnings[0][2])
+
+    def test_failures_are_shown_when_closing(self):
+        self.fail_syncs()
+        self.engine.save_project(self.real_path)
+        self.engine._close_project_sync()
+        self.assertEqual(len(self.warnings), 1)
+        self.assertIn("not in the work area", self.warnings[0][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Following sequences still being rendered.
+
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import support
+
+
+class SequenceFollowerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seq_dir = tempfile.mkdtemp(prefix="tk-3de4_test_follow_")
+        # Other renders into the same directory.
+        for frame in range(1, 501):
+            open(os.path.join(self.seq_dir, "other.{:04d}.exr".format(frame)), "w").close()
+        self.write_frames(1001, 1010)
+        tk_3de4 = support.make_engine().import_module("tk_3de4")
+        spec = tk_3de4.sequences.parse_sequence_path(os.path.join(self.seq_dir, "plate.####.exr"))
+        self.extended = []
+        self.follower = tk_3de4.SequenceFollower(
+            spec, 1001, 1010, 1, on_extend=self.extended.append, poll_interval=0
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.seq_dir, ignore_errors=True)
+
+    def write_frames(self, start, end):
+        for frame in range(start, end + 1):
+            open(os.path.join(self.seq_dir, "plate.{}.exr".format(frame)), "w").close()
+
+    def scan(self):
+        self.follower._scanning = True
+        self.follower._scan()
+        # No scan of its own.
+        self.follower._next_poll = time.time() + 3600
+        self.follower.tick()
+
+    def test_extends_to_the_first_gap(self):
+        self.write_frames(1011, 1020)
+        self.write_frames(1022, 1030)
+        self.scan()
+        self.assertEqual(self.extended, [1020])
+        self.write_frames(1021, 1021)
+        self.scan()
+        self.assertEqual(self.extended, [1020, 1030])
+
+    def test_checks_only_the_following_frames(self):
+        self.write_frames(1011, 1012)
+        checked = []
+        isfile = os.path.isfile
+        listdir = os.listdir
+
+        def record(path):
+            checked.append(os.path.basename(path))
+            return isfile(path)
+
+        def fail(path):
+            raise AssertionError("Directory listed")
+
+        os.path.isfile = record
+        os.listdir = fail
+        try:
+            self.scan()
+        finally:
+            os.path.isfile = isfile
+            os.listdir = listdir
+        self.assertEqual(checked, ["plate.1011.exr", "plate.1012.exr", "plate.1013.exr"])
+        self.assertEqual(self.follower.end, 1012)
+
+    def test_polls_from_tick(self):
+        self.write_frames(1011, 1011)
+        deadline = time.time() + 5
+        while not self.extended and time.time() < deadline:
+            self.follower.tick()
+            time.sleep(0.01)
+        self.assertEqual(self.extended, [1011])
+
+
+if __name__ == "__main__":
+    unittest.main()
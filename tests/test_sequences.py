@@ -0,0 +1,145 @@
+"""
+Image sequence paths.
+
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import support
+
+
+class ParseSequencePathTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sequences = support.make_engine().import_module("tk_3de4").sequences
+
+    def parse(self, name):
+        spec = self.sequences.parse_sequence_path(os.path.join("plates", name))
+        return spec and (spec.prefix, spec.padding, spec.suffix)
+
+    def test_frame_specifications(self):
+        self.assertEqual(self.parse("plate.%04d.exr"), ("plate.", 4, ".exr"))
+        self.assertEqual(self.parse("plate.####.exr"), ("plate.", 4, ".exr"))
+        self.assertEqual(self.parse("plate_@@@@.exr"), ("plate_", 4, ".exr"))
+        self.assertEqual(self.parse("plate.$F4.exr"), ("plate.", 4, ".exr"))
+        self.assertEqual(self.parse("####.exr"), ("", 4, ".exr"))
+
+    def test_padding_characters_in_names(self):
+        self.assertIsNone(self.parse("plate@2x.exr"))
+        self.assertIsNone(self.parse("take#2.exr"))
+        self.assertEqual(self.parse("take#2.####.exr"), ("take#2.", 4, ".exr"))
+
+
+class SingleImageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.image_dir = tempfile.mkdtemp(prefix="tk-3de4_test_image_")
+        support.make_engine()
+        self.actions = support.load_source(
+            "tk_3de4_test_actions", os.path.join("hooks", "tk-multi-loader2", "tk-3de4_actions.py")
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.image_dir, ignore_errors=True)
+
+    def test_image_with_padding_character(self):
+        path = os.path.join(self.image_dir, "plate@2x.exr")
+        open(path, "w").close()
+        self.assertEqual(self.actions.get_hash_path_and_range_info_from_seq(path), (path, 1, 1, 1))
+
+
+class SequenceIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seq_dir = tempfile.mkdtemp(prefix="tk-3de4_test_index_seq_")
+        self.index_dir = tempfile.mkdtemp(prefix="tk-3de4_test_index_")
+        self.sequences = support.make_engine().import_module("tk_3de4").sequences
+        self.index = self.sequences.SequenceIndex(self.index_dir)
+        self.path = os.path.join(self.seq_dir, "plate.####.exr")
+        self.write_frames(1001, 1003)
+
+    def tearDown(self):
+        shutil.rmtree(self.seq_dir, ignore_errors=True)
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+    def write_frames(self, start, end, age=60):
+        for frame in range(start, end + 1):
+            open(os.path.join(self.seq_dir, "plate.{}.exr".format(frame)), "w").close()
+        self.set_dir_age(age)
+
+    def set_dir_age(self, age):
+        mtime = time.time() - age
+        os.utime(self.seq_dir, (mtime, mtime))
+        return mtime
+
+    def scan(self):
+        info = self.sequences.scan_sequence(self.path, self.index)
+        return info and (info.start, info.end)
+
+    def index_files(self):
+        return os.listdir(self.index_dir)
+
+    def test_unchanged_directory_is_not_listed(self):
+        self.assertEqual(self.scan(), (1001, 1003))
+        self.assertEqual(len(self.index_files()), 1)
+        listdir = os.listdir
+        scandir = self.sequences.scandir
+
+        def fail(*args):
+            raise AssertionError("Directory listed")
+
+        os.listdir = self.sequences.scandir = fail
+        try:
+            self.assertEqual(self.scan(), (1001, 1003))
+        finally:
+            os.listdir = listdir
+            self.sequences.scandir = scandir
+
+    def test_mtime_change_invalidates(self):
+        self.assertEqual(self.scan(), (1001, 1003))
+        self.write_frames(1004, 1004, age=30)
+        self.assertEqual(self.scan(), (1001, 1004))
+
+    def test_inode_change_invalidates(self):
+        self.assertEqual(self.scan(), (1001, 1003))
+        mtime = os.stat(self.seq_dir).st_mtime
+        # Replaced by another directory with the same mtime, e.g. restored
+        # from a backup. Kept around so the inode can't be reused.
+        new_dir = tempfile.mkdtemp(prefix="tk-3de4_test_index_seq_")
+        for frame in range(1001, 1006):
+            open(os.path.join(new_dir, "plate.{}.exr".format(frame)), "w").close()
+        os.rename(self.seq_dir, self.seq_dir + ".old")
+        os.rename(new_dir, self.seq_dir)
+        os.utime(self.seq_dir, (mtime, mtime))
+        try:
+            self.assertEqual(self.scan(), (1001, 1005))
+        finally:
+            shutil.rmtree(self.seq_dir + ".old", ignore_errors=True)
+
+    def test_recent_directories_are_not_indexed(self):
+        self.set_dir_age(0)
+        self.assertEqual(self.scan(), (1001, 1003))
+        self.assertEqual(self.index_files(), [])
+        # Within the mtime resolution, a new frame may not change the mtime.
+        mtime = os.stat(self.seq_dir).st_mtime
+        open(os.path.join(self.seq_dir, "plate.1004.exr"), "w").close()
+        os.utime(self.seq_dir, (mtime, mtime))
+        self.assertEqual(self.scan(), (1001, 1004))
+
+    def test_corrupt_index_files_are_ignored(self):
+        self.assertEqual(self.scan(), (1001, 1003))
+        index_path = os.path.join(self.index_dir, self.index_files()[0])
+        for content in ("{", "[]", '{"directory": null}', "null"):
+            with open(index_path, "w") as index_file:
+                index_file.write(content)
+            self.write_frames(1004, 1004)
+            self.assertEqual(self.scan(), (1001, 1004))
+            with open(index_path) as index_file:
+                self.assertIn(self.seq_dir, index_file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Cleaning up the chunks of deleted snapshots.
+
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+
+import support
+
+
+class SnapshotStoreGarbageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix="tk-3de4_test_snapshot_")
+        self.snapshot_dir = os.path.join(self.work_dir, "snapshots")
+        os.mkdir(self.snapshot_dir)
+        self.snapshot_store = support.make_engine().import_module("tk_3de4").snapshot_store
+        self.store = self.snapshot_store.SnapshotStore.for_snapshot(
+            os.path.join(self.snapshot_dir, "scene.v001.3de")
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def take_snapshot(self, name, seed):
+        project = os.path.join(self.work_dir, "scene.3de")
+        generator = random.Random(seed)
+        with open(project, "wb") as project_file:
+            project_file.write(bytearray(generator.getrandbits(8) for _ in range(256 * 1024)))
+        manifest = os.path.join(self.snapshot_dir, name)
+        self.store.snapshot(project, manifest)
+        return manifest
+
+    def chunk_files(self):
+        return set(
+            os.path.join(folder, name)
+            for folder, _, names in os.walk(self.store.root) for name in names
+        )
+
+    def age_chunks(self):
+        past = time.time() - 7200
+        for path in self.chunk_files():
+            os.utime(path, (past, past))
+
+    def test_removes_unreferenced_chunks(self):
+        self.take_snapshot("scene.v001.3de", 1)
+        kept = self.chunk_files()
+        old = self.take_snapshot("scene.v002.3de", 2)
+        self.assertTrue(self.chunk_files() - kept)
+        self.age_chunks()
+
+        self.assertEqual(self.store.collect_garbage(self.snapshot_dir)[0], 0)
+        os.remove(old)
+        removed, freed = self.store.collect_garbage(self.snapshot_dir)
+        self.assertTrue(removed)
+        self.assertTrue(freed)
+        self.assertEqual(self.chunk_files(), kept)
+
+        restored = os.path.join(self.work_dir, "restored.3de")
+        self.store.restore(os.path.join(self.snapshot_dir, "scene.v001.3de"), restored)
+
+    def test_keeps_recent_chunks(self):
+        # A snapshot being written has no manifest yet.
+        os.remove(self.take_snapshot("scene.v001.3de", 1))
+        self.assertEqual(self.store.collect_garbage(self.snapshot_dir), (0, 0))
+        self.assertTrue(self.chunk_files())
+
+    def test_reused_chunks_are_refreshed(self):
+        old = self.take_snapshot("scene.v001.3de", 1)
+        self.age_chunks()
+        self.take_snapshot("scene.v002.3de", 1)
+        os.remove(old)
+        os.remove(os.path.join(self.snapshot_dir, "scene.v002.3de"))
+        self.assertEqual(self.store.collect_garbage(self.snapshot_dir), (0, 0))
+
+    def test_unreadable_manifest_removes_nothing(self):
+        self.take_snapshot("scene.v001.3de", 1)
+        self.age_chunks()
+        with open(os.path.join(self.snapshot_dir, "broken.3de"), "wb") as broken:
+            broken.write(self.snapshot_store.MANIFEST_HEADER + b"{")
+        with self.assertRaises(ValueError):
+            self.store.collect_garbage(self.snapshot_dir)
+        self.assertTrue(self.chunk_files())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Latency of the 3DE timer callback.
+
+"""
+import logging
+import unittest
+
+import support
+
+
+class TickProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = support.make_engine()
+        self.logger = logging.getLogger("sgtk.env.test.ticks")
+        self.now = [0.0]
+        self.profiler = self.engine.import_module("tk_3de4").TickProfiler(self.logger, 0.02)
+        self.profiler.clock = lambda: self.now[0]
+
+    def tick(self, duration):
+        self.now[0] += 0.05
+        self.profiler.add(duration, {"process_events": duration})
+
+    def test_slow_ticks_are_summed_up(self):
+        with support.capture_logs("sgtk.env.test.ticks") as records:
+            for _ in range(1000):
+                self.tick(0.03)
+            self.tick(0.2)
+        warnings = [record for record in records if record.levelno >= logging.WARNING]
+        debug = [record for record in records if record.levelno == logging.DEBUG]
+        # About 50s of slow ticks, only logged at debug level so far.
+        self.assertEqual(len(warnings), 0)
+        self.assertEqual(len(debug), 1001)
+        with support.capture_logs("sgtk.env.test.ticks") as records:
+            for _ in range(300):
+                self.tick(0.0005)
+        warnings = [record.getMessage() for record in records if record.levelno >= logging.WARNING]
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("1001 3DE timer ticks over the 20ms budget", warnings[0])
+        self.assertIn("the slowest 200.0ms", warnings[0])
+        self.assertEqual(self.profiler.slow_ticks, 1001)
+
+    def test_excluded_ticks_are_not_counted(self):
+        self.profiler.exclude_tick()
+        with support.capture_logs("sgtk.env.test.ticks") as records:
+            self.tick(2.0)
+            self.tick(0.0005)
+        self.assertEqual(records, [])
+        self.assertEqual(self.profiler.slow_ticks, 0)
+        self.assertEqual(self.profiler.excluded_ticks, 1)
+        self.assertEqual(self.profiler.histogram()["total"][0], 1)
+
+    def test_commands_are_not_counted(self):
+        self.engine.pre_app_init()
+        self.engine.register_command("Slow", lambda: None)
+        self.engine.commands["Slow"]["callback"]()
+        self.engine.timer_tick()
+        self.assertEqual(self.engine._tick_profiler.excluded_ticks, 1)
+        self.engine.timer_tick()
+        self.assertEqual(self.engine._tick_profiler.excluded_ticks, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
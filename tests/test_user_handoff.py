@@ -0,0 +1,90 @@
+"""
+Handing the user of the launcher over to the 3DE session, against a local
+mock site.
+
+"""
+import os
+import stat
+import time
+import unittest
+
+import support
+from mock_site import MockSite
+
+import sgtk
+
+
+class UserHandoffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.site = MockSite().__enter__()
+        sgtk.util.CoreDefaultsManager.host = self.site.url
+        self.environ = dict(os.environ)
+        os.environ["TANK_CURRENT_PC"] = support.ENGINE_DIR
+        self.launcher_module = support.load_source("tk_3de4_test_launcher", "startup.py")
+        self.launcher = self.launcher_module.TDE4Launcher()
+        self.startup = support.load_source("tk_3de4_test_startup", os.path.join("startup", "startup.py"))
+        sgtk.set_authenticated_user(sgtk.authentication.ShotgunUser(self.site.url, "artist", "launcher"))
+        self.paths = []
+        self.timers = []
+
+    def tearDown(self):
+        for timer in self.timers:
+            timer.cancel()
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+        sgtk.set_authenticated_user(None)
+        os.environ.clear()
+        os.environ.update(self.environ)
+        self.site.__exit__()
+
+    def hand_over(self):
+        path = self.launcher._write_user_handoff()
+        self.paths.append(path)
+        self.timers.append(self.launcher._user_handoff_timer)
+        os.environ["TK_3DE4_USER_FILE"] = path
+        return path
+
+    def test_user_is_reused(self):
+        path = self.hand_over()
+        if os.name == "posix":
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+        user = self.startup._get_user()
+        self.assertEqual((user.login, user.session_token), ("artist", "launcher"))
+        self.assertEqual(self.site.logins, 0)
+        self.assertFalse(os.path.exists(path))
+        self.assertNotIn("TK_3DE4_USER_FILE", os.environ)
+
+    def test_expired_handoff_falls_back(self):
+        self.launcher.USER_HANDOFF_TTL = -1
+        path = self.hand_over()
+        user = self.startup._get_user()
+        self.assertEqual(user.session_token, "token1")
+        self.assertEqual(self.site.logins, 1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_missing_handoff_falls_back(self):
+        os.environ["TK_3DE4_USER_FILE"] = os.path.join(support.TESTS_DIR, "missing.json")
+        self.assertEqual(self.startup._get_user().session_token, "token1")
+        self.assertEqual(self.startup._get_user().session_token, "token2")
+
+    def test_launcher_deletes_unused_handoff(self):
+        self.launcher.USER_HANDOFF_TTL = 0.2
+        path = self.hand_over()
+        deadline = time.time() + 5
+        while os.path.exists(path) and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(os.path.exists(path))
+
+    def test_launcher_deletes_expired_handoffs_of_previous_launches(self):
+        old = self.hand_over()
+        old_time = time.time() - 2 * self.launcher.USER_HANDOFF_TTL
+        os.utime(old, (old_time, old_time))
+        new = self.hand_over()
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+
+
+if __name__ == "__main__":
+    unittest.main()